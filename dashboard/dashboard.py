@@ -1,14 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import pandas as pd
-from db.db import get_df_or_sql, get_connection
-try:
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    import matplotlib.pyplot as plt
-except ModuleNotFoundError:
-    print("Le module 'matplotlib' est requis pour le tableau de bord. Installe-le : python -m pip install matplotlib")
-    print("Note: Si tu utilises tkinter, assure-toi qu'il est installé : sur Linux, tu peux avoir besoin de 'python3-tk'")
-    raise
+from dashboard.dashboard_data import dashboard_snapshot
+from ui.task_runner import run_task
 
 class DashboardModule:
     def __init__(self, master, visualisation_mode=False):
@@ -17,6 +10,7 @@ class DashboardModule:
         self.top = tk.Toplevel(master)
         self.top.title("Tableau de bord")
         self.top.geometry("1100x650")
+        self._task = None
         self.create_widgets()
         self.refresh_dashboard()
 
@@ -57,6 +51,19 @@ class DashboardModule:
         self.graph_frame.pack(fill=tk.BOTH, expand=True)
 
     def refresh_dashboard(self):
+        """Lit les données en arrière-plan (fenêtre affichée aussitôt), puis les affiche."""
+        if self._task is not None:
+            self._task.cancel()
+        self.text_resume.delete("1.0", tk.END)
+        self.text_resume.insert("1.0", "Chargement du tableau de bord…")
+        self._task = run_task(
+            self.top, dashboard_snapshot,
+            on_done=self.display_dashboard,
+            title="Tableau de bord", message="Calcul du tableau de bord…",
+        )
+
+    def display_dashboard(self, snapshot):
+        self._task = None
         self.text_resume.delete("1.0", tk.END)
         self.tree_evenements.delete(*self.tree_evenements.get_children())
         self.tree_finances.delete(*self.tree_finances.get_children())
@@ -64,112 +71,54 @@ class DashboardModule:
         for widget in self.graph_frame.winfo_children():
             widget.destroy()
 
-        total_membres = len(get_df_or_sql("membres"))
-        total_events = len(get_df_or_sql("events"))
-        total_stock = len(get_df_or_sql("stock"))
-        df_dons = get_df_or_sql("dons_subventions")
-        df_evt_recettes = get_df_or_sql("event_recettes")
-        total_dons = df_dons["montant"].sum() if not df_dons.empty else 0
-        total_evt_recettes = df_evt_recettes["montant"].sum() if not df_evt_recettes.empty else 0
-        total_recettes = total_dons + total_evt_recettes
-
-        df_reg = get_df_or_sql("depenses_regulieres")
-        df_div = get_df_or_sql("depenses_diverses")
-        df_evtdep = get_df_or_sql("event_depenses")
-        total_depenses = (
-            df_reg["montant"].sum() if not df_reg.empty else 0
-        ) + (
-            df_div["montant"].sum() if not df_div.empty else 0
-        ) + (
-            df_evtdep["montant"].sum() if not df_evtdep.empty else 0
-        )
-
-        solde = total_recettes - total_depenses
         resume = (
-            f"🧑 Membres : {total_membres}\n"
-            f"🎉 Événements : {total_events}\n"
-            f"📦 Articles en stock : {total_stock}\n"
-            f"💰 Dons/subventions : {total_dons:.2f} €\n"
-            f"💰 Recettes événements : {total_evt_recettes:.2f} €\n"
-            f"💰 Total recettes : {total_recettes:.2f} €\n"
-            f"💸 Total dépenses : {total_depenses:.2f} €\n"
-            f"💼 Solde actuel : {solde:.2f} €\n"
+            f"🧑 Membres : {snapshot.nb_membres}\n"
+            f"🎉 Événements : {snapshot.nb_events}\n"
+            f"📦 Articles en stock : {snapshot.nb_stock}\n"
+            f"💰 Dons/subventions : {snapshot.total_dons:.2f} €\n"
+            f"💰 Recettes événements : {snapshot.total_evt_recettes:.2f} €\n"
+            f"💰 Total recettes : {snapshot.total_recettes:.2f} €\n"
+            f"💸 Total dépenses : {snapshot.total_depenses:.2f} €\n"
+            f"💼 Solde actuel : {snapshot.solde:.2f} €\n"
         )
         self.text_resume.insert("1.0", resume)
 
         # Dernières opérations (journal général synthétique)
-        try:
-            conn = get_connection()
-            df_ops = pd.read_sql_query(
-                """
-                SELECT date, 'Recette' as type, source as libelle, montant FROM dons_subventions
-                UNION ALL
-                SELECT e.date as date, 'Recette évènement', er.source, er.montant
-                    FROM event_recettes er
-                    JOIN events e ON er.event_id = e.id
-                UNION ALL
-                SELECT date_depense as date, 'Dépense régulière', categorie, -montant FROM depenses_regulieres
-                UNION ALL
-                SELECT date_depense as date, 'Dépense diverse', commentaire, -montant FROM depenses_diverses
-                UNION ALL
-                SELECT e.date as date, 'Dépense évènement', ed.categorie, -ed.montant
-                    FROM event_depenses ed
-                    JOIN events e ON ed.event_id = e.id
-                ORDER BY date DESC
-                LIMIT 5
-                """, conn
-            )
-            conn.close()
-            for _, row in df_ops.iterrows():
-                self.tree_last_ops.insert("", "end", values=(row["date"], row["type"], row["libelle"], f"{row['montant']:.2f}"))
-        except Exception:
-            pass
-
-        # Événements (synthèse)
-        df_evt = get_df_or_sql("events")
-        for _, row in df_evt.iterrows():
-            name = row["name"] if "name" in row else row.get("evenement", "")
-            try:
-                id_evt = row["id"]
-                recettes = get_df_or_sql(f"SELECT SUM(montant) FROM event_recettes WHERE event_id={id_evt}")["SUM(montant)"].iloc[0] or 0
-                depenses = get_df_or_sql(f"SELECT SUM(montant) FROM event_depenses WHERE event_id={id_evt}")["SUM(montant)"].iloc[0] or 0
-            except Exception:
-                recettes = depenses = 0
-            solde_evt = recettes - depenses
-            self.tree_evenements.insert("", "end", values=(name, f"{recettes:.2f}", f"{depenses:.2f}", f"{solde_evt:.2f}"))
+        for op in snapshot.last_operations:
+            self.tree_last_ops.insert("", "end", values=(op.date, op.type, op.libelle, f"{op.montant:.2f}"))
+
+        # Événements (synthèse) : totaux matérialisés, une ligne par événement
+        for evt in snapshot.events:
+            self.tree_evenements.insert("", "end", values=(evt.name, f"{evt.recettes:.2f}", f"{evt.depenses:.2f}", f"{evt.solde:.2f}"))
 
         # Finances par donateur/source/catégorie (dons + recettes évènement)
-        if not df_dons.empty:
-            dons_by_type = df_dons.groupby("source")["montant"].sum().reset_index()
-            for _, row in dons_by_type.iterrows():
-                self.tree_finances.insert("", "end", values=(row["source"], f"{row['montant']:.2f}"))
-        if not df_evt_recettes.empty:
-            evt_by_type = df_evt_recettes.groupby("source")["montant"].sum().reset_index()
-            for _, row in evt_by_type.iterrows():
-                self.tree_finances.insert("", "end", values=(f"Evt: {row['source']}", f"{row['montant']:.2f}"))
-
-        self.display_graphs(
-            total_dons, total_evt_recettes, total_depenses,
-            df_dons, df_evt_recettes, df_reg, df_div, df_evtdep
-        )
+        for total in snapshot.sources:
+            label = total.source if total.origine == "don" else f"Evt: {total.source}"
+            self.tree_finances.insert("", "end", values=(label, f"{total.montant:.2f}"))
 
-    def display_graphs(self, total_dons, total_evt_recettes, total_depenses, df_dons, df_evt_recettes, df_reg, df_div, df_evtdep):
+        self.display_graphs(snapshot)
+
+    def display_graphs(self, snapshot):
+        # matplotlib importé au premier affichage des graphiques (démarrage plus rapide)
+        try:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            import matplotlib.pyplot as plt
+        except ModuleNotFoundError:
+            print("Le module 'matplotlib' est requis pour le tableau de bord. Installe-le : python -m pip install matplotlib")
+            print("Note: Si tu utilises tkinter, assure-toi qu'il est installé : sur Linux, tu peux avoir besoin de 'python3-tk'")
+            raise
         fig, axes = plt.subplots(1, 2, figsize=(12, 5))
 
         recettes_labels = []
         recettes_vals = []
-        if not df_dons.empty:
-            dons_by_source = df_dons.groupby("source")["montant"].sum()
-            for s, v in dons_by_source.items():
-                label = s if len(str(s)) <= 28 else str(s)[:25] + "..."
-                recettes_labels.append(label)
-                recettes_vals.append(v)
-        if not df_evt_recettes.empty:
-            evt_by_source = df_evt_recettes.groupby("source")["montant"].sum()
-            for s, v in evt_by_source.items():
-                label = f"Evt: {s}" if len(str(s)) <= 23 else f"Evt: {str(s)[:20]}..."
-                recettes_labels.append(label)
-                recettes_vals.append(v)
+        for total in snapshot.sources:
+            source = str(total.source)
+            if total.origine == "don":
+                label = source if len(source) <= 28 else source[:25] + "..."
+            else:
+                label = f"Evt: {source}" if len(source) <= 23 else f"Evt: {source[:20]}..."
+            recettes_labels.append(label)
+            recettes_vals.append(total.montant)
         if not recettes_labels:
             recettes_labels = ["Aucune"]
             recettes_vals = [1]
@@ -180,17 +129,8 @@ class DashboardModule:
         axes[0].set_title("Répartition Recettes")
         axes[0].legend(wedges1, recettes_labels, loc='center left', bbox_to_anchor=(1, 0.5), fontsize=9)
 
-        depenses_labels = []
-        depenses_vals = []
-        if not df_reg.empty:
-            depenses_labels.append("Dépenses régulières")
-            depenses_vals.append(df_reg["montant"].sum())
-        if not df_div.empty:
-            depenses_labels.append("Dépenses diverses")
-            depenses_vals.append(df_div["montant"].sum())
-        if not df_evtdep.empty:
-            depenses_labels.append("Dépenses événements")
-            depenses_vals.append(df_evtdep["montant"].sum())
+        depenses_labels = [label for label, _ in snapshot.depenses]
+        depenses_vals = [total for _, total in snapshot.depenses]
         if not depenses_labels:
             depenses_labels = ["Aucune"]
             depenses_vals = [1]
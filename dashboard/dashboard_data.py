@@ -0,0 +1,134 @@
+"""
+Données du tableau de bord, calculées par agrégats SQL.
+
+dashboard_snapshot() lit en quatre requêtes (compteurs et totaux, répartition
+des recettes par source, dernières écritures, totaux par événement) tout ce
+qu'affiche le tableau de bord, sans charger de table entière : son coût reste
+stable quand la base grossit. Le résultat est un DashboardSnapshot figé.
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+from db.db import get_connection, traced
+from db.ledger import last_entries
+from modules.events_db import list_events_with_totals
+
+# (table de dépenses, libellé de la répartition des dépenses)
+EXPENSE_TABLES = (
+    ("depenses_regulieres", "Dépenses régulières"),
+    ("depenses_diverses", "Dépenses diverses"),
+    ("event_depenses", "Dépenses événements"),
+)
+
+
+@dataclass(frozen=True)
+class EventSummary:
+    name: str
+    recettes: float
+    depenses: float
+
+    @property
+    def solde(self) -> float:
+        return self.recettes - self.depenses
+
+
+@dataclass(frozen=True)
+class SourceTotal:
+    origine: str  # "don" (dons/subventions) ou "evenement" (recettes d'événements)
+    source: str
+    montant: float
+
+
+@dataclass(frozen=True)
+class Operation:
+    date: str
+    type: str
+    libelle: str
+    montant: float
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    nb_membres: int
+    nb_events: int
+    nb_stock: int
+    total_dons: float
+    total_evt_recettes: float
+    depenses: Tuple[Tuple[str, float], ...]  # (libellé, total) des tables de dépenses non vides
+    sources: Tuple[SourceTotal, ...]
+    events: Tuple[EventSummary, ...]
+    last_operations: Tuple[Operation, ...]
+
+    @property
+    def total_recettes(self) -> float:
+        return self.total_dons + self.total_evt_recettes
+
+    @property
+    def total_depenses(self) -> float:
+        return sum(total for _, total in self.depenses)
+
+    @property
+    def solde(self) -> float:
+        return self.total_recettes - self.total_depenses
+
+
+def _kpis(conn):
+    expenses = ", ".join(
+        f"(SELECT COUNT(*) FROM {table}) AS nb_{table}, "
+        f"(SELECT COALESCE(SUM(montant), 0) FROM {table}) AS total_{table}"
+        for table, _ in EXPENSE_TABLES
+    )
+    return conn.execute(f"""
+        SELECT (SELECT COUNT(*) FROM membres) AS nb_membres,
+               (SELECT COUNT(*) FROM events) AS nb_events,
+               (SELECT COUNT(*) FROM stock) AS nb_stock,
+               (SELECT COALESCE(SUM(montant), 0) FROM dons_subventions) AS total_dons,
+               (SELECT COALESCE(SUM(montant), 0) FROM event_recettes) AS total_evt_recettes,
+               {expenses}
+    """).fetchone()
+
+
+def _sources(conn):
+    rows = conn.execute("""
+        SELECT 'don' AS origine, source, SUM(montant) AS montant
+        FROM dons_subventions WHERE source IS NOT NULL GROUP BY source
+        UNION ALL
+        SELECT 'evenement', source, SUM(montant)
+        FROM event_recettes WHERE source IS NOT NULL GROUP BY source
+        ORDER BY origine, source
+    """).fetchall()
+    return tuple(SourceTotal(r["origine"], r["source"], r["montant"] or 0.0) for r in rows)
+
+
+@traced("dashboard_snapshot")
+def dashboard_snapshot():
+    """Indicateurs, répartitions et totaux par événement du tableau de bord (voir DashboardSnapshot)."""
+    conn = get_connection()
+    try:
+        kpis = _kpis(conn)
+        sources = _sources(conn)
+    finally:
+        conn.close()
+    try:
+        operations = tuple(
+            Operation(r["date"], r["type"], r["libelle"], r["montant"]) for r in last_entries(5)
+        )
+    except Exception:
+        operations = ()
+    events = tuple(
+        EventSummary(r["name"], r["recettes"], r["depenses"]) for r in list_events_with_totals()
+    )
+    return DashboardSnapshot(
+        nb_membres=kpis["nb_membres"],
+        nb_events=kpis["nb_events"],
+        nb_stock=kpis["nb_stock"],
+        total_dons=kpis["total_dons"],
+        total_evt_recettes=kpis["total_evt_recettes"],
+        depenses=tuple(
+            (label, kpis[f"total_{table}"]) for table, label in EXPENSE_TABLES if kpis[f"nb_{table}"]
+        ),
+        sources=sources,
+        events=events,
+        last_operations=operations,
+    )
@@ -11,33 +11,254 @@ MODIFICATIONS APPLIQUÉES (PR copilot/auto-fix-buvette):
 
 import sqlite3
 import os
-import pandas as pd
+import threading
+from contextlib import contextmanager
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
+from db.query_trace import (  # noqa: F401  (surface publique de la trace SQL)
+    TracingCursor, is_tracing, set_query_trace, query_trace_enabled,
+    get_query_stats, format_query_stats, reset_query_stats, trace_block, traced,
+    max_queries, TooManyQueriesError,
+)
 
 DB_FILE = "association.db"
 _db_file = DB_FILE  # Pour gestion dynamique du fichier DB
 
 logger = get_logger("db")
 
+# Index secondaires gérés par init_db() et upgrade_db_structure() (étape 2 de MIGRATIONS).
+# Clés étrangères utilisées dans les WHERE + clés composites des requêtes chaudes.
+# Format : (nom_index, table, (colonnes, ...))
+INDEXES = [
+    ("idx_event_modules_event", "event_modules", ("event_id",)),
+    ("idx_event_module_fields_module", "event_module_fields", ("module_id",)),
+    ("idx_event_module_data_cell", "event_module_data", ("module_id", "row_index", "field_id")),
+    ("idx_event_module_data_field", "event_module_data", ("field_id",)),
+    ("idx_event_payments_event", "event_payments", ("event_id",)),
+    ("idx_event_caisses_event", "event_caisses", ("event_id",)),
+    ("idx_event_caisse_details_caisse_moment", "event_caisse_details", ("caisse_id", "moment")),
+    ("idx_event_recettes_event_source", "event_recettes", ("event_id", "source")),
+    ("idx_event_recettes_module", "event_recettes", ("module_id",)),
+    ("idx_event_depenses_event", "event_depenses", ("event_id",)),
+    ("idx_event_depenses_module", "event_depenses", ("module_id",)),
+    ("idx_inventaires_event", "inventaires", ("event_id",)),
+    ("idx_inventaire_lignes_inventaire", "inventaire_lignes", ("inventaire_id",)),
+    ("idx_inventaire_lignes_stock", "inventaire_lignes", ("stock_id",)),
+    ("idx_mouvements_stock_stock", "mouvements_stock", ("stock_id",)),
+    ("idx_valeurs_modeles_colonnes_modele", "valeurs_modeles_colonnes", ("modele_id",)),
+    ("idx_buvette_achats_article", "buvette_achats", ("article_id",)),
+    ("idx_buvette_inventaires_event", "buvette_inventaires", ("event_id",)),
+    ("idx_buvette_inventaire_lignes_inventaire", "buvette_inventaire_lignes", ("inventaire_id", "article_id")),
+    ("idx_buvette_inventaire_lignes_article", "buvette_inventaire_lignes", ("article_id",)),
+    ("idx_buvette_mouvements_article", "buvette_mouvements", ("article_id",)),
+    ("idx_buvette_mouvements_event", "buvette_mouvements", ("event_id",)),
+    ("idx_buvette_recettes_event", "buvette_recettes", ("event_id",)),
+]
+
+def create_indexes(conn):
+    """
+    Crée les index déclarés dans INDEXES s'ils sont absents.
+    Les index dont la table ou une colonne n'existe pas (anciennes bases) sont ignorés.
+    Retourne la liste des index effectivement disponibles.
+    """
+    c = conn.cursor()
+    created = []
+    for name, table, columns in INDEXES:
+        try:
+            c.execute(f"PRAGMA table_info({table});")
+            existing = {r[1] for r in c.fetchall()}
+            if not existing or not set(columns) <= existing:
+                logger.debug(f"Index '{name}' ignoré : table/colonnes absentes.")
+                continue
+            c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)});")
+            created.append(name)
+        except Exception as e:
+            logger.warning(f"Impossible de créer l'index {name}: {e}")
+    return created
+
+CONNECTION_TIMEOUT = 10  # secondes d'attente sur un verrou avant "database is locked"
+
+# Profils de PRAGMA de performance appliqués à chaque connexion du pool.
+# Profil par défaut : variable d'environnement ASSO_DB_PROFILE (sinon "interactive").
+# foreign_keys reste OFF : les suppressions existantes (événements, modules...)
+# ne suppriment pas les lignes filles et échoueraient avec la contrainte active.
+_BASE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # valeur négative = Kio (~16 Mo)
+    "mmap_size": 64 * 1024 * 1024,
+    "foreign_keys": "OFF",
+    "query_only": "OFF",
+    "wal_autocheckpoint": 1000,
+}
+PRAGMA_PROFILES = {
+    "interactive": dict(_BASE_PRAGMAS),
+    "bulk-import": dict(_BASE_PRAGMAS, cache_size=-64000, mmap_size=256 * 1024 * 1024,
+                        wal_autocheckpoint=10000),
+    "report": dict(_BASE_PRAGMAS, cache_size=-64000, mmap_size=256 * 1024 * 1024,
+                   query_only="ON"),
+}
+DEFAULT_PRAGMA_PROFILE = "interactive"
+_pragma_profile = os.getenv("ASSO_DB_PROFILE", DEFAULT_PRAGMA_PROFILE)
+if _pragma_profile not in PRAGMA_PROFILES:
+    logger.warning(f"Profil PRAGMA inconnu '{_pragma_profile}', utilisation de '{DEFAULT_PRAGMA_PROFILE}'.")
+    _pragma_profile = DEFAULT_PRAGMA_PROFILE
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connexion SQLite longue durée partagée (une par thread et par fichier DB).
+
+    close() ne ferme pas la connexion : chaque get_connection() compte un
+    appelant, chaque close() en rend un ; quand le dernier la rend, une
+    éventuelle transaction non validée est annulée, comme le faisait la
+    fermeture d'une connexion éphémère. Les PRAGMA et le cache de requêtes
+    préparées restent ainsi acquis pour toute la durée de vie du thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.profile = None
+
+    def close(self):
+        if self.checkouts > 0:
+            self.checkouts -= 1
+        if self.checkouts == 0 and self.in_transaction:
+            self.rollback()
+
+    def dispose(self):
+        """Ferme réellement la connexion (invalidation du pool)."""
+        sqlite3.Connection.close(self)
+
+    # Trace SQL (db/query_trace.py) : curseurs chronométrés quand elle est active.
+    # execute()/executemany() sont redéfinis car les raccourcis C de
+    # sqlite3.Connection contournent les méthodes Python du curseur.
+    def cursor(self, factory=sqlite3.Cursor):
+        if factory is sqlite3.Cursor and is_tracing():
+            factory = TracingCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+_pool = threading.local()  # connexions du thread courant : {chemin absolu: PooledConnection}
+_pool_generation = 0  # incrémenté à chaque invalidation, vérifié par chaque thread
+
+def _pool_key(path):
+    return path if path == ":memory:" else os.path.abspath(path)
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, timeout=CONNECTION_TIMEOUT, factory=PooledConnection)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+    except Exception as pragma_exc:
+        logger.warning(f"Impossible de définir WAL: {pragma_exc}")
+    apply_pragma_profile(conn, _pragma_profile)
+    return conn
+
+def apply_pragma_profile(conn, name):
+    """
+    Applique le profil de PRAGMA `name` (voir PRAGMA_PROFILES) à une connexion,
+    du pool ou ouverte directement par sqlite3.connect() ; seule une connexion
+    du pool mémorise le nom du profil (conn.profile).
+    """
+    if name not in PRAGMA_PROFILES:
+        raise ValueError(f"Profil PRAGMA inconnu : {name}")
+    for pragma, value in PRAGMA_PROFILES[name].items():
+        try:
+            conn.execute(f"PRAGMA {pragma}={value};")
+        except Exception as pragma_exc:
+            logger.warning(f"Impossible de définir PRAGMA {pragma}={value}: {pragma_exc}")
+    if isinstance(conn, PooledConnection):
+        conn.profile = name
+    logger.info(f"Profil PRAGMA '{name}' appliqué.")
+
+def get_pragma_profile():
+    """Nom du profil de PRAGMA par défaut des connexions du pool."""
+    return _pragma_profile
+
+def set_pragma_profile(name):
+    """Change le profil par défaut ; les connexions du pool sont rouvertes avec ce profil."""
+    global _pragma_profile
+    if name not in PRAGMA_PROFILES:
+        raise ValueError(f"Profil PRAGMA inconnu : {name}")
+    _pragma_profile = name
+    close_connections()
+
+@contextmanager
+def pragma_profile(name):
+    """
+    Bascule temporairement la connexion du thread courant sur un autre profil
+    (ex. "bulk-import" pour un enregistrement massif, "report" pour un export),
+    puis restaure le profil précédent. Fournit la connexion du pool.
+    """
+    conn = get_connection()
+    previous = conn.profile or _pragma_profile
+    apply_pragma_profile(conn, name)
+    try:
+        yield conn
+    finally:
+        apply_pragma_profile(conn, previous)
+        conn.close()
+
+def _dispose_thread_connections():
+    for conn in getattr(_pool, "connections", {}).values():
+        try:
+            conn.dispose()
+        except Exception as e:
+            logger.warning(f"Erreur à la fermeture d'une connexion du pool: {e}")
+    _pool.connections = {}
+    _pool.generation = _pool_generation
+
+def release_thread_connections():
+    """
+    Ferme les connexions du pool du thread courant sans invalider celles des
+    autres threads (voir ui/task_runner.release_worker_connections).
+    """
+    _dispose_thread_connections()
+
+def close_connections():
+    """
+    Invalide le pool : ferme les connexions du thread courant, les autres threads
+    rouvriront la leur au prochain get_connection(). À appeler avant de remplacer
+    ou supprimer le fichier de base (restauration, réinitialisation).
+    """
+    global _pool_generation
+    _pool_generation += 1
+    _dispose_thread_connections()
+
 def set_db_file(path):
     """Change dynamiquement le fichier DB à utiliser."""
     global _db_file
     _db_file = path
+    close_connections()
     logger.info(f"Database file set to: {_db_file}")
 
 def get_db_file():
     return _db_file
 
 def get_connection():
-    """Renvoie une connexion SQLite prête à l’emploi, journal_mode=WAL, gestion des erreurs."""
+    """
+    Renvoie la connexion SQLite du pool pour le thread courant (journal_mode=WAL).
+    La connexion est ouverte au premier appel puis réutilisée ; conn.close()
+    la rend au pool sans la fermer.
+    """
     try:
-        conn = sqlite3.connect(_db_file, timeout=10)
+        if getattr(_pool, "generation", None) != _pool_generation:
+            _dispose_thread_connections()
+        key = _pool_key(_db_file)
+        conn = _pool.connections.get(key)
+        if conn is None:
+            conn = _open_connection(_db_file)
+            _pool.connections[key] = conn
         conn.row_factory = sqlite3.Row
-        try:
-            conn.execute("PRAGMA journal_mode=WAL;")
-        except Exception as pragma_exc:
-            logger.warning(f"Impossible de définir WAL: {pragma_exc}")
+        # Compté symétriquement avec close() : un helper ouvert puis fermé au
+        # milieu d'une écriture ne rend pas la connexion de l'appelant extérieur
+        conn.checkouts += 1
         return conn
     except Exception as e:
         logger.error(f"Erreur lors de la connexion à la base: {e}")
@@ -49,13 +270,15 @@ def drop_tables(conn):
         "config", "comptes", "membres", "events", "stock", "categories",
         "dons_subventions", "depenses_regulieres", "depenses_diverses",
         "inventaires", "inventaire_lignes", "mouvements_stock", "event_modules",
-        "event_module_fields", "event_module_data", "event_payments",
+        "event_module_fields", "event_module_data", "event_module_rows", "event_payments",
         "event_caisses", "event_caisse_details", "event_recettes",
         "event_depenses", "fournisseurs", "colonnes_modeles",
         "valeurs_modeles_colonnes", "depots_retraits_banque",
         "historique_clotures", "retrocessions_ecoles",
         "buvette_articles", "buvette_achats", "buvette_inventaires",
-        "buvette_inventaire_lignes", "buvette_mouvements", "buvette_recettes"
+        "buvette_inventaire_lignes", "buvette_mouvements", "buvette_recettes",
+        "ledger_entries", "ledger_checkpoints", "event_totals", "event_caisse_totals",
+        "search_index"
     ]
     cur = conn.cursor()
     for table in tables:
@@ -64,205 +287,212 @@ def drop_tables(conn):
             logger.debug(f"Table '{table}' supprimée.")
         except Exception as e:
             logger.warning(f"Impossible de supprimer {table}: {e}")
+    # Base vide : init_db() doit rejouer toutes les étapes de MIGRATIONS
+    cur.execute("PRAGMA user_version = 0")
     conn.commit()
 
-def upgrade_db_structure():
-    """Migration douce : assure la présence de toutes les colonnes/tables attendues sans perte de données."""
-    from tkinter import messagebox
-    try:
-        conn = get_connection()
-        c = conn.cursor()
+def _upgrade_schema(conn):
+    """Ajoute les colonnes/tables manquantes d'une base existante, sans perte de données."""
+    c = conn.cursor()
 
-        # Table comptes
-        c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='comptes'")
-        if not c.fetchone():
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS comptes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    solde REAL DEFAULT 0
-                )
-            """)
-        c.execute("SELECT COUNT(*) as n FROM comptes")
-        if c.fetchone()["n"] == 0:
-            c.execute("SELECT solde_report FROM config ORDER BY id DESC LIMIT 1")
-            row = c.fetchone()
-            if row and row["solde_report"] is not None:
-                c.execute("INSERT INTO comptes (name, solde) VALUES (?, ?)", ("Banque Principale", row["solde_report"]))
-                conn.commit()
-
-        def add_column_if_not_exists(table, column, definition):
-            try:
-                c.execute(f"PRAGMA table_info({table});")
-                cols = [r[1] for r in c.fetchall()]
-                if column not in cols:
-                    c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
-                    logger.info(f"Ajout colonne '{column}' à la table '{table}'.")
-            except Exception as e:
-                logger.warning(f"Impossible d'ajouter la colonne {column} à {table}: {e}")
-
-        for col, typ in [("cotisation", "TEXT"), ("commentaire", "TEXT"), ("statut", "TEXT"), ("date_adhesion", "TEXT")]:
-            add_column_if_not_exists("membres", col, typ)
-        for col, typ in [("cloture", "INTEGER DEFAULT 0"), ("solde_report", "REAL DEFAULT 0"), ("but_asso", "TEXT DEFAULT ''")]:
-            add_column_if_not_exists("config", col, typ)
-        add_column_if_not_exists("event_modules", "id_col_total", "INTEGER")
-        for col, typ in [("prix_unitaire", "REAL"), ("modele_colonne", "TEXT")]:
-            add_column_if_not_exists("event_module_fields", col, typ)
-
-        advanced_cols = [
-            ("fournisseur", "TEXT"), ("date_depense", "TEXT"), ("paye_par", "TEXT"),
-            ("membre_id", "INTEGER"), ("statut_remboursement", "TEXT"),
-            ("statut_reglement", "TEXT"), ("moyen_paiement", "TEXT"),
-            ("numero_cheque", "TEXT"), ("numero_facture", "TEXT")
-        ]
-        for col, typ in advanced_cols:
-            add_column_if_not_exists("event_depenses", col, typ)
-        dep_cols = [
-            ("categorie", "TEXT"), ("module_id", "INTEGER"), ("montant", "REAL"), ("fournisseur", "TEXT"),
-            ("date_depense", "TEXT"), ("paye_par", "TEXT"), ("membre_id", "INTEGER"), ("statut_remboursement", "TEXT"),
-            ("statut_reglement", "TEXT"), ("moyen_paiement", "TEXT"), ("numero_cheque", "TEXT"),
-            ("numero_facture", "TEXT"), ("commentaire", "TEXT"),
-        ]
-        for t in ["depenses_regulieres", "depenses_diverses"]:
-            for col, typ in dep_cols:
-                add_column_if_not_exists(t, col, typ)
-
-        # Migration non destructive : ajouter la colonne 'stock' à buvette_articles si elle n'existe pas
-        add_column_if_not_exists("buvette_articles", "stock", "INTEGER DEFAULT 0")
-        
-        # Ajouter la colonne 'commentaire' à buvette_inventaire_lignes si elle n'existe pas
-        add_column_if_not_exists("buvette_inventaire_lignes", "commentaire", "TEXT")
-        
-        # Ajouter la colonne 'purchase_price' à buvette_articles si elle n'existe pas
-        add_column_if_not_exists("buvette_articles", "purchase_price", "REAL")
-
-        def create_table_if_not_exists(name, sql):
-            try:
-                c.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{name}'")
-                if not c.fetchone():
-                    c.execute(sql)
-                    logger.info(f"Table '{name}' créée.")
-            except Exception as e:
-                logger.warning(f"Impossible de créer la table {name}: {e}")
-
-        create_table_if_not_exists("retrocessions_ecoles", """
-            CREATE TABLE IF NOT EXISTS retrocessions_ecoles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                montant REAL,
-                ecole TEXT,
-                commentaire TEXT
-            )
-        """)
-        create_table_if_not_exists("fournisseurs", """
-            CREATE TABLE IF NOT EXISTS fournisseurs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE
-            )
-        """)
-        create_table_if_not_exists("colonnes_modeles", """
-            CREATE TABLE IF NOT EXISTS colonnes_modeles (
+    def add_column_if_not_exists(table, column, definition):
+        try:
+            c.execute(f"PRAGMA table_info({table});")
+            cols = [r[1] for r in c.fetchall()]
+            if column not in cols:
+                c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+                logger.info(f"Ajout colonne '{column}' à la table '{table}'.")
+        except Exception as e:
+            logger.warning(f"Impossible d'ajouter la colonne {column} à {table}: {e}")
+
+    for col, typ in [("cotisation", "TEXT"), ("commentaire", "TEXT"), ("statut", "TEXT"), ("date_adhesion", "TEXT")]:
+        add_column_if_not_exists("membres", col, typ)
+    for col, typ in [("cloture", "INTEGER DEFAULT 0"), ("solde_report", "REAL DEFAULT 0"), ("but_asso", "TEXT DEFAULT ''")]:
+        add_column_if_not_exists("config", col, typ)
+    add_column_if_not_exists("event_modules", "id_col_total", "INTEGER")
+    for col, typ in [("prix_unitaire", "REAL"), ("modele_colonne", "TEXT")]:
+        add_column_if_not_exists("event_module_fields", col, typ)
+
+    advanced_cols = [
+        ("fournisseur", "TEXT"), ("date_depense", "TEXT"), ("paye_par", "TEXT"),
+        ("membre_id", "INTEGER"), ("statut_remboursement", "TEXT"),
+        ("statut_reglement", "TEXT"), ("moyen_paiement", "TEXT"),
+        ("numero_cheque", "TEXT"), ("numero_facture", "TEXT")
+    ]
+    for col, typ in advanced_cols:
+        add_column_if_not_exists("event_depenses", col, typ)
+    dep_cols = [
+        ("categorie", "TEXT"), ("module_id", "INTEGER"), ("montant", "REAL"), ("fournisseur", "TEXT"),
+        ("date_depense", "TEXT"), ("paye_par", "TEXT"), ("membre_id", "INTEGER"), ("statut_remboursement", "TEXT"),
+        ("statut_reglement", "TEXT"), ("moyen_paiement", "TEXT"), ("numero_cheque", "TEXT"),
+        ("numero_facture", "TEXT"), ("commentaire", "TEXT"),
+    ]
+    for t in ["depenses_regulieres", "depenses_diverses"]:
+        for col, typ in dep_cols:
+            add_column_if_not_exists(t, col, typ)
+
+    # Migration non destructive : ajouter la colonne 'stock' à buvette_articles si elle n'existe pas
+    add_column_if_not_exists("buvette_articles", "stock", "INTEGER DEFAULT 0")
+
+    # Ajouter la colonne 'commentaire' à buvette_inventaire_lignes si elle n'existe pas
+    add_column_if_not_exists("buvette_inventaire_lignes", "commentaire", "TEXT")
+
+    # Ajouter la colonne 'purchase_price' à buvette_articles si elle n'existe pas
+    add_column_if_not_exists("buvette_articles", "purchase_price", "REAL")
+
+    def create_table_if_not_exists(name, sql):
+        try:
+            c.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{name}'")
+            if not c.fetchone():
+                c.execute(sql)
+                logger.info(f"Table '{name}' créée.")
+        except Exception as e:
+            logger.warning(f"Impossible de créer la table {name}: {e}")
+
+    create_table_if_not_exists("retrocessions_ecoles", """
+        CREATE TABLE IF NOT EXISTS retrocessions_ecoles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            montant REAL,
+            ecole TEXT,
+            commentaire TEXT
+        )
+    """)
+    create_table_if_not_exists("fournisseurs", """
+        CREATE TABLE IF NOT EXISTS fournisseurs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    create_table_if_not_exists("colonnes_modeles", """
+        CREATE TABLE IF NOT EXISTS colonnes_modeles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type_modele TEXT NOT NULL
+        )
+    """)
+    create_table_if_not_exists("valeurs_modeles_colonnes", """
+        CREATE TABLE IF NOT EXISTS valeurs_modeles_colonnes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            modele_id INTEGER,
+            valeur TEXT NOT NULL,
+            FOREIGN KEY (modele_id) REFERENCES colonnes_modeles(id)
+        )
+    """)
+    create_table_if_not_exists("depots_retraits_banque", """
+        CREATE TABLE IF NOT EXISTS depots_retraits_banque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,
+            montant REAL NOT NULL,
+            reference TEXT,
+            banque TEXT,
+            pointe INTEGER DEFAULT 0,
+            commentaire TEXT
+        )
+    """)
+    create_table_if_not_exists("historique_clotures", """
+        CREATE TABLE IF NOT EXISTS historique_clotures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_cloture TEXT NOT NULL
+        )
+    """)
+    create_table_if_not_exists("buvette_articles", """
+        CREATE TABLE IF NOT EXISTS buvette_articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            categorie TEXT,
+            unite TEXT,
+            contenance TEXT,
+            commentaire TEXT,
+            stock INTEGER DEFAULT 0,
+            purchase_price REAL
+        )
+    """)
+    create_table_if_not_exists("buvette_achats", """
+        CREATE TABLE IF NOT EXISTS buvette_achats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER,
+            date_achat DATE,
+            quantite INTEGER,
+            prix_unitaire REAL,
+            fournisseur TEXT,
+            facture TEXT,
+            exercice TEXT,
+            FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
+        )
+    """)
+    create_table_if_not_exists("buvette_inventaires", """
+        CREATE TABLE IF NOT EXISTS buvette_inventaires (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_inventaire DATE,
+            event_id INTEGER,
+            type_inventaire TEXT CHECK(type_inventaire IN ('avant', 'apres', 'hors_evenement')),
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    create_table_if_not_exists("buvette_inventaire_lignes", """
+        CREATE TABLE IF NOT EXISTS buvette_inventaire_lignes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            inventaire_id INTEGER,
+            article_id INTEGER,
+            quantite INTEGER,
+            FOREIGN KEY (inventaire_id) REFERENCES buvette_inventaires(id),
+            FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
+        )
+    """)
+    create_table_if_not_exists("buvette_mouvements", """
+        CREATE TABLE IF NOT EXISTS buvette_mouvements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER,
+            date_mouvement DATE,
+            type_mouvement TEXT,
+            quantite INTEGER,
+            motif TEXT,
+            event_id INTEGER,
+            FOREIGN KEY (article_id) REFERENCES buvette_articles(id),
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    create_table_if_not_exists("buvette_recettes", """
+        CREATE TABLE IF NOT EXISTS buvette_recettes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            montant REAL,
+            date_recette DATE,
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+
+    # Table comptes (après l'ajout de config.solde_report sur les anciennes bases)
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='comptes'")
+    if not c.fetchone():
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS comptes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL UNIQUE,
-                type_modele TEXT NOT NULL
-            )
-        """)
-        create_table_if_not_exists("valeurs_modeles_colonnes", """
-            CREATE TABLE IF NOT EXISTS valeurs_modeles_colonnes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                modele_id INTEGER,
-                valeur TEXT NOT NULL,
-                FOREIGN KEY (modele_id) REFERENCES colonnes_modeles(id)
-            )
-        """)
-        create_table_if_not_exists("depots_retraits_banque", """
-            CREATE TABLE IF NOT EXISTS depots_retraits_banque (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                type TEXT NOT NULL,
-                montant REAL NOT NULL,
-                reference TEXT,
-                banque TEXT,
-                pointe INTEGER DEFAULT 0,
-                commentaire TEXT
-            )
-        """)
-        create_table_if_not_exists("historique_clotures", """
-            CREATE TABLE IF NOT EXISTS historique_clotures (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_cloture TEXT NOT NULL
-            )
-        """)
-        create_table_if_not_exists("buvette_articles", """
-            CREATE TABLE IF NOT EXISTS buvette_articles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                categorie TEXT,
-                unite TEXT,
-                contenance TEXT,
-                commentaire TEXT,
-                stock INTEGER DEFAULT 0,
-                purchase_price REAL
-            )
-        """)
-        create_table_if_not_exists("buvette_achats", """
-            CREATE TABLE IF NOT EXISTS buvette_achats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER,
-                date_achat DATE,
-                quantite INTEGER,
-                prix_unitaire REAL,
-                fournisseur TEXT,
-                facture TEXT,
-                exercice TEXT,
-                FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
-            )
-        """)
-        create_table_if_not_exists("buvette_inventaires", """
-            CREATE TABLE IF NOT EXISTS buvette_inventaires (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_inventaire DATE,
-                event_id INTEGER,
-                type_inventaire TEXT CHECK(type_inventaire IN ('avant', 'apres', 'hors_evenement')),
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        create_table_if_not_exists("buvette_inventaire_lignes", """
-            CREATE TABLE IF NOT EXISTS buvette_inventaire_lignes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                inventaire_id INTEGER,
-                article_id INTEGER,
-                quantite INTEGER,
-                FOREIGN KEY (inventaire_id) REFERENCES buvette_inventaires(id),
-                FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
-            )
-        """)
-        create_table_if_not_exists("buvette_mouvements", """
-            CREATE TABLE IF NOT EXISTS buvette_mouvements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER,
-                date_mouvement DATE,
-                type_mouvement TEXT,
-                quantite INTEGER,
-                motif TEXT,
-                event_id INTEGER,
-                FOREIGN KEY (article_id) REFERENCES buvette_articles(id),
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        create_table_if_not_exists("buvette_recettes", """
-            CREATE TABLE IF NOT EXISTS buvette_recettes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                montant REAL,
-                date_recette DATE,
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
+                solde REAL DEFAULT 0
             )
         """)
+    c.execute("SELECT COUNT(*) as n FROM comptes")
+    if c.fetchone()["n"] == 0:
+        c.execute("SELECT solde_report FROM config ORDER BY id DESC LIMIT 1")
+        row = c.fetchone()
+        if row and row["solde_report"] is not None:
+            c.execute("INSERT INTO comptes (name, solde) VALUES (?, ?)", ("Banque Principale", row["solde_report"]))
 
+def upgrade_db_structure():
+    """Migration douce : assure la présence de toutes les colonnes/tables attendues sans perte de données."""
+    from tkinter import messagebox
+    try:
+        conn = get_connection()
+        # Vérification complète quelle que soit la version enregistrée, puis étapes manquantes
+        _upgrade_schema(conn)
+        create_indexes(conn)
         conn.commit()
+        migrate(conn)
         conn.close()
         messagebox.showinfo("Base de données", "La structure de la base a été mise à jour avec succès.")
         logger.info("Structure de la base migrée.")
@@ -271,376 +501,499 @@ def upgrade_db_structure():
         from tkinter import messagebox
         messagebox.showerror("Erreur base", f"Erreur lors de la migration: {e}")
 
+def _create_schema(conn):
+    """Crée toutes les tables du projet si elles sont absentes."""
+    c = conn.cursor()
+    # Schéma complet : Toutes les tables du projet
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS config (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            exercice TEXT,
+            date TEXT,
+            date_fin TEXT,
+            disponible_banque REAL,
+            cloture INTEGER DEFAULT 0,
+            solde_report REAL DEFAULT 0,
+            but_asso TEXT DEFAULT ''
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS comptes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            solde REAL DEFAULT 0
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS retrocessions_ecoles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            montant REAL,
+            ecole TEXT,
+            commentaire TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            parent_id INTEGER,
+            UNIQUE(name),
+            FOREIGN KEY (parent_id) REFERENCES categories(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS membres (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            prenom TEXT NOT NULL,
+            email TEXT,
+            telephone TEXT,
+            cotisation TEXT,
+            commentaire TEXT,
+            statut TEXT,
+            date_adhesion TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            date TEXT,
+            lieu TEXT,
+            description TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            categorie_id INTEGER,
+            quantite INTEGER,
+            seuil_alerte INTEGER,
+            date_peremption TEXT,
+            lot TEXT,
+            commentaire TEXT,
+            FOREIGN KEY (categorie_id) REFERENCES categories(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS dons_subventions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            source TEXT,
+            montant REAL,
+            type TEXT,
+            justificatif TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS depenses_regulieres (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            categorie TEXT,
+            module_id INTEGER,
+            montant REAL,
+            fournisseur TEXT,
+            date_depense TEXT,
+            paye_par TEXT,
+            membre_id INTEGER,
+            statut_remboursement TEXT,
+            statut_reglement TEXT,
+            moyen_paiement TEXT,
+            numero_cheque TEXT,
+            numero_facture TEXT,
+            commentaire TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS depenses_diverses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            categorie TEXT,
+            module_id INTEGER,
+            montant REAL,
+            fournisseur TEXT,
+            date_depense TEXT,
+            paye_par TEXT,
+            membre_id INTEGER,
+            statut_remboursement TEXT,
+            statut_reglement TEXT,
+            moyen_paiement TEXT,
+            numero_cheque TEXT,
+            numero_facture TEXT,
+            commentaire TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS inventaires (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_inventaire TEXT NOT NULL,
+            event_id INTEGER,
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS inventaire_lignes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            inventaire_id INTEGER NOT NULL,
+            stock_id INTEGER NOT NULL,
+            quantite_constatee INTEGER NOT NULL,
+            FOREIGN KEY (inventaire_id) REFERENCES inventaires(id),
+            FOREIGN KEY (stock_id) REFERENCES stock(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS mouvements_stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stock_id INTEGER,
+            date TEXT,
+            type TEXT,
+            quantite INTEGER,
+            prix_achat_total REAL,
+            prix_unitaire REAL,
+            date_peremption TEXT,
+            commentaire TEXT,
+            FOREIGN KEY(stock_id) REFERENCES stock(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_modules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            nom_module TEXT,
+            id_col_total INTEGER,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_module_fields (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER,
+            nom_champ TEXT,
+            type_champ TEXT,
+            prix_unitaire REAL,
+            modele_colonne TEXT,
+            FOREIGN KEY (module_id) REFERENCES event_modules(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS colonnes_modeles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            type_modele TEXT NOT NULL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS valeurs_modeles_colonnes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            modele_id INTEGER,
+            valeur TEXT NOT NULL,
+            FOREIGN KEY (modele_id) REFERENCES colonnes_modeles(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_module_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER,
+            row_index INTEGER,
+            field_id INTEGER,
+            valeur TEXT,
+            FOREIGN KEY (module_id) REFERENCES event_modules(id),
+            FOREIGN KEY (field_id) REFERENCES event_module_fields(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            nom_payeuse TEXT,
+            classe TEXT,
+            mode_paiement TEXT,
+            banque TEXT,
+            numero_cheque TEXT,
+            montant REAL,
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_caisses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            nom_caisse TEXT,
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_caisse_details (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            caisse_id INTEGER,
+            moment TEXT,
+            type TEXT,
+            valeur REAL,
+            quantite INTEGER,
+            FOREIGN KEY (caisse_id) REFERENCES event_caisses(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_recettes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            source TEXT,
+            montant REAL,
+            commentaire TEXT,
+            module_id INTEGER,
+            FOREIGN KEY (event_id) REFERENCES events(id),
+            FOREIGN KEY (module_id) REFERENCES event_modules(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_depenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            categorie TEXT,
+            montant REAL,
+            commentaire TEXT,
+            module_id INTEGER,
+            fournisseur TEXT,
+            date_depense TEXT,
+            paye_par TEXT,
+            membre_id INTEGER,
+            statut_remboursement TEXT,
+            statut_reglement TEXT,
+            moyen_paiement TEXT,
+            numero_cheque TEXT,
+            numero_facture TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id),
+            FOREIGN KEY (module_id) REFERENCES event_modules(id),
+            FOREIGN KEY (membre_id) REFERENCES membres(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS fournisseurs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS depots_retraits_banque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,
+            montant REAL NOT NULL,
+            reference TEXT,
+            banque TEXT,
+            pointe INTEGER DEFAULT 0,
+            commentaire TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS historique_clotures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_cloture TEXT NOT NULL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS buvette_articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            categorie TEXT,
+            unite TEXT,
+            contenance TEXT,
+            commentaire TEXT,
+            stock INTEGER DEFAULT 0,
+            purchase_price REAL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS buvette_achats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER,
+            date_achat DATE,
+            quantite INTEGER,
+            prix_unitaire REAL,
+            fournisseur TEXT,
+            facture TEXT,
+            exercice TEXT,
+            FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS buvette_inventaires (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_inventaire DATE,
+            event_id INTEGER,
+            type_inventaire TEXT CHECK(type_inventaire IN ('avant', 'apres', 'hors_evenement')),
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS buvette_inventaire_lignes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            inventaire_id INTEGER,
+            article_id INTEGER,
+            quantite INTEGER,
+            FOREIGN KEY (inventaire_id) REFERENCES buvette_inventaires(id),
+            FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS buvette_mouvements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER,
+            date_mouvement DATE,
+            type_mouvement TEXT,
+            quantite INTEGER,
+            motif TEXT,
+            event_id INTEGER,
+            FOREIGN KEY (article_id) REFERENCES buvette_articles(id),
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS buvette_recettes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER,
+            montant REAL,
+            date_recette DATE,
+            commentaire TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+    """)
+    c.execute("DROP TABLE IF EXISTS members;")
+
 def init_db():
     """Crée toutes les tables du projet si elles sont absentes (pour une base vierge)."""
     try:
         conn = get_connection()
-        c = conn.cursor()
-        # Schéma complet : Toutes les tables du projet
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS config (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                exercice TEXT,
-                date TEXT,
-                date_fin TEXT,
-                disponible_banque REAL,
-                cloture INTEGER DEFAULT 0,
-                solde_report REAL DEFAULT 0,
-                but_asso TEXT DEFAULT ''
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS comptes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                solde REAL DEFAULT 0
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS retrocessions_ecoles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                montant REAL,
-                ecole TEXT,
-                commentaire TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                parent_id INTEGER,
-                UNIQUE(name),
-                FOREIGN KEY (parent_id) REFERENCES categories(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS membres (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                prenom TEXT NOT NULL,
-                email TEXT,
-                telephone TEXT,
-                cotisation TEXT,
-                commentaire TEXT,
-                statut TEXT,
-                date_adhesion TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                date TEXT,
-                lieu TEXT,
-                description TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS stock (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                categorie_id INTEGER,
-                quantite INTEGER,
-                seuil_alerte INTEGER,
-                date_peremption TEXT,
-                lot TEXT,
-                commentaire TEXT,
-                FOREIGN KEY (categorie_id) REFERENCES categories(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS dons_subventions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                source TEXT,
-                montant REAL,
-                type TEXT,
-                justificatif TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS depenses_regulieres (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                categorie TEXT,
-                module_id INTEGER,
-                montant REAL,
-                fournisseur TEXT,
-                date_depense TEXT,
-                paye_par TEXT,
-                membre_id INTEGER,
-                statut_remboursement TEXT,
-                statut_reglement TEXT,
-                moyen_paiement TEXT,
-                numero_cheque TEXT,
-                numero_facture TEXT,
-                commentaire TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS depenses_diverses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                categorie TEXT,
-                module_id INTEGER,
-                montant REAL,
-                fournisseur TEXT,
-                date_depense TEXT,
-                paye_par TEXT,
-                membre_id INTEGER,
-                statut_remboursement TEXT,
-                statut_reglement TEXT,
-                moyen_paiement TEXT,
-                numero_cheque TEXT,
-                numero_facture TEXT,
-                commentaire TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS inventaires (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_inventaire TEXT NOT NULL,
-                event_id INTEGER,
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS inventaire_lignes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                inventaire_id INTEGER NOT NULL,
-                stock_id INTEGER NOT NULL,
-                quantite_constatee INTEGER NOT NULL,
-                FOREIGN KEY (inventaire_id) REFERENCES inventaires(id),
-                FOREIGN KEY (stock_id) REFERENCES stock(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS mouvements_stock (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                stock_id INTEGER,
-                date TEXT,
-                type TEXT,
-                quantite INTEGER,
-                prix_achat_total REAL,
-                prix_unitaire REAL,
-                date_peremption TEXT,
-                commentaire TEXT,
-                FOREIGN KEY(stock_id) REFERENCES stock(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_modules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                nom_module TEXT,
-                id_col_total INTEGER,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_module_fields (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                module_id INTEGER,
-                nom_champ TEXT,
-                type_champ TEXT,
-                prix_unitaire REAL,
-                modele_colonne TEXT,
-                FOREIGN KEY (module_id) REFERENCES event_modules(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS colonnes_modeles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                type_modele TEXT NOT NULL
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS valeurs_modeles_colonnes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                modele_id INTEGER,
-                valeur TEXT NOT NULL,
-                FOREIGN KEY (modele_id) REFERENCES colonnes_modeles(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_module_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                module_id INTEGER,
-                row_index INTEGER,
-                field_id INTEGER,
-                valeur TEXT,
-                FOREIGN KEY (module_id) REFERENCES event_modules(id),
-                FOREIGN KEY (field_id) REFERENCES event_module_fields(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                nom_payeuse TEXT,
-                classe TEXT,
-                mode_paiement TEXT,
-                banque TEXT,
-                numero_cheque TEXT,
-                montant REAL,
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_caisses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                nom_caisse TEXT,
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_caisse_details (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                caisse_id INTEGER,
-                moment TEXT,
-                type TEXT,
-                valeur REAL,
-                quantite INTEGER,
-                FOREIGN KEY (caisse_id) REFERENCES event_caisses(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_recettes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                source TEXT,
-                montant REAL,
-                commentaire TEXT,
-                module_id INTEGER,
-                FOREIGN KEY (event_id) REFERENCES events(id),
-                FOREIGN KEY (module_id) REFERENCES event_modules(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS event_depenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                categorie TEXT,
-                montant REAL,
-                commentaire TEXT,
-                module_id INTEGER,
-                fournisseur TEXT,
-                date_depense TEXT,
-                paye_par TEXT,
-                membre_id INTEGER,
-                statut_remboursement TEXT,
-                statut_reglement TEXT,
-                moyen_paiement TEXT,
-                numero_cheque TEXT,
-                numero_facture TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id),
-                FOREIGN KEY (module_id) REFERENCES event_modules(id),
-                FOREIGN KEY (membre_id) REFERENCES membres(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS fournisseurs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS depots_retraits_banque (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                type TEXT NOT NULL,
-                montant REAL NOT NULL,
-                reference TEXT,
-                banque TEXT,
-                pointe INTEGER DEFAULT 0,
-                commentaire TEXT
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS historique_clotures (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_cloture TEXT NOT NULL
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS buvette_articles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                categorie TEXT,
-                unite TEXT,
-                contenance TEXT,
-                commentaire TEXT,
-                stock INTEGER DEFAULT 0,
-                purchase_price REAL
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS buvette_achats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER,
-                date_achat DATE,
-                quantite INTEGER,
-                prix_unitaire REAL,
-                fournisseur TEXT,
-                facture TEXT,
-                exercice TEXT,
-                FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS buvette_inventaires (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_inventaire DATE,
-                event_id INTEGER,
-                type_inventaire TEXT CHECK(type_inventaire IN ('avant', 'apres', 'hors_evenement')),
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS buvette_inventaire_lignes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                inventaire_id INTEGER,
-                article_id INTEGER,
-                quantite INTEGER,
-                FOREIGN KEY (inventaire_id) REFERENCES buvette_inventaires(id),
-                FOREIGN KEY (article_id) REFERENCES buvette_articles(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS buvette_mouvements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                article_id INTEGER,
-                date_mouvement DATE,
-                type_mouvement TEXT,
-                quantite INTEGER,
-                motif TEXT,
-                event_id INTEGER,
-                FOREIGN KEY (article_id) REFERENCES buvette_articles(id),
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS buvette_recettes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER,
-                montant REAL,
-                date_recette DATE,
-                commentaire TEXT,
-                FOREIGN KEY (event_id) REFERENCES events(id)
-            )
-        """)
-        c.execute("DROP TABLE IF EXISTS members;")
-        conn.commit()
+        migrate(conn)
         conn.close()
         logger.info("Tables créées/mises à jour.")
     except Exception as e:
         handle_exception(e, "Erreur lors de l'initialisation de la base")
 
+# Étapes de migration ordonnées : (version, description, fonction(conn)).
+# La version appliquée est enregistrée dans PRAGMA user_version ; une base à jour
+# ne coûte au démarrage qu'une lecture d'entier. Chaque étape doit rester
+# idempotente (les bases antérieures au versionnage sont en version 0).
+# Toute évolution de schéma ajoute une étape en fin de liste.
+def _migration_base_schema(conn):
+    _create_schema(conn)
+    _upgrade_schema(conn)
+
+def _migration_ledger(conn):
+    from db.ledger import create_ledger_schema, rebuild_ledger
+    create_ledger_schema(conn)
+    rebuild_ledger(conn)
+
+def _migration_ledger_checkpoints(conn):
+    # Table et triggers des points de contrôle seuls : le grand livre, déjà
+    # construit à l'étape 3, n'est pas reconstruit
+    from db.ledger import create_checkpoints_schema, refresh_checkpoints
+    create_checkpoints_schema(conn)
+    refresh_checkpoints(conn)
+
+def _migration_event_totals(conn):
+    from db.event_totals import create_event_totals_schema, rebuild_event_totals
+    create_event_totals_schema(conn)
+    rebuild_event_totals(conn)
+
+def _migration_caisse_totals(conn):
+    # Fonds de caisse seuls, puis le gain des caisses de event_totals : les
+    # autres totaux, calculés à l'étape 5, ne sont pas recalculés
+    from db.event_totals import create_caisse_totals_schema, rebuild_caisse_totals
+    create_caisse_totals_schema(conn)
+    rebuild_caisse_totals(conn)
+
+def _migration_module_values(conn):
+    from db.module_values import create_module_values_schema
+    create_module_values_schema(conn)
+
+def _migration_module_rows(conn):
+    c = conn.cursor()
+    columns = {r[1] for r in c.execute("PRAGMA table_info(event_modules)")}
+    if columns and "storage" not in columns:
+        c.execute("ALTER TABLE event_modules ADD COLUMN storage TEXT NOT NULL DEFAULT 'cellules'")
+    # Stockage compact : une ligne de tableau = un enregistrement, valeurs JSON par id de colonne
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_module_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            module_id INTEGER NOT NULL,
+            row_index INTEGER NOT NULL,
+            valeurs TEXT NOT NULL DEFAULT '{}',
+            UNIQUE (module_id, row_index),
+            FOREIGN KEY (module_id) REFERENCES event_modules(id)
+        )
+    """)
+
+def _migration_search_index(conn):
+    from db.search_index import create_search_schema, rebuild_search_index
+    create_search_schema(conn)
+    rebuild_search_index(conn)
+
+MIGRATIONS = [
+    (1, "Tables et colonnes de base", _migration_base_schema),
+    (2, "Index secondaires", create_indexes),
+    (3, "Grand livre matérialisé (ledger_entries)", _migration_ledger),
+    (4, "Points de contrôle du solde progressif (ledger_checkpoints)", _migration_ledger_checkpoints),
+    (5, "Totaux financiers par événement (event_totals)", _migration_event_totals),
+    (6, "Fonds de caisse matérialisés (event_caisse_totals)", _migration_caisse_totals),
+    (7, "Valeur numérique des cellules de modules (valeur_num)", _migration_module_values),
+    (8, "Stockage compact des modules (event_module_rows)", _migration_module_rows),
+    (9, "Index de recherche plein texte (search_index)", _migration_search_index),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn=None):
+    """Version de schéma enregistrée dans la base (PRAGMA user_version)."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        if own:
+            conn.close()
+
+def schema_is_current(conn=None):
+    """True si la base est à la version de schéma attendue par le code."""
+    return get_schema_version(conn) >= SCHEMA_VERSION
+
+def migrate(conn=None):
+    """
+    Applique, dans l'ordre, les étapes de MIGRATIONS non encore appliquées.
+    Chaque étape est validée avec sa version : une interruption reprend à
+    l'étape suivante au prochain lancement. Retourne les versions appliquées.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        current = get_schema_version(conn)
+        if current > SCHEMA_VERSION:
+            logger.warning(f"Base en version de schéma {current}, plus récente que le code ({SCHEMA_VERSION}).")
+            return []
+        applied = []
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(version)
+            logger.info(f"Migration {version} appliquée : {description}")
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own:
+            conn.close()
+
 def is_first_launch():
     """Retourne True si la table config est vide (premier lancement)."""
     try:
@@ -676,6 +1029,7 @@ def save_init_info(exercice, date, date_fin, disponible_banque):
 
 def get_df_or_sql(table_or_query):
     """Retourne un DataFrame pandas depuis une table ou une requête SQL."""
+    import pandas as pd
     conn = None
     try:
         conn = get_connection()
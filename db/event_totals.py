@@ -0,0 +1,227 @@
+"""
+Totaux financiers par événement matérialisés (table event_totals).
+
+Une ligne par événement : recettes, dépenses, gain des caisses et nombre de
+paiements. Des triggers sur event_recettes, event_depenses, event_payments,
+event_caisses et event_caisse_totals recalculent le total concerné pour le
+seul événement touché (agrégat indexé sur event_id). Les listes d'événements
+et les bilans lisent ainsi une ligne par événement.
+
+Les fonds de caisse sont tenus de la même façon dans event_caisse_totals
+(caisse_id, fond_debut, fond_fin) : une modification de event_caisse_details ne
+recalcule que le moment concerné de sa caisse (index (caisse_id, moment)), puis
+le gain des caisses de l'événement à partir de ces totaux, sans dépendre du
+nombre de caisses ni de leur détail.
+
+rebuild_event_totals() répare/reconstruit les deux tables (voir scripts/rebuild_derived.py) ;
+rebuild_caisse_totals() ne reconstruit que les fonds de caisse et le gain des caisses.
+"""
+
+from db.db import get_connection
+from utils.app_logger import get_logger
+
+logger = get_logger("event_totals")
+
+# Expressions SQL de recalcul, paramétrées par l'identifiant d'événement
+_TOTALS_SQL = {
+    "recettes": "(SELECT COALESCE(SUM(montant), 0) FROM event_recettes WHERE event_id = {e})",
+    "depenses": "(SELECT COALESCE(SUM(montant), 0) FROM event_depenses WHERE event_id = {e})",
+    "nb_payments": "(SELECT COUNT(*) FROM event_payments WHERE event_id = {e})",
+    # Gain des caisses : fond de fin - fond de début, depuis event_caisse_totals
+    "caisse_gain": (
+        "(SELECT COALESCE(SUM(t.fond_fin - t.fond_debut), 0) "
+        "FROM event_caisse_totals t JOIN event_caisses c ON c.id = t.caisse_id WHERE c.event_id = {e})"
+    ),
+}
+
+# Fond d'une caisse à un moment ('debut' ou 'fin') : chèques comptés à leur valeur
+_FOND_SQL = (
+    "(SELECT COALESCE(SUM(CASE WHEN type = 'cheque' THEN valeur ELSE valeur * quantite END), 0) "
+    "FROM event_caisse_details WHERE caisse_id = {c} AND moment = '{moment}')"
+)
+
+# table -> (colonne recalculée, expression de l'événement concerné pour une ligne {row})
+_TRIGGER_SOURCES = {
+    "event_recettes": ("recettes", "{row}.event_id"),
+    "event_depenses": ("depenses", "{row}.event_id"),
+    "event_payments": ("nb_payments", "{row}.event_id"),
+    "event_caisses": ("caisse_gain", "{row}.event_id"),
+    "event_caisse_totals": ("caisse_gain", "(SELECT event_id FROM event_caisses WHERE id = {row}.caisse_id)"),
+}
+
+
+def _refresh_sql(column, event_expr):
+    """Instructions de trigger : ligne event_totals assurée puis colonne recalculée."""
+    return (
+        f"INSERT OR IGNORE INTO event_totals (event_id) SELECT id FROM events WHERE id = {event_expr}; "
+        f"UPDATE event_totals SET {column} = {_TOTALS_SQL[column].format(e='event_totals.event_id')}, "
+        f"updated_at = datetime('now') WHERE event_id = {event_expr};"
+    )
+
+
+def _refresh_fond_sql(caisse_expr, moment_expr):
+    """Instructions de trigger : ligne event_caisse_totals assurée puis fond du moment recalculé."""
+    return (
+        f"INSERT OR IGNORE INTO event_caisse_totals (caisse_id) SELECT id FROM event_caisses WHERE id = {caisse_expr}; "
+        f"UPDATE event_caisse_totals SET "
+        f"fond_debut = CASE WHEN {moment_expr} = 'debut' THEN {_FOND_SQL.format(c='event_caisse_totals.caisse_id', moment='debut')} ELSE fond_debut END, "
+        f"fond_fin = CASE WHEN {moment_expr} = 'fin' THEN {_FOND_SQL.format(c='event_caisse_totals.caisse_id', moment='fin')} ELSE fond_fin END "
+        f"WHERE caisse_id = {caisse_expr} AND {moment_expr} IN ('debut', 'fin');"
+    )
+
+
+def _caisse_totals_triggers():
+    return {
+        "trg_caisse_totals_caisses_ins": (
+            "AFTER INSERT ON event_caisses BEGIN "
+            "INSERT OR IGNORE INTO event_caisse_totals (caisse_id) VALUES (NEW.id); END"
+        ),
+        "trg_caisse_totals_caisses_del": (
+            "AFTER DELETE ON event_caisses BEGIN DELETE FROM event_caisse_totals WHERE caisse_id = OLD.id; END"
+        ),
+        "trg_caisse_totals_details_ins": (
+            f"AFTER INSERT ON event_caisse_details BEGIN {_refresh_fond_sql('NEW.caisse_id', 'NEW.moment')} END"
+        ),
+        "trg_caisse_totals_details_upd": (
+            "AFTER UPDATE ON event_caisse_details BEGIN "
+            f"{_refresh_fond_sql('OLD.caisse_id', 'OLD.moment')} {_refresh_fond_sql('NEW.caisse_id', 'NEW.moment')} END"
+        ),
+        "trg_caisse_totals_details_del": (
+            f"AFTER DELETE ON event_caisse_details BEGIN {_refresh_fond_sql('OLD.caisse_id', 'OLD.moment')} END"
+        ),
+    }
+
+
+def _event_totals_triggers():
+    triggers = {
+        "trg_event_totals_events_ins": (
+            "AFTER INSERT ON events BEGIN INSERT OR IGNORE INTO event_totals (event_id) VALUES (NEW.id); END"
+        ),
+        "trg_event_totals_events_del": (
+            "AFTER DELETE ON events BEGIN DELETE FROM event_totals WHERE event_id = OLD.id; END"
+        ),
+    }
+    for table, (column, event_expr) in _TRIGGER_SOURCES.items():
+        new_sql = _refresh_sql(column, event_expr.format(row="NEW"))
+        old_sql = _refresh_sql(column, event_expr.format(row="OLD"))
+        triggers[f"trg_event_totals_{table}_ins"] = f"AFTER INSERT ON {table} BEGIN {new_sql} END"
+        triggers[f"trg_event_totals_{table}_upd"] = f"AFTER UPDATE ON {table} BEGIN {old_sql} {new_sql} END"
+        triggers[f"trg_event_totals_{table}_del"] = f"AFTER DELETE ON {table} BEGIN {old_sql} END"
+    return triggers
+
+
+def _recreate_triggers(c, pattern, triggers):
+    """Remplace les triggers nommés selon pattern (versions précédentes comprises) par triggers."""
+    existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    old_triggers = c.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND name GLOB ?", (pattern,)
+    ).fetchall()
+    for (name,) in old_triggers:
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for name, body in triggers.items():
+        table = body.split(" ON ", 1)[1].split()[0]
+        if table in existing:
+            c.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def create_caisse_totals_schema(conn):
+    """Crée (ou recrée) la table event_caisse_totals et ses triggers."""
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_caisse_totals (
+            caisse_id INTEGER PRIMARY KEY,
+            fond_debut REAL NOT NULL DEFAULT 0,
+            fond_fin REAL NOT NULL DEFAULT 0
+        )
+    """)
+    _recreate_triggers(c, "trg_caisse_totals_*", _caisse_totals_triggers())
+
+
+def create_event_totals_schema(conn):
+    """Crée (ou recrée) les tables event_totals, event_caisse_totals et leurs triggers."""
+    create_caisse_totals_schema(conn)
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS event_totals (
+            event_id INTEGER PRIMARY KEY,
+            recettes REAL NOT NULL DEFAULT 0,
+            depenses REAL NOT NULL DEFAULT 0,
+            caisse_gain REAL NOT NULL DEFAULT 0,
+            nb_payments INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+    """)
+    _recreate_triggers(c, "trg_event_totals_*", _event_totals_triggers())
+
+
+def _fill_caisse_totals(c):
+    c.execute("DELETE FROM event_caisse_totals")
+    c.execute(
+        "INSERT INTO event_caisse_totals (caisse_id, fond_debut, fond_fin) "
+        f"SELECT ec.id, {_FOND_SQL.format(c='ec.id', moment='debut')}, {_FOND_SQL.format(c='ec.id', moment='fin')} "
+        "FROM event_caisses ec"
+    )
+    return c.execute("SELECT COUNT(*) FROM event_caisse_totals").fetchone()[0]
+
+
+def rebuild_caisse_totals(conn):
+    """
+    Recalcule event_caisse_totals puis le seul gain des caisses dans event_totals
+    (les autres totaux ne sont pas relus). Retourne le nombre de caisses.
+    """
+    c = conn.cursor()
+    count = _fill_caisse_totals(c)
+    c.execute(
+        f"UPDATE event_totals SET caisse_gain = {_TOTALS_SQL['caisse_gain'].format(e='event_totals.event_id')}, "
+        "updated_at = datetime('now')"
+    )
+    logger.info(f"Fonds de caisse reconstruits : {count} caisse(s).")
+    return count
+
+
+def rebuild_event_totals(conn=None):
+    """Recalcule event_caisse_totals puis event_totals. Retourne le nombre d'événements."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        c = conn.cursor()
+        _fill_caisse_totals(c)
+        c.execute("DELETE FROM event_totals")
+        columns = ", ".join(_TOTALS_SQL)
+        values = ", ".join(expr.format(e="e.id") for expr in _TOTALS_SQL.values())
+        c.execute(
+            f"INSERT INTO event_totals (event_id, {columns}, updated_at) "
+            f"SELECT e.id, {values}, datetime('now') FROM events e"
+        )
+        count = c.execute("SELECT COUNT(*) FROM event_totals").fetchone()[0]
+        if own:
+            conn.commit()
+        logger.info(f"Totaux événements reconstruits : {count} événement(s).")
+        return count
+    finally:
+        if own:
+            conn.close()
+
+
+def get_event_totals(event_id):
+    """Ligne event_totals d'un événement (None si l'événement n'existe pas)."""
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM event_totals WHERE event_id = ?", (event_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def list_caisse_totals(event_id):
+    """Caisses d'un événement avec leurs fonds de début et de fin (une requête)."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT c.id, c.nom_caisse, c.commentaire,
+               COALESCE(t.fond_debut, 0) AS fond_debut, COALESCE(t.fond_fin, 0) AS fond_fin
+        FROM event_caisses c
+        LEFT JOIN event_caisse_totals t ON t.caisse_id = c.id
+        WHERE c.event_id = ?
+        ORDER BY c.id
+    """, (event_id,)).fetchall()
+    conn.close()
+    return rows
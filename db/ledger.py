@@ -0,0 +1,329 @@
+"""
+Grand livre matérialisé (table ledger_entries) derrière le Journal Général.
+
+Chaque recette/dépense des tables sources a une ligne dans ledger_entries avec
+une date normalisée (AAAA-MM-JJ), un montant signé, un libellé et un
+justificatif. Des triggers SQLite tiennent la table à jour à chaque
+INSERT/UPDATE/DELETE : le journal, les dernières opérations du tableau de bord
+et les filtres par période deviennent de simples parcours de l'index (date, id).
+
+Solde progressif : ledger_checkpoints mémorise, pour chaque mois (préfixe
+AAAA-MM de la date), le cumul des montants antérieurs à ce mois. Le solde à une
+date est donc un point de contrôle plus la somme des écritures du mois entamé.
+Un trigger supprime les points de contrôle postérieurs au mois modifié ; ils
+sont recalculés à la demande, à partir du dernier point encore valide.
+
+rebuild_ledger() reconstruit la table à partir des sources (bases existantes,
+réparation) ; voir aussi scripts/rebuild_derived.py.
+"""
+
+import sqlite3
+from db.db import get_connection
+from utils.app_logger import get_logger
+
+logger = get_logger("ledger")
+
+# (table source, type affiché, colonne libellé, colonne justificatif, signe, colonne date)
+# colonne date = None : écriture d'événement, datée par events.date
+LEDGER_SOURCES = [
+    ("dons_subventions", "Recette", "source", "justificatif", 1, "date"),
+    ("event_recettes", "Recette évènement", "source", "commentaire", 1, None),
+    ("depenses_regulieres", "Dépense régulière", "categorie", "commentaire", -1, "date_depense"),
+    ("depenses_diverses", "Dépense diverse", "commentaire", "commentaire", -1, "date_depense"),
+    ("event_depenses", "Dépense évènement", "categorie", "commentaire", -1, None),
+]
+
+LEDGER_COLUMNS = ("source_table", "source_id", "event_id", "date", "type", "libelle", "montant", "justificatif")
+
+
+def sql_normalized_date(expr):
+    """
+    Expression SQL convertissant JJ/MM/AAAA (ou JJ-MM-AAAA, JJ.MM.AAAA) en AAAA-MM-JJ.
+    Une date absente devient '' (jamais NULL : les comparaisons de période restent indexables).
+    """
+    d = f"trim({expr})"
+    return (
+        f"COALESCE(CASE WHEN length({d}) = 10 AND substr({d}, 3, 1) IN ('/', '-', '.') "
+        f"THEN substr({d}, 7, 4) || '-' || substr({d}, 4, 2) || '-' || substr({d}, 1, 2) "
+        f"ELSE {d} END, '')"
+    )
+
+
+def _entry_select(source, row):
+    """SELECT produisant l'écriture du grand livre pour la ligne `row` (NEW ou alias)."""
+    table, label, libelle_col, justif_col, sign, date_col = source
+    if date_col is None:
+        event_id = f"{row}.event_id"
+        date_sql = sql_normalized_date("e.date")
+    else:
+        event_id = "NULL"
+        date_sql = sql_normalized_date(f"{row}.{date_col}")
+    return (
+        f"SELECT '{table}', {row}.id, {event_id}, {date_sql}, '{label}', {row}.{libelle_col}, "
+        f"{sign} * COALESCE({row}.montant, 0), {row}.{justif_col}"
+    )
+
+
+_UPSERT = (
+    "ON CONFLICT(source_table, source_id) DO UPDATE SET event_id = excluded.event_id, "
+    "date = excluded.date, type = excluded.type, libelle = excluded.libelle, "
+    "montant = excluded.montant, justificatif = excluded.justificatif"
+)
+
+
+def _source_triggers(source):
+    table, _, _, _, _, date_col = source
+    cols = ", ".join(LEDGER_COLUMNS)
+    if date_col is None:
+        # Comme l'ancienne jointure du journal : pas d'écriture sans événement existant
+        from_new = "FROM events e WHERE e.id = NEW.event_id"
+        orphan_cleanup = (
+            f"DELETE FROM ledger_entries WHERE source_table = '{table}' AND source_id = NEW.id "
+            f"AND NOT EXISTS (SELECT 1 FROM events WHERE id = NEW.event_id);"
+        )
+    else:
+        from_new = "WHERE true"
+        orphan_cleanup = ""
+    upsert = f"INSERT INTO ledger_entries ({cols}) {_entry_select(source, 'NEW')} {from_new} {_UPSERT};"
+    return {
+        f"trg_ledger_{table}_ins": f"AFTER INSERT ON {table} BEGIN {upsert} END",
+        f"trg_ledger_{table}_upd": (
+            f"AFTER UPDATE ON {table} BEGIN "
+            f"DELETE FROM ledger_entries WHERE source_table = '{table}' AND source_id = OLD.id AND OLD.id IS NOT NEW.id; "
+            f"{orphan_cleanup} {upsert} END"
+        ),
+        f"trg_ledger_{table}_del": (
+            f"AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM ledger_entries WHERE source_table = '{table}' AND source_id = OLD.id; END"
+        ),
+    }
+
+
+def _ledger_triggers():
+    triggers = {}
+    for source in LEDGER_SOURCES:
+        triggers.update(_source_triggers(source))
+    triggers["trg_ledger_events_upd"] = (
+        "AFTER UPDATE OF id, date ON events BEGIN "
+        f"UPDATE ledger_entries SET event_id = NEW.id, date = {sql_normalized_date('NEW.date')} "
+        "WHERE event_id = OLD.id; END"
+    )
+    triggers["trg_ledger_events_del"] = (
+        "AFTER DELETE ON events BEGIN DELETE FROM ledger_entries WHERE event_id = OLD.id; END"
+    )
+    return triggers
+
+
+def _checkpoint_triggers():
+    # Invalidation des points de contrôle à partir du mois modifié
+    triggers = {}
+    invalidate = "DELETE FROM ledger_checkpoints WHERE month > substr({row}.date, 1, 7);"
+    triggers["trg_ledger_checkpoints_ins"] = (
+        f"AFTER INSERT ON ledger_entries BEGIN {invalidate.format(row='NEW')} END"
+    )
+    triggers["trg_ledger_checkpoints_upd"] = (
+        "AFTER UPDATE OF date, montant ON ledger_entries BEGIN "
+        f"{invalidate.format(row='OLD')} {invalidate.format(row='NEW')} END"
+    )
+    triggers["trg_ledger_checkpoints_del"] = (
+        f"AFTER DELETE ON ledger_entries BEGIN {invalidate.format(row='OLD')} END"
+    )
+    return triggers
+
+
+def _create_triggers(c, triggers):
+    existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for name, body in triggers.items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        table = body.split(" ON ", 1)[1].split()[0]
+        if table in existing:
+            c.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def create_ledger_schema(conn):
+    """Crée (ou recrée) la table ledger_entries, ses index et ses triggers, ainsi que ledger_checkpoints."""
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_table TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            event_id INTEGER,
+            date TEXT NOT NULL DEFAULT '',
+            type TEXT NOT NULL,
+            libelle TEXT,
+            montant REAL NOT NULL DEFAULT 0,
+            justificatif TEXT,
+            UNIQUE (source_table, source_id)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_ledger_entries_date ON ledger_entries (date, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_ledger_entries_event ON ledger_entries (event_id)")
+    _create_triggers(c, _ledger_triggers())
+    create_checkpoints_schema(conn)
+
+
+def create_checkpoints_schema(conn):
+    """Crée (ou recrée) la table ledger_checkpoints et ses triggers d'invalidation, sans toucher à ledger_entries."""
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+            month TEXT PRIMARY KEY,
+            solde_avant REAL NOT NULL
+        )
+    """)
+    _create_triggers(c, _checkpoint_triggers())
+
+
+def rebuild_ledger(conn=None):
+    """Reconstruit entièrement ledger_entries à partir des tables sources. Retourne le nombre d'écritures."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        c = conn.cursor()
+        existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        c.execute("DELETE FROM ledger_entries")
+        c.execute("DELETE FROM ledger_checkpoints")
+        cols = ", ".join(LEDGER_COLUMNS)
+        for source in LEDGER_SOURCES:
+            table, _, _, _, _, date_col = source
+            if table not in existing:
+                continue
+            if date_col is None:
+                from_sql = f"FROM {table} r JOIN events e ON e.id = r.event_id"
+            else:
+                from_sql = f"FROM {table} r"
+            c.execute(f"INSERT INTO ledger_entries ({cols}) {_entry_select(source, 'r')} {from_sql} ORDER BY r.id")
+        count = c.execute("SELECT COUNT(*) FROM ledger_entries").fetchone()[0]
+        if own:
+            conn.commit()
+        logger.info(f"Grand livre reconstruit : {count} écriture(s).")
+        return count
+    finally:
+        if own:
+            conn.close()
+
+
+def refresh_checkpoints(conn):
+    """
+    Recalcule les points de contrôle manquants, à partir du dernier encore valide :
+    seules les écritures de ce mois et des suivants sont relues.
+    """
+    last = conn.execute("SELECT month, solde_avant FROM ledger_checkpoints ORDER BY month DESC LIMIT 1").fetchone()
+    start, running = (last[0], last[1]) if last else ("", 0.0)
+    months = conn.execute("""
+        SELECT substr(date, 1, 7) AS month, SUM(montant) FROM ledger_entries
+        WHERE date >= ? GROUP BY month ORDER BY month
+    """, (start,)).fetchall()
+    checkpoints = []
+    for month, total in months:
+        checkpoints.append((month, running))
+        running += total or 0
+    conn.executemany("INSERT OR REPLACE INTO ledger_checkpoints (month, solde_avant) VALUES (?, ?)", checkpoints)
+    return len(checkpoints)
+
+
+def balance_before(date, entry_id=None, conn=None):
+    """
+    Cumul des montants des écritures antérieures à `date` (AAAA-MM-JJ), ou antérieures
+    à l'écriture (date, entry_id) si entry_id est fourni (pagination du journal).
+    Point de contrôle du mois + somme des écritures du mois jusqu'à la date.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        in_transaction = conn.in_transaction
+        try:
+            refresh_checkpoints(conn)
+            # Les points de contrôle sont un cache : validés seuls, jamais avec le travail de l'appelant
+            if not in_transaction and conn.in_transaction:
+                conn.commit()
+        except sqlite3.OperationalError as e:
+            # Connexion en lecture seule (profil "report") : les points valides existants suffisent
+            logger.warning(f"Points de contrôle non mis à jour : {e}")
+        cp = conn.execute(
+            "SELECT month, solde_avant FROM ledger_checkpoints WHERE month <= substr(?, 1, 7) ORDER BY month DESC LIMIT 1",
+            (date,),
+        ).fetchone()
+        start, solde = (cp[0], cp[1]) if cp else ("", 0.0)
+        if entry_id is None:
+            tail = conn.execute(
+                "SELECT COALESCE(SUM(montant), 0) FROM ledger_entries WHERE date >= ? AND date < ?", (start, date)
+            ).fetchone()[0]
+        else:
+            tail = conn.execute(
+                "SELECT COALESCE(SUM(montant), 0) FROM ledger_entries WHERE date >= ? AND (date, id) < (?, ?)",
+                (start, date, entry_id),
+            ).fetchone()[0]
+        return solde + tail
+    finally:
+        if own:
+            conn.close()
+
+
+def list_entries(date_from=None, date_to=None, solde_initial=0.0):
+    """
+    Écritures du grand livre par ordre chronologique, bornes de dates (AAAA-MM-JJ) incluses,
+    avec le solde progressif (colonne solde) calculé par une fonction de fenêtre SQL à partir
+    de solde_initial, le solde avant la première écriture de la période (voir balance_before).
+    """
+    clauses, params = [], []
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        # '~' après la borne : inclut les dates de la journée suivies d'une heure
+        clauses.append("date <= ? || '~'")
+        params.append(date_to)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = get_connection()
+    rows = conn.execute(f"""
+        SELECT date, type, libelle, montant, justificatif,
+               ? + SUM(montant) OVER (ORDER BY date, id ROWS UNBOUNDED PRECEDING) AS solde
+        FROM ledger_entries {where}
+        ORDER BY date, id
+    """, [solde_initial] + params).fetchall()
+    conn.close()
+    return rows
+
+
+def last_entries(limit=5):
+    """Les `limit` écritures les plus récentes."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT date, type, libelle, montant, justificatif FROM ledger_entries ORDER BY date DESC, id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def ledger_source():
+    """
+    Source paginée du Journal Général (ui/virtual_treeview.py), triée par (date, id).
+    La recherche passe par l'index plein texte (préfixes, sans accents).
+    """
+    from db.paging import SqlDataSource
+    from db.search_index import search_filter
+    return SqlDataSource(
+        columns=[
+            ("date", "date"), ("type", "type"), ("libelle", "libelle"),
+            ("montant", "montant"), ("justificatif", "justificatif"),
+        ],
+        from_sql="FROM ledger_entries",
+        key="id",
+        order_by=[("date", False)],
+        search_sql=lambda text: search_filter(text, "ecriture"),
+    )
+
+
+def period_filters(date_from=None, date_to=None):
+    """Filtres SQL d'une période (bornes AAAA-MM-JJ incluses), pour SqlDataSource.set_filters."""
+    filters = []
+    if date_from:
+        filters.append(("date >= ?", (date_from,)))
+    if date_to:
+        filters.append(("date <= ? || '~'", (date_to,)))
+    return filters
@@ -0,0 +1,63 @@
+"""
+Valeur numérique des cellules de modules (colonne event_module_data.valeur_num).
+
+event_module_data.valeur est du texte saisi librement ("12", "2,50", "1 200,5",
+"Martin"...). valeur_num (REAL, NULL si la valeur n'est pas un nombre) est une
+colonne calculée GENERATED ALWAYS AS (...) VIRTUAL qui accepte la virgule
+décimale et les espaces de milliers : aucun trigger ni écriture
+supplémentaire, et tout INSERT ou UPDATE de valeur la tient à jour. Les sommes
+de colonnes et les totaux de lignes deviennent des SUM(valeur_num) en SQL,
+servis par l'index (module_id, field_id, valeur_num), qui stocke la valeur
+calculée à l'écriture.
+
+rebuild_module_values() reconstruit cet index (voir scripts/rebuild_derived.py).
+"""
+
+from utils.app_logger import get_logger
+
+logger = get_logger("module_values")
+
+VALUE_INDEX = ("idx_event_module_data_num", "event_module_data", ("module_id", "field_id", "valeur_num"))
+
+
+def sql_numeric_value(expr):
+    """
+    Expression SQL convertissant un texte saisi en nombre (REAL), NULL s'il n'en
+    est pas un. Virgule décimale et espaces (dont insécables) acceptés.
+    """
+    x = f"replace(replace(replace(replace(trim({expr}), ' ', ''), char(160), ''), char(8239), ''), ',', '.')"
+    return (
+        f"(CASE WHEN {expr} IS NULL THEN NULL "
+        f"WHEN typeof({expr}) IN ('integer', 'real') THEN {expr} "
+        f"WHEN {x} = '' OR {x} GLOB '*[^0-9.+-]*' OR {x} NOT GLOB '*[0-9]*' "
+        f"OR {x} GLOB '*.*.*' OR {x} GLOB '?*[+-]*' THEN NULL "
+        f"ELSE CAST({x} AS REAL) END)"
+    )
+
+
+def create_module_values_schema(conn):
+    """Ajoute la colonne calculée valeur_num à event_module_data si besoin, puis crée son index."""
+    c = conn.cursor()
+    # table_xinfo : les colonnes calculées n'apparaissent pas dans table_info
+    columns = {r[1] for r in c.execute("PRAGMA table_xinfo(event_module_data)")}
+    if not columns:
+        logger.debug("Table event_module_data absente : valeur_num ignorée.")
+        return
+    if "valeur_num" not in columns:
+        c.execute(
+            "ALTER TABLE event_module_data ADD COLUMN valeur_num REAL "
+            f"GENERATED ALWAYS AS {sql_numeric_value('valeur')} VIRTUAL"
+        )
+        logger.info("Colonne calculée valeur_num ajoutée à event_module_data.")
+    name, table, index_columns = VALUE_INDEX
+    c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index_columns)})")
+
+
+def rebuild_module_values(conn):
+    """
+    Reconstruit l'index de valeur_num (la colonne, calculée, ne peut pas être
+    périmée). Retourne le nombre de cellules.
+    """
+    c = conn.cursor()
+    c.execute(f"REINDEX {VALUE_INDEX[0]}")
+    return c.execute("SELECT COUNT(*) FROM event_module_data").fetchone()[0]
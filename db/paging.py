@@ -0,0 +1,135 @@
+"""
+Sources de lignes paginées pour les grandes listes (ui/virtual_treeview.py).
+
+Une SqlDataSource décrit une liste par ses colonnes (nom -> expression SQL) et
+sa clause FROM. Tri, recherche et filtres sont traduits en SQL (ORDER BY,
+WHERE ... LIKE) et les lignes sont lues par pages (LIMIT/OFFSET) : la liste
+n'est jamais chargée entièrement, quel que soit le nombre de lignes.
+"""
+
+from db.db import get_connection
+
+
+def _like_pattern(text):
+    """Motif LIKE « contient » pour un texte saisi (% et _ échappés)."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SqlDataSource:
+    """
+    Liste paginée : SELECT <columns> <from_sql> [WHERE ...] ORDER BY ... LIMIT/OFFSET.
+
+    columns : liste de (nom, expression SQL), dans l'ordre d'affichage.
+    from_sql : clause FROM (jointures comprises).
+    key : expression de la clé unique de ligne (départage des tris, iid du Treeview).
+    order_by : liste de (nom de colonne, descendant) du tri par défaut.
+    search_columns : noms des colonnes parcourues par la recherche texte.
+    search_sql : fonction(texte) -> (clause SQL, paramètres) ou None, remplaçant
+    la recherche LIKE sur search_columns (ex. index plein texte, db/search_index.py).
+    """
+
+    def __init__(self, columns, from_sql, key="id", order_by=None, search_columns=(), search_sql=None):
+        self.columns = list(columns)
+        self.expressions = dict(self.columns)
+        self.from_sql = from_sql
+        self.key = key
+        self.default_order = list(order_by or [])
+        self.order = list(self.default_order)
+        self.search_columns = list(search_columns)
+        self.search_sql = search_sql
+        self.search = ""
+        self.filters = []  # [(clause SQL, paramètres)]
+        self.version = 0
+        self._count = None
+
+    # --- Critères -------------------------------------------------------
+    def _changed(self):
+        self.version += 1
+        self._count = None
+
+    def set_sort(self, column, descending=False):
+        """Trie sur une colonne (puis sur le tri par défaut) ; column=None rétablit le tri par défaut."""
+        if column is None:
+            self.order = list(self.default_order)
+        else:
+            if column not in self.expressions:
+                raise KeyError(f"Colonne inconnue : {column}")
+            self.order = [(column, descending)] + [o for o in self.default_order if o[0] != column]
+        self._changed()
+
+    def set_search(self, text):
+        """Recherche texte : search_sql si fourni, sinon « contient » (casse ASCII ignorée) sur search_columns."""
+        text = (text or "").strip()
+        if text != self.search:
+            self.search = text
+            self._changed()
+
+    def set_filters(self, filters):
+        """Filtres supplémentaires : liste de (clause SQL, paramètres), combinés par AND."""
+        self.filters = [(clause, tuple(params)) for clause, params in filters]
+        self._changed()
+
+    def invalidate(self):
+        """À appeler après une modification des données (nouveau comptage, pages à relire)."""
+        self._changed()
+
+    # --- Requêtes -------------------------------------------------------
+    def _where(self):
+        clauses, params = [], []
+        for clause, clause_params in self.filters:
+            clauses.append(f"({clause})")
+            params.extend(clause_params)
+        if self.search and self.search_sql:
+            search = self.search_sql(self.search)
+            if search:
+                clauses.append(f"({search[0]})")
+                params.extend(search[1])
+        elif self.search and self.search_columns:
+            pattern = _like_pattern(self.search)
+            clauses.append("(" + " OR ".join(
+                f"COALESCE({self.expressions[c]}, '') LIKE ? ESCAPE '\\'" for c in self.search_columns
+            ) + ")")
+            params.extend([pattern] * len(self.search_columns))
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _order_sql(self):
+        terms = [f"{self.expressions[name]} {'DESC' if desc else 'ASC'}" for name, desc in self.order]
+        last_desc = self.order[0][1] if self.order else False
+        terms.append(f"{self.key} {'DESC' if last_desc else 'ASC'}")
+        return " ORDER BY " + ", ".join(terms)
+
+    def count(self):
+        """Nombre de lignes correspondant aux critères (mis en cache jusqu'au prochain changement)."""
+        if self._count is None:
+            where, params = self._where()
+            conn = get_connection()
+            try:
+                self._count = conn.execute(f"SELECT COUNT(*) {self.from_sql}{where}", params).fetchone()[0]
+            finally:
+                conn.close()
+        return self._count
+
+    def fetch(self, offset, limit):
+        """Lignes [offset, offset + limit) dans l'ordre courant ; chaque ligne expose aussi `_key`."""
+        where, params = self._where()
+        select = ", ".join(f"{expr} AS {name}" for name, expr in self.columns)
+        conn = get_connection()
+        try:
+            return conn.execute(
+                f"SELECT {self.key} AS _key, {select} {self.from_sql}{where}{self._order_sql()} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def aggregate(self, **expressions):
+        """Agrégats SQL sur les lignes filtrées, ex. aggregate(total="SUM(montant)") -> {"total": ...}."""
+        where, params = self._where()
+        select = ", ".join(f"{expr} AS {name}" for name, expr in expressions.items())
+        conn = get_connection()
+        try:
+            row = conn.execute(f"SELECT {select} {self.from_sql}{where}", params).fetchone()
+        finally:
+            conn.close()
+        return {name: row[name] for name in expressions}
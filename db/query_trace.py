@@ -0,0 +1,269 @@
+"""
+Instrumentation SQL optionnelle : trace et chronométrage des requêtes.
+
+Activation :
+- variable d'environnement ASSO_SQL_TRACE=1 (au démarrage)
+- menu Administration > "Tracer les requêtes SQL" (set_query_trace)
+
+Quand la trace est active, les curseurs des connexions du pool (db.db) sont des
+TracingCursor : chaque requête est enregistrée sous sa forme normalisée avec
+nombre d'appels, temps cumulé, p95 et lignes renvoyées. Les requêtes plus lentes
+que ASSO_SLOW_QUERY_MS (200 ms par défaut) sont écrites dans logs/sql_slow.log.
+trace_block()/traced() résument le coût d'un bloc ou d'une méthode de fenêtre,
+ex. "JournalModule.refresh_journal : 1 requête(s), 340.0 ms", et signalent les
+requêtes répétées dans une boucle (N+1 probable).
+
+max_queries(n) borne le nombre de requêtes d'un bloc (tests de non-régression),
+indépendamment de l'activation de la trace.
+"""
+
+import os
+import re
+import threading
+import time
+import sqlite3
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from utils.app_logger import get_logger
+
+logger = get_logger("sql_trace")
+slow_logger = get_logger("sql_slow", log_file="sql_slow.log")
+
+SLOW_QUERY_MS = float(os.getenv("ASSO_SLOW_QUERY_MS", "200"))
+MAX_SAMPLES = 500  # échantillons de durée conservés par requête (calcul du p95)
+N_PLUS_ONE_THRESHOLD = 10  # répétitions d'une même requête dans un bloc signalées en N+1
+
+_trace_enabled = os.getenv("ASSO_SQL_TRACE", "") not in ("", "0", "false", "False")
+_stats = {}
+_stats_lock = threading.Lock()
+_local = threading.local()  # blocs actifs du thread courant (trace_block)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """Forme normalisée d'une requête : littéraux remplacés par ?, espaces compactés."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip().rstrip(";")
+
+
+class QueryStat:
+    """Statistiques cumulées d'une requête normalisée."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    @property
+    def p95_ms(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[int(round(0.95 * (len(ordered) - 1)))]
+
+
+def is_tracing():
+    """True si les curseurs doivent être instrumentés pour le thread courant."""
+    return _trace_enabled or bool(getattr(_local, "blocks", None))
+
+
+def set_query_trace(enabled):
+    """Active/désactive la trace globale (les compteurs de bloc restent actifs)."""
+    global _trace_enabled
+    _trace_enabled = bool(enabled)
+    logger.info(f"Trace SQL {'activée' if _trace_enabled else 'désactivée'}.")
+
+
+def query_trace_enabled():
+    return _trace_enabled
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def get_query_stats():
+    """Liste des QueryStat, triée par temps cumulé décroissant."""
+    with _stats_lock:
+        return sorted(_stats.values(), key=lambda s: s.total_ms, reverse=True)
+
+
+def format_query_stats(limit=20):
+    """Rapport texte des requêtes les plus coûteuses."""
+    lines = []
+    for stat in get_query_stats()[:limit]:
+        lines.append(
+            f"{stat.calls:>6} appel(s) | {stat.total_ms:>9.1f} ms cumulés | p95 {stat.p95_ms:>7.1f} ms | "
+            f"{stat.rows:>7} ligne(s) | {stat.sql}"
+        )
+    return "\n".join(lines) if lines else "Aucune requête enregistrée."
+
+
+def _record(sql, elapsed_ms, rows=0, new_call=True):
+    key = normalize_sql(sql)
+    if _trace_enabled:
+        with _stats_lock:
+            stat = _stats.get(key)
+            if stat is None:
+                stat = _stats[key] = QueryStat(key)
+            if new_call:
+                stat.calls += 1
+                stat.samples.append(elapsed_ms)
+            elif stat.samples:
+                stat.samples[-1] += elapsed_ms
+            stat.total_ms += elapsed_ms
+            stat.rows += rows
+        if elapsed_ms >= SLOW_QUERY_MS:
+            slow_logger.warning(f"Requête lente ({elapsed_ms:.1f} ms) : {key}")
+    for block in getattr(_local, "blocks", ()):
+        block.add(key, elapsed_ms, new_call)
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Curseur chronométrant execute/fetch et comptant les lignes renvoyées."""
+
+    _trace_sql = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._trace_sql = sql
+            _record(sql, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._trace_sql = sql
+            _record(sql, (time.perf_counter() - start) * 1000)
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._trace_sql is not None:
+            if isinstance(result, list):
+                rows = len(result)
+            else:
+                rows = 0 if result is None else 1
+            _record(self._trace_sql, (time.perf_counter() - start) * 1000, rows, new_call=False)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed_fetch(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def __next__(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class QueryBlock:
+    """Compteur de requêtes d'un bloc (trace_block / max_queries)."""
+
+    def __init__(self, label):
+        self.label = label
+        self.count = 0
+        self.elapsed_ms = 0.0
+        self.shapes = {}
+
+    def add(self, sql, elapsed_ms, new_call):
+        self.elapsed_ms += elapsed_ms
+        if new_call:
+            self.count += 1
+            self.shapes[sql] = self.shapes.get(sql, 0) + 1
+
+    def repeated_shapes(self, min_count=2):
+        """Requêtes exécutées au moins min_count fois, les plus fréquentes d'abord."""
+        repeated = [(sql, n) for sql, n in self.shapes.items() if n >= min_count]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+    def describe(self):
+        lines = [f"{self.label} : {self.count} requête(s), {self.elapsed_ms:.1f} ms"]
+        for sql, n in self.repeated_shapes():
+            lines.append(f"  {n} x {sql}")
+        return "\n".join(lines)
+
+
+class TooManyQueriesError(AssertionError):
+    """Levée par max_queries() quand un bloc dépasse le nombre de requêtes autorisé."""
+
+    def __init__(self, block, limit):
+        self.block = block
+        self.limit = limit
+        super().__init__(f"{block.count} requête(s) exécutée(s), maximum autorisé {limit}.\n{block.describe()}")
+
+
+@contextmanager
+def query_block(label):
+    """Enregistre les requêtes du thread courant exécutées dans le bloc."""
+    block = QueryBlock(label)
+    blocks = getattr(_local, "blocks", None)
+    if blocks is None:
+        blocks = _local.blocks = []
+    blocks.append(block)
+    try:
+        yield block
+    finally:
+        blocks.remove(block)
+
+
+@contextmanager
+def trace_block(label):
+    """Journalise le nombre de requêtes et leur durée pour un bloc (si la trace est active)."""
+    if not _trace_enabled:
+        yield None
+        return
+    with query_block(label) as block:
+        yield block
+    logger.info(f"{label} : {block.count} requête(s), {block.elapsed_ms:.1f} ms")
+    for sql, n in block.repeated_shapes(N_PLUS_ONE_THRESHOLD):
+        logger.warning(f"{label} : requête répétée {n} fois (N+1 probable) : {sql}")
+
+
+@contextmanager
+def max_queries(limit, label="bloc"):
+    """
+    Échoue (TooManyQueriesError) si le bloc exécute plus de `limit` requêtes
+    via db.get_connection() sur le thread courant. Le message liste les
+    requêtes répétées.
+
+        with max_queries(3):
+            list_events_with_totals()
+    """
+    with query_block(label) as block:
+        yield block
+    if block.count > limit:
+        raise TooManyQueriesError(block, limit)
+
+
+def traced(label=None):
+    """Décorateur : trace_block() autour d'une méthode (libellé par défaut Classe.méthode)."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            name = label
+            if name is None:
+                owner = type(args[0]).__name__ + "." if args else ""
+                name = owner + func.__name__
+            with trace_block(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
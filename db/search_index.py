@@ -0,0 +1,209 @@
+"""
+Index de recherche plein texte (table virtuelle FTS5 search_index).
+
+Un document par écriture du grand livre (libellé, type, date, justificatif,
+fournisseur et payeur de la dépense d'origine), par membre, par événement,
+par paiement d'événement et par achat buvette. Le tokenizer unicode61 avec
+remove_diacritics rend la recherche insensible à la casse et aux accents
+(« evenement » trouve « Événement ») ; chaque mot saisi est cherché en préfixe
+(« mart » trouve « Martin »), servi par les index de préfixes de FTS5.
+
+Le rowid d'un document code son type et l'id de sa ligne source
+(id * 8 + code du type) : les triggers mettent l'index à jour à chaque
+INSERT/UPDATE/DELETE par accès direct au rowid, sans parcours.
+
+rebuild_search_index() reconstruit l'index (voir scripts/rebuild_derived.py).
+"""
+
+import re
+
+from db.db import get_connection
+from utils.app_logger import get_logger
+
+logger = get_logger("search_index")
+
+KIND_BITS = 3
+
+# Colonnes d'une écriture de dépense reprises dans son document (fournisseur, payeur)
+_LEDGER_EXTRA = {
+    "depenses_regulieres": ("fournisseur", "paye_par"),
+    "depenses_diverses": ("fournisseur", "paye_par"),
+    "event_depenses": ("fournisseur", "paye_par"),
+}
+
+
+def _text(*exprs):
+    """Concaténation SQL, séparée par des espaces, d'expressions pouvant être NULL."""
+    return " || ' ' || ".join(f"COALESCE({e}, '')" for e in exprs)
+
+
+# type de document -> (code, table source, colonnes du titre, colonnes indexées)
+SEARCH_SOURCES = {
+    "ecriture": (1, "ledger_entries", ("date", "type", "libelle"),
+                 ("date", "type", "libelle", "justificatif")),
+    "membre": (2, "membres", ("name", "prenom"),
+               ("name", "prenom", "email", "telephone", "statut", "commentaire")),
+    "evenement": (3, "events", ("date", "name"),
+                  ("name", "date", "lieu", "description")),
+    "paiement": (4, "event_payments", ("nom_payeuse", "classe"),
+                 ("nom_payeuse", "classe", "mode_paiement", "banque", "numero_cheque", "commentaire")),
+    "achat": (5, "buvette_achats", ("date_achat", "fournisseur", "facture"),
+              ("date_achat", "fournisseur", "facture", "exercice")),
+}
+
+KIND_LABELS = {
+    "ecriture": "Écriture",
+    "membre": "Membre",
+    "evenement": "Événement",
+    "paiement": "Paiement",
+    "achat": "Achat buvette",
+}
+
+_KINDS_BY_CODE = {code: kind for kind, (code, _, _, _) in SEARCH_SOURCES.items()}
+
+
+def _rowid(code, row):
+    return f"({row}.id << {KIND_BITS}) + {code}"
+
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _document(conn, kind, row):
+    """
+    Expressions SQL (titre, texte indexé) du document `kind` pour la ligne `row`
+    (NEW ou alias), limitées aux colonnes présentes (bases anciennes).
+    """
+    _, table, titre_cols, texte_cols = SEARCH_SOURCES[kind]
+    present = _columns(conn, table)
+    titre = _text(*(f"{row}.{c}" for c in titre_cols if c in present))
+    parts = [f"{row}.{c}" for c in texte_cols if c in present]
+    if kind == "ecriture":
+        cases = []
+        for source_table, extra_cols in _LEDGER_EXTRA.items():
+            extra = [c for c in extra_cols if c in _columns(conn, source_table)]
+            if extra:
+                cases.append(f"WHEN '{source_table}' THEN (SELECT {_text(*extra)} FROM {source_table} WHERE id = {row}.source_id)")
+        if cases:
+            parts.append(f"CASE {row}.source_table {' '.join(cases)} END")
+    return titre or "''", _text(*parts) or "''"
+
+
+def _search_triggers(conn):
+    triggers = {}
+    for kind, (code, table, _, _) in SEARCH_SOURCES.items():
+        titre, texte = _document(conn, kind, "NEW")
+        insert = (
+            f"INSERT INTO search_index (rowid, titre, texte) "
+            f"VALUES ({_rowid(code, 'NEW')}, {titre}, {texte});"
+        )
+        delete = f"DELETE FROM search_index WHERE rowid = {_rowid(code, 'OLD')};"
+        triggers[f"trg_search_{kind}_ins"] = f"AFTER INSERT ON {table} BEGIN {insert} END"
+        triggers[f"trg_search_{kind}_upd"] = f"AFTER UPDATE ON {table} BEGIN {delete} {insert} END"
+        triggers[f"trg_search_{kind}_del"] = f"AFTER DELETE ON {table} BEGIN {delete} END"
+    return triggers
+
+
+def create_search_schema(conn):
+    """Crée la table FTS5 search_index et (re)crée ses triggers sur les tables présentes."""
+    c = conn.cursor()
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            titre UNINDEXED,
+            texte,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for name, body in _search_triggers(conn).items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        table = body.split(" ON ", 1)[1].split()[0]
+        if table in existing:
+            c.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def rebuild_search_index(conn=None):
+    """Reconstruit entièrement search_index à partir des tables sources. Retourne le nombre de documents."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        c = conn.cursor()
+        existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        c.execute("DELETE FROM search_index")
+        for kind, (code, table, _, _) in SEARCH_SOURCES.items():
+            if table not in existing:
+                continue
+            titre, texte = _document(conn, kind, "r")
+            c.execute(
+                f"INSERT INTO search_index (rowid, titre, texte) "
+                f"SELECT {_rowid(code, 'r')}, {titre}, {texte} FROM {table} r"
+            )
+        c.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+        count = c.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+        if own:
+            conn.commit()
+        logger.info(f"Index de recherche reconstruit : {count} document(s).")
+        return count
+    finally:
+        if own:
+            conn.close()
+
+
+def match_query(text):
+    """
+    Requête MATCH FTS5 pour un texte saisi : chaque mot est cherché en préfixe,
+    tous les mots doivent être présents. None si le texte ne contient aucun mot.
+    """
+    words = re.findall(r"[^\W_]+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_filter(text, kind="ecriture", key="id"):
+    """
+    Filtre SQL (clause, paramètres) restreignant une liste aux lignes dont le
+    document `kind` correspond au texte saisi, pour SqlDataSource (db/paging.py).
+    None si le texte ne contient aucun mot.
+    """
+    query = match_query(text)
+    if query is None:
+        return None
+    code = SEARCH_SOURCES[kind][0]
+    mask = (1 << KIND_BITS) - 1
+    return (
+        f"{key} IN (SELECT rowid >> {KIND_BITS} FROM search_index "
+        f"WHERE search_index MATCH ? AND (rowid & {mask}) = {code})",
+        (query,),
+    )
+
+
+def global_search(text, kinds=None, limit=50):
+    """
+    Recherche sur tous les types de documents (ou ceux de `kinds`), meilleurs
+    résultats d'abord. Retourne une liste de dicts {kind, id, titre}.
+    """
+    query = match_query(text)
+    if query is None:
+        return []
+    sql = "SELECT rowid, titre FROM search_index WHERE search_index MATCH ?"
+    params = [query]
+    if kinds:
+        codes = [SEARCH_SOURCES[k][0] for k in kinds]
+        sql += f" AND (rowid & {(1 << KIND_BITS) - 1}) IN ({', '.join('?' * len(codes))})"
+        params.extend(codes)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    conn = get_connection()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    mask = (1 << KIND_BITS) - 1
+    return [
+        {"kind": _KINDS_BY_CODE[row["rowid"] & mask], "id": row["rowid"] >> KIND_BITS, "titre": row["titre"].strip()}
+        for row in rows
+    ]
@@ -19,7 +19,7 @@ class ClotureConfirmDialog(tk.Toplevel):
     def do_cloture(self):
         conn = get_connection()
         to_truncate = [
-            "events", "event_modules", "event_module_fields", "event_module_data",
+            "events", "event_modules", "event_module_fields", "event_module_data", "event_module_rows",
             "members", "dons_subventions", "depenses_regulieres", "depenses_diverses",
             "journal", "stock"
         ]
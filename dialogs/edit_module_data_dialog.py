@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from db.db import get_connection, get_df_or_sql
+from modules.event_modules_db import load_module_row, save_module_row
 from utils.error_handler import handle_errors
 
 # Optionally handle DataSource if present
@@ -88,13 +89,7 @@ class EditModuleDataDialog(tk.Toplevel):
                 df = df[(df["module_id"] == self.module_id) & (df["row_index"] == self.row_index)]
                 values = {row["field_id"]: row["valeur"] for _, row in df.iterrows()}
             else:
-                conn = get_connection()
-                rows = conn.execute(
-                    "SELECT field_id, valeur FROM event_module_data WHERE module_id=? AND row_index=?",
-                    (self.module_id, self.row_index)
-                ).fetchall()
-                conn.close()
-                values = {fid: v for fid, v in rows}
+                values = load_module_row(self.module_id, self.row_index)
             for i, (fid, _, *_) in enumerate(self._fields_with_modele()):
                 self.vars[i].set(values.get(fid, ""))
         except Exception as e:
@@ -106,24 +101,8 @@ class EditModuleDataDialog(tk.Toplevel):
         if any(not v for v in vals):
             if not messagebox.askyesno("Champs vides", "Certains champs sont vides. Continuer ?"):
                 return
-        conn = get_connection()
-        try:
-            if self.row_index is None:
-                rowidx = conn.execute(
-                    "SELECT MAX(row_index) FROM event_module_data WHERE module_id=?", (self.module_id,)
-                ).fetchone()[0]
-                rowidx = (rowidx or 0) + 1
-            else:
-                rowidx = self.row_index
-                conn.execute("DELETE FROM event_module_data WHERE module_id=? AND row_index=?", (self.module_id, rowidx))
-            for i, (fid, _, *_) in enumerate(self._fields_with_modele()):
-                conn.execute(
-                    "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
-                    (self.module_id, rowidx, fid, vals[i])
-                )
-            conn.commit()
-        finally:
-            conn.close()
+        values = {fid: vals[i] for i, (fid, _, *_) in enumerate(self._fields_with_modele())}
+        save_module_row(self.module_id, values, row_index=self.row_index)
         if self.on_save:
             self.on_save()
         self.destroy()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime
+
+class RestoreSnapshotDialog(tk.Toplevel):
+    """
+    Choix de l'instantané du dépôt de sauvegardes à restaurer (le plus récent
+    en tête). « Autre fichier… » : restauration depuis un fichier .bak / .db.
+    """
+
+    def __init__(self, master, snapshots, on_restore, on_other_file=None):
+        super().__init__(master)
+        self.title("Restaurer la base")
+        self.geometry("520x340")
+        self.snapshots = {s["name"]: s for s in snapshots}
+        self.on_restore = on_restore
+        self.on_other_file = on_other_file
+
+        tk.Label(self, text="Instantanés disponibles :", anchor="w").pack(fill=tk.X, padx=10, pady=(10, 4))
+        self.tree = ttk.Treeview(self, columns=("date", "taille", "nouveau"), show="headings", selectmode="browse")
+        self.tree.heading("date", text="Date")
+        self.tree.heading("taille", text="Taille")
+        self.tree.heading("nouveau", text="Données nouvelles")
+        self.tree.column("date", width=180)
+        self.tree.column("taille", width=120, anchor="e")
+        self.tree.column("nouveau", width=160, anchor="e")
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        for s in snapshots:
+            created = datetime.fromisoformat(s["created_at"]).strftime("%d/%m/%Y %H:%M:%S")
+            self.tree.insert("", tk.END, iid=s["name"], values=(
+                created, f"{s['size'] / 1024:.0f} Kio", f"{s['new_bytes'] / 1024:.0f} Kio"
+            ))
+        if snapshots:
+            self.tree.selection_set(snapshots[0]["name"])
+        self.tree.bind("<Double-1>", lambda e: self.restore())
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(fill=tk.X, padx=10, pady=10)
+        tk.Button(btn_frame, text="Restaurer", command=self.restore).pack(side=tk.LEFT)
+        if on_other_file is not None:
+            tk.Button(btn_frame, text="Autre fichier…", command=self.other_file).pack(side=tk.LEFT, padx=8)
+        tk.Button(btn_frame, text="Annuler", command=self.destroy).pack(side=tk.RIGHT)
+
+    def restore(self):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        snapshot = self.snapshots[selection[0]]
+        self.destroy()
+        self.on_restore(snapshot)
+
+    def other_file(self):
+        self.destroy()
+        self.on_other_file()
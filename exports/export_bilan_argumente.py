@@ -1,13 +1,3 @@
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import (
-    Paragraph, SimpleDocTemplate, Spacer, Table, PageBreak, Image,
-    KeepTogether
-)
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from docx import Document
-from docx.shared import Inches
 import datetime
 import tkinter as tk
 from tkinter import filedialog, messagebox
@@ -59,13 +49,16 @@ def generate_resume_executif(solde_cloture, evolution, total_recettes, total_dep
     
 # RÉCUPÉRATION ET STRUCTURATION DES DONNÉES
 def get_event_details(c):
-    events = c.execute("SELECT id, name, date FROM events ORDER BY date ASC").fetchall()
+    # Totaux matérialisés par triggers (db/event_totals.py) : une seule requête
+    events = c.execute("""
+        SELECT e.id, e.name, e.date, COALESCE(t.recettes, 0) AS recettes, COALESCE(t.depenses, 0) AS depenses
+        FROM events e LEFT JOIN event_totals t ON t.event_id = e.id
+        ORDER BY e.date ASC
+    """).fetchall()
     details = []
     for ev in events:
-        rec = c.execute("SELECT SUM(montant) as total FROM event_recettes WHERE event_id=?", (ev["id"],)).fetchone()
-        dep = c.execute("SELECT SUM(montant) as total FROM event_depenses WHERE event_id=?", (ev["id"],)).fetchone()
-        rec = rec["total"] or 0.0
-        dep = dep["total"] or 0.0
+        rec = ev["recettes"]
+        dep = ev["depenses"]
         benef = rec - dep
         desc = f"L'événement {ev['name']} du {ev['date']} a réuni la communauté autour de moments conviviaux. Il a généré {rec:.2f} € de recettes pour {dep:.2f} € de dépenses, soit un bénéfice de {benef:.2f} €."
         details.append({
@@ -293,6 +286,14 @@ def ask_date_cloture_if_missing(data):
     
     
 def export_bilan_argumente_pdf():
+    # reportlab importé à l'export seulement (démarrage de l'application plus rapide)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import (
+        Paragraph, SimpleDocTemplate, Spacer, Table, PageBreak, Image,
+        KeepTogether
+    )
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     root = tk.Tk()
     root.withdraw()
     filename = filedialog.asksaveasfilename(
@@ -506,6 +507,8 @@ def export_bilan_argumente_pdf():
         
 # --- VERSION ENTIÈREMENT ÉDITABLE DE export_bilan_argumente_word ---
 def export_bilan_argumente_word():
+    from docx import Document
+    from docx.shared import Inches
     root = tk.Tk()
     root.withdraw()
     filename = filedialog.asksaveasfilename(
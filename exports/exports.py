@@ -1,11 +1,13 @@
-import pandas as pd
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from db.db import get_connection
+from db.event_totals import list_caisse_totals
+from utils.csv_helpers import export_query_csv
 
 # ========== EXPORTS BILAN EVENEMENT ==========
 
 def export_bilan_evenement(event_id, format="xlsx", filename=None):
+    import pandas as pd
     conn = get_connection()
     # Récup info événement
     event = conn.execute("SELECT * FROM events WHERE id=?", (event_id,)).fetchone()
@@ -23,21 +25,11 @@ def export_bilan_evenement(event_id, format="xlsx", filename=None):
         "SELECT categorie, montant, fournisseur, date_depense, paye_par, membre_id, commentaire FROM event_depenses WHERE event_id=?",
         conn, params=(event_id,)
     )
-    # Données caisses
-    caisses = pd.read_sql_query(
-        "SELECT id, nom_caisse, commentaire FROM event_caisses WHERE event_id=?",
-        conn, params=(event_id,)
-    )
-    # Détail fond de caisse
+    # Caisses et fonds de début/fin (event_caisse_totals, une requête)
     caisses_details = []
-    for _, caisse in caisses.iterrows():
-        cid = caisse["id"]
-        debut = conn.execute(
-            "SELECT SUM(CASE WHEN type='cheque' THEN valeur ELSE valeur*quantite END) as total FROM event_caisse_details WHERE caisse_id=? AND moment='debut'", (cid,)
-        ).fetchone()["total"] or 0.0
-        fin = conn.execute(
-            "SELECT SUM(CASE WHEN type='cheque' THEN valeur ELSE valeur*quantite END) as total FROM event_caisse_details WHERE caisse_id=? AND moment='fin'", (cid,)
-        ).fetchone()["total"] or 0.0
+    for caisse in list_caisse_totals(event_id):
+        debut = caisse["fond_debut"]
+        fin = caisse["fond_fin"]
         caisses_details.append({
             "Caisse": caisse["nom_caisse"],
             "Fond début (€)": f"{debut:.2f}",
@@ -122,12 +114,9 @@ def export_bilan_evenement(event_id, format="xlsx", filename=None):
 
 # ========== EXPORTS GLOBAUX DÉPENSES / SUBVENTIONS ==========
 
+DEPENSES_GLOBAL_SQL = "SELECT * FROM depenses_regulieres UNION ALL SELECT * FROM depenses_diverses UNION ALL SELECT * FROM event_depenses"
+
 def export_depenses_global(format="xlsx", filename=None):
-    conn = get_connection()
-    depenses = pd.read_sql_query(
-        "SELECT * FROM depenses_regulieres UNION ALL SELECT * FROM depenses_diverses UNION ALL SELECT * FROM event_depenses", conn
-    )
-    conn.close()
     if filename is None:
         ext = "." + format
         filename = filedialog.asksaveasfilename(
@@ -138,12 +127,21 @@ def export_depenses_global(format="xlsx", filename=None):
         )
     if not filename:
         return
+    conn = get_connection()
+    if format == "csv":
+        # CSV écrit en flux depuis le curseur, sans DataFrame intermédiaire
+        try:
+            export_query_csv(conn, DEPENSES_GLOBAL_SQL, filename)
+        finally:
+            conn.close()
+        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
+        return
+    import pandas as pd
+    depenses = pd.read_sql_query(DEPENSES_GLOBAL_SQL, conn)
+    conn.close()
     if format == "xlsx":
         depenses.to_excel(filename, index=False)
         messagebox.showinfo("Export", f"Export Excel terminé :\n{filename}")
-    elif format == "csv":
-        depenses.to_csv(filename, index=False, encoding="utf-8")
-        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
     elif format == "pdf":
         try:
             from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -162,10 +160,9 @@ def export_depenses_global(format="xlsx", filename=None):
         except ImportError:
             messagebox.showerror("Export", "Le module reportlab n'est pas installé.")
 
+SUBVENTIONS_GLOBAL_SQL = "SELECT * FROM dons_subventions"
+
 def export_subventions_global(format="xlsx", filename=None):
-    conn = get_connection()
-    subventions = pd.read_sql_query("SELECT * FROM dons_subventions", conn)
-    conn.close()
     if filename is None:
         ext = "." + format
         filename = filedialog.asksaveasfilename(
@@ -176,12 +173,21 @@ def export_subventions_global(format="xlsx", filename=None):
         )
     if not filename:
         return
+    conn = get_connection()
+    if format == "csv":
+        # CSV écrit en flux depuis le curseur, sans DataFrame intermédiaire
+        try:
+            export_query_csv(conn, SUBVENTIONS_GLOBAL_SQL, filename)
+        finally:
+            conn.close()
+        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
+        return
+    import pandas as pd
+    subventions = pd.read_sql_query(SUBVENTIONS_GLOBAL_SQL, conn)
+    conn.close()
     if format == "xlsx":
         subventions.to_excel(filename, index=False)
         messagebox.showinfo("Export", f"Export Excel terminé :\n{filename}")
-    elif format == "csv":
-        subventions.to_csv(filename, index=False, encoding="utf-8")
-        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
     elif format == "pdf":
         try:
             from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -3,7 +3,7 @@ Database helper module for articles management (buvette_articles).
 
 This module provides database operations for managing articles in the buvette system.
 Features:
-- Short-lived connections with timeout for each operation
+- Pooled per-thread connection from db.db.get_connection (PRAGMAs applied once)
 - Retry/backoff wrapper for "database is locked" errors
 - Backward compatibility with databases lacking purchase_price column
 - Exponential backoff for locked database scenarios
@@ -18,13 +18,14 @@ Functions include:
 """
 
 import sqlite3
+import threading
 import time
 from functools import wraps
-from db.db import get_db_file
+from db.db import get_connection
 
 # Configuration for retry logic and database connections
 # These constants are also used by migration scripts
-DEFAULT_TIMEOUT = 30.0  # seconds - timeout for database connections
+DEFAULT_TIMEOUT = 30.0  # seconds - timeout for standalone (script) connections
 MAX_RETRIES = 5  # maximum number of retry attempts on lock
 INITIAL_BACKOFF = 0.1  # seconds - initial backoff time
 
@@ -32,6 +33,10 @@ def with_retry(func):
     """
     Decorator to retry database operations on lock errors with exponential backoff.
     
+    Backoff sleeps only happen on worker threads (see ui/task_runner.py): on the
+    Tk main thread a sleep would freeze the interface, so the call relies on the
+    connection busy timeout alone and a lock error is raised at once.
+    
     Args:
         func: Function to wrap with retry logic
         
@@ -50,6 +55,9 @@ def with_retry(func):
                 error_msg = str(e).lower()
                 if "database is locked" in error_msg or "locked" in error_msg:
                     retries += 1
+                    if threading.current_thread() is threading.main_thread():
+                        print(f"✗ Database locked (UI thread, no retry): {e}")
+                        raise
                     if retries >= MAX_RETRIES:
                         print(f"✗ Database locked after {MAX_RETRIES} retries: {e}")
                         raise
@@ -71,15 +79,15 @@ def with_retry(func):
 
 def get_connection_with_timeout():
     """
-    Get a short-lived database connection with proper timeout settings.
+    Get the pooled database connection for the current thread.
+    
+    Kept for backward compatibility: conn.close() hands the connection back to
+    the pool instead of closing it (see db.db.PooledConnection).
     
     Returns:
         sqlite3.Connection: Database connection with Row factory
     """
-    db_path = get_db_file()
-    conn = sqlite3.connect(db_path, timeout=DEFAULT_TIMEOUT)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_connection()
 
 def column_exists(cursor, table, column):
     """
@@ -105,7 +113,7 @@ def column_exists(cursor, table, column):
 def get_all_articles():
     """
     Retrieve all articles from buvette_articles table.
-    Uses short-lived connection with retry logic.
+    Uses the pooled connection with retry logic.
     
     Returns:
         list: List of article rows as sqlite3.Row objects
@@ -142,7 +150,7 @@ def get_all_articles():
 def get_article_by_id(article_id):
     """
     Get a specific article by its ID.
-    Uses short-lived connection with retry logic.
+    Uses the pooled connection with retry logic.
     
     Args:
         article_id (int): The ID of the article
@@ -182,7 +190,7 @@ def get_article_by_id(article_id):
 def get_article_by_name(name):
     """
     Get a specific article by its name.
-    Uses short-lived connection with retry logic.
+    Uses the pooled connection with retry logic.
     
     Args:
         name (str): The name of the article
@@ -222,7 +230,7 @@ def get_article_by_name(name):
 def create_article(name, categorie, unite=None, contenance=None, commentaire=None, stock=0, purchase_price=None):
     """
     Create a new article in the database.
-    Uses short-lived connection with retry logic.
+    Uses the pooled connection with retry logic.
     
     Args:
         name (str): Name of the article (required)
@@ -268,7 +276,7 @@ def create_article(name, categorie, unite=None, contenance=None, commentaire=Non
 def update_article_stock(article_id, stock):
     """
     Update the stock quantity of an article.
-    Uses short-lived connection with retry logic.
+    Uses the pooled connection with retry logic.
     
     Args:
         article_id (int): The ID of the article
@@ -297,7 +305,7 @@ def update_article_stock(article_id, stock):
 def update_article_purchase_price(article_id, purchase_price):
     """
     Update the purchase price of an article.
-    Uses short-lived connection with retry logic.
+    Uses the pooled connection with retry logic.
     Handles backward compatibility gracefully.
     
     Args:
@@ -1,35 +1,51 @@
 import tkinter as tk
+import importlib
 import os
 import sys
 from tkinter import messagebox, Toplevel, Label, Button
-from tkcalendar import DateEntry
 
 from db.db import (
     init_db, is_first_launch, save_init_info, get_connection,
-    upgrade_db_structure, get_db_file
+    upgrade_db_structure, get_db_file, get_pragma_profile,
+    set_query_trace, query_trace_enabled, format_query_stats, reset_query_stats,
+    schema_is_current, migrate
 )
 from ui import startup_schema_check
-from modules.events import EventsWindow
-from modules.stock import StockModule
-from modules.buvette import BuvetteModule
-from modules.members import MembersModule
-from modules.dons_subventions import DonsSubventionsModule
-from modules.depenses_regulieres import DepensesRegulieresModule
-from modules.depenses_diverses import DepensesDiversesModule
-from modules.journal import JournalModule
-from modules.cloture_exercice import ClotureExerciceModule
-from modules.exports import ExportsWindow
-from dashboard.dashboard import DashboardModule
-from modules.fournisseurs import FournisseursWindow
+from ui.backup_scheduler import BackupScheduler
 from utils import backup_restore
-from modules.depots_retraits_banque import DepotsRetraitsBanqueModule
-from modules.solde_ouverture import SoldeOuvertureDialog
-from modules.historique_clotures import HistoriqueCloturesModule
-from modules.retrocessions_ecoles import RetrocessionsEcolesModule
 from utils.error_handler import handle_errors
 
 DB_FILE = "association.db"
 
+# Fenêtres de l'application : clé -> (module, classe). Le module n'est importé
+# qu'à la première ouverture : pandas, matplotlib, reportlab, python-docx...
+# ne sont chargés qu'avec la fenêtre qui s'en sert (démarrage rapide).
+WINDOWS = {
+    "events": ("modules.events", "EventsWindow"),
+    "stock": ("modules.stock", "StockModule"),
+    "buvette": ("modules.buvette", "BuvetteModule"),
+    "members": ("modules.members", "MembersModule"),
+    "dons": ("modules.dons_subventions", "DonsSubventionsModule"),
+    "depenses_regulieres": ("modules.depenses_regulieres", "DepensesRegulieresModule"),
+    "depenses_diverses": ("modules.depenses_diverses", "DepensesDiversesModule"),
+    "retrocessions": ("modules.retrocessions_ecoles", "RetrocessionsEcolesModule"),
+    "depots_retraits": ("modules.depots_retraits_banque", "DepotsRetraitsBanqueModule"),
+    "fournisseurs": ("modules.fournisseurs", "FournisseursWindow"),
+    "cloture": ("modules.cloture_exercice", "ClotureExerciceModule"),
+    "exports": ("modules.exports", "ExportsWindow"),
+    "dashboard": ("dashboard.dashboard", "DashboardModule"),
+    "journal": ("modules.journal", "JournalModule"),
+    "recherche": ("modules.recherche_globale", "RechercheGlobaleWindow"),
+    "solde_ouverture": ("modules.solde_ouverture", "SoldeOuvertureDialog"),
+    "historique_clotures": ("modules.historique_clotures", "HistoriqueCloturesModule"),
+}
+
+def open_window(master, key):
+    """Ouvre la fenêtre `key` de WINDOWS, en important son module à la première ouverture."""
+    module_name, class_name = WINDOWS[key]
+    window_class = getattr(importlib.import_module(module_name), class_name)
+    return window_class(master)
+
 if not os.path.exists(DB_FILE):
     init_db()
 
@@ -65,9 +81,11 @@ class MainApp(tk.Tk):
         if is_first_launch():
             self.init_first_launch()
         
-        # Vérification automatique du schéma de base de données
-        if os.path.exists(DB_FILE):
+        # Vérification du schéma : simple comparaison de version si la base est à jour,
+        # sinon application des étapes manquantes puis contrôle détaillé des colonnes
+        if os.path.exists(DB_FILE) and not schema_is_current():
             try:
+                migrate()
                 startup_schema_check.run_check(self, DB_FILE)
             except Exception as e:
                 print(f"Warning: Schema check failed: {e}")
@@ -79,12 +97,25 @@ class MainApp(tk.Tk):
         self.status_var = tk.StringVar()
         self.status_label = tk.Label(self, textvariable=self.status_var, anchor="e")
         self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        # Sauvegardes automatiques (intervalle / nombre d'écritures), hors du thread Tk
+        self.backup_scheduler = BackupScheduler(self, on_change=self.update_dbfile_status)
+        self.backup_scheduler.refresh_last_backup()
+        self.update_dbfile_status()
+        backup_restore.set_status_callback(self.on_database_changed)
+        backup_restore.add_release_callback(self.backup_scheduler.release)
+        self.backup_scheduler.start()
+
+    def on_database_changed(self):
+        """Après une sauvegarde, une restauration ou un changement de base depuis le menu."""
+        self.backup_scheduler.refresh_last_backup()
         self.update_dbfile_status()
-        backup_restore.set_status_callback(self.update_dbfile_status)
 
     def update_dbfile_status(self):
         dbfile = get_db_file()
-        self.status_var.set(f"Base de données : {dbfile}")
+        self.status_var.set(
+            f"Base de données : {dbfile} | Profil SQLite : {get_pragma_profile()} | "
+            f"{self.backup_scheduler.status_text()}"
+        )
         self.title(f"Gestion Association Les Interactifs des Ecoles [{dbfile}]")
 
     def init_first_launch(self):
@@ -99,6 +130,7 @@ class MainApp(tk.Tk):
 
         Label(dialog, text="Date de début de l'exercice :").pack(padx=10, pady=(12,2), anchor="w")
         date_var = tk.StringVar()
+        from tkcalendar import DateEntry
         date_entry = DateEntry(dialog, textvariable=date_var, date_pattern='yyyy-mm-dd', width=18)
         date_entry.pack(padx=10, pady=2, anchor="w")
 
@@ -149,6 +181,7 @@ class MainApp(tk.Tk):
 
         Label(dialog, text="Date de début de l'exercice :").pack(padx=10, pady=(12,2), anchor="w")
         date_var = tk.StringVar(value=row["date"])
+        from tkcalendar import DateEntry
         date_entry = DateEntry(dialog, textvariable=date_var, date_pattern='yyyy-mm-dd', width=18)
         date_entry.pack(padx=10, pady=2, anchor="w")
 
@@ -177,42 +210,54 @@ class MainApp(tk.Tk):
         Button(btn_frame, text="Annuler", command=dialog.destroy, width=12).pack(side="right", padx=10)
         dialog.wait_window()
 
+    def window_command(self, key):
+        """Commande de menu ouvrant la fenêtre `key` (voir WINDOWS)."""
+        return handle_errors(lambda: open_window(self, key))
+
     def create_menu(self):
         menubar = tk.Menu(self)
         self.config(menu=menubar)
 
         modules_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Modules", menu=modules_menu)
-        modules_menu.add_command(label="Événements", command=handle_errors(lambda: EventsWindow(self)))
-        modules_menu.add_command(label="Stock", command=handle_errors(lambda: StockModule(self)))
-        modules_menu.add_command(label="Buvette", command=handle_errors(lambda: BuvetteModule(self)))
-        modules_menu.add_command(label="Membres", command=handle_errors(lambda: MembersModule(self)))
-        modules_menu.add_command(label="Dons/Subventions", command=handle_errors(lambda: DonsSubventionsModule(self)))
-        modules_menu.add_command(label="Dépenses Régulières", command=handle_errors(lambda: DepensesRegulieresModule(self)))
-        modules_menu.add_command(label="Dépenses Diverses", command=handle_errors(lambda: DepensesDiversesModule(self)))
+        modules_menu.add_command(label="Événements", command=self.window_command("events"))
+        modules_menu.add_command(label="Stock", command=self.window_command("stock"))
+        modules_menu.add_command(label="Buvette", command=self.window_command("buvette"))
+        modules_menu.add_command(label="Membres", command=self.window_command("members"))
+        modules_menu.add_command(label="Dons/Subventions", command=self.window_command("dons"))
+        modules_menu.add_command(label="Dépenses Régulières", command=self.window_command("depenses_regulieres"))
+        modules_menu.add_command(label="Dépenses Diverses", command=self.window_command("depenses_diverses"))
         modules_menu.add_separator()
-        modules_menu.add_command(label="Rétrocessions aux écoles", command=handle_errors(lambda: RetrocessionsEcolesModule(self)))
+        modules_menu.add_command(label="Rétrocessions aux écoles", command=self.window_command("retrocessions"))
         modules_menu.add_separator()
-        modules_menu.add_command(label="Gérer les fournisseurs", command=handle_errors(lambda: FournisseursWindow(self)))
+        modules_menu.add_command(label="Gérer les fournisseurs", command=self.window_command("fournisseurs"))
         modules_menu.add_separator()
-        modules_menu.add_command(label="Clôture Exercice", command=handle_errors(lambda: ClotureExerciceModule(self)))
+        modules_menu.add_command(label="Clôture Exercice", command=self.window_command("cloture"))
 
-        menubar.add_command(label="Exports", command=handle_errors(lambda: ExportsWindow(self)))
-        menubar.add_command(label="Tableau de Bord", command=handle_errors(lambda: DashboardModule(self)))
-        menubar.add_command(label="Journal Général", command=handle_errors(lambda: JournalModule(self)))
+        menubar.add_command(label="Exports", command=self.window_command("exports"))
+        menubar.add_command(label="Tableau de Bord", command=self.window_command("dashboard"))
+        menubar.add_command(label="Journal Général", command=self.window_command("journal"))
+        menubar.add_command(label="Rechercher", command=self.window_command("recherche"))
 
         # Sous-menu Administration
         params_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Administration", menu=params_menu)
         params_menu.add_command(label="Éditer exercice", command=self.edit_exercice)
-        params_menu.add_command(label="Solde d'ouverture bancaire", command=handle_errors(lambda: SoldeOuvertureDialog(self)))
-        params_menu.add_command(label="Gestion des clôtures", command=handle_errors(lambda: HistoriqueCloturesModule(self)))
-        params_menu.add_command(label="Sauvegarder la base...", command=handle_errors(backup_restore.backup_database))
-        params_menu.add_command(label="Restaurer la base...", command=handle_errors(backup_restore.restore_database))
+        params_menu.add_command(label="Solde d'ouverture bancaire", command=self.window_command("solde_ouverture"))
+        params_menu.add_command(label="Gestion des clôtures", command=self.window_command("historique_clotures"))
+        params_menu.add_command(label="Sauvegarder la base...", command=handle_errors(lambda: backup_restore.backup_database(master=self)))
+        params_menu.add_command(label="Restaurer la base...", command=handle_errors(lambda: backup_restore.restore_database(master=self)))
         params_menu.add_command(label="Ouvrir une autre base...", command=handle_errors(backup_restore.open_database))
         params_menu.add_separator()
         params_menu.add_command(label="Réinitialiser les données", command=handle_errors(self.reset_data))
         params_menu.add_command(label="Mettre à jour la structure de la base", command=handle_errors(self.menu_upgrade_db_structure))
+        params_menu.add_separator()
+        self.sql_trace_var = tk.BooleanVar(value=query_trace_enabled())
+        params_menu.add_checkbutton(
+            label="Tracer les requêtes SQL", variable=self.sql_trace_var,
+            command=lambda: set_query_trace(self.sql_trace_var.get())
+        )
+        params_menu.add_command(label="Statistiques des requêtes SQL", command=handle_errors(self.show_query_stats))
 
         menubar.add_command(label="Quitter", command=self.quit)
 
@@ -256,6 +301,29 @@ class MainApp(tk.Tk):
             except Exception as e:
                 messagebox.showerror("Erreur", f"Impossible d'exécuter la mise à jour : {e}")
 
+    def show_query_stats(self):
+        win = Toplevel(self)
+        win.title("Statistiques des requêtes SQL")
+        text = tk.Text(win, width=140, height=30, wrap="none")
+        text.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+
+        def refresh():
+            text.delete("1.0", tk.END)
+            if not query_trace_enabled():
+                text.insert(tk.END, "Trace désactivée (Administration > Tracer les requêtes SQL).\n\n")
+            text.insert(tk.END, format_query_stats(limit=50))
+
+        def reset():
+            reset_query_stats()
+            refresh()
+
+        btns = tk.Frame(win)
+        btns.pack(pady=(0, 8))
+        Button(btns, text="Actualiser", command=refresh).pack(side=tk.LEFT, padx=4)
+        Button(btns, text="Remettre à zéro", command=reset).pack(side=tk.LEFT, padx=4)
+        Button(btns, text="Fermer", command=win.destroy).pack(side=tk.LEFT, padx=4)
+        refresh()
+
     @handle_errors
     def reset_data(self):
         confirm = messagebox.askyesno(
@@ -263,8 +331,13 @@ class MainApp(tk.Tk):
             "Voulez-vous vraiment réinitialiser toutes les données ?\nCette action est irréversible."
         )
         if confirm:
+            # Plus de relevé ni de connexion (pool, threads de travail, planificateur) sur l'ancienne base
+            self.backup_scheduler.stop()
+            backup_restore.release_database_file(DB_FILE)
             if os.path.exists(DB_FILE):
                 os.remove(DB_FILE)
+            init_db()
+            self.backup_scheduler.start()
             messagebox.showinfo(
                 "Réinitialisation",
                 "Données effacées. L'application va redémarrer pour une nouvelle initialisation."
@@ -291,17 +364,17 @@ class MainApp(tk.Tk):
         btn_frame.pack(pady=15)
 
         buttons = [
-            ("Événements", lambda: EventsWindow(self)),
-            ("Stock", lambda: StockModule(self)),
-            ("Buvette", lambda: BuvetteModule(self)),
-            ("Membres", lambda: MembersModule(self)),
-            ("Dons/Subventions", lambda: DonsSubventionsModule(self)),
-            ("Dépenses Régulières", lambda: DepensesRegulieresModule(self)),
-            ("Dépenses Diverses", lambda: DepensesDiversesModule(self)),
-            ("Rétrocessions aux écoles", lambda: RetrocessionsEcolesModule(self)),
-            ("Dépôts/Retraits Banque", lambda: DepotsRetraitsBanqueModule(self)),
-            ("Clôture Exercice", lambda: ClotureExerciceModule(self)),
-            ("Exports / Bilans", lambda: ExportsWindow(self)),
+            ("Événements", lambda: open_window(self, "events")),
+            ("Stock", lambda: open_window(self, "stock")),
+            ("Buvette", lambda: open_window(self, "buvette")),
+            ("Membres", lambda: open_window(self, "members")),
+            ("Dons/Subventions", lambda: open_window(self, "dons")),
+            ("Dépenses Régulières", lambda: open_window(self, "depenses_regulieres")),
+            ("Dépenses Diverses", lambda: open_window(self, "depenses_diverses")),
+            ("Rétrocessions aux écoles", lambda: open_window(self, "retrocessions")),
+            ("Dépôts/Retraits Banque", lambda: open_window(self, "depots_retraits")),
+            ("Clôture Exercice", lambda: open_window(self, "cloture")),
+            ("Exports / Bilans", lambda: open_window(self, "exports")),
         ]
 
         cols = 3
@@ -21,8 +21,10 @@ from modules.buvette_db import (
     list_achats, insert_achat, update_achat, delete_achat,
     get_article_by_id, get_achat_by_id,
     list_mouvements, insert_mouvement, update_mouvement, delete_mouvement, get_mouvement_by_id,
-    list_articles_names, set_article_stock, ensure_stock_column
+    list_articles_names, set_article_stock, ensure_stock_column, mouvements_source
 )
+from ui.virtual_treeview import VirtualTreeview
+from ui.tree_sync import sync_treeview
 import modules.buvette_inventaire_db as inv_db
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
@@ -73,8 +75,7 @@ class BuvetteModule:
 
     def refresh_articles(self):
         try:
-            for row in self.articles_tree.get_children():
-                self.articles_tree.delete(row)
+            rows = []
             for a in list_articles():
                 # Use safe access helper to tolerate missing columns
                 purchase_price = row_get_safe(a, "purchase_price")
@@ -85,9 +86,9 @@ class BuvetteModule:
                     except (ValueError, TypeError):
                         pass
                 
-                self.articles_tree.insert(
-                    "", "end", iid=row_get_safe(a, "id", 0),
-                    values=(
+                rows.append((
+                    row_get_safe(a, "id", 0),
+                    (
                         row_get_safe(a, "name", ""),
                         row_get_safe(a, "categorie", ""),
                         row_get_safe(a, "unite", ""),
@@ -95,7 +96,8 @@ class BuvetteModule:
                         purchase_price_display,
                         row_get_safe(a, "commentaire", "")
                     )
-                )
+                ))
+            sync_treeview(self.articles_tree, rows)
         except Exception as e:
             logger.exception("Error refreshing articles list")
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des articles. Vérifiez que la structure de la base de données est à jour."))
@@ -149,12 +151,11 @@ class BuvetteModule:
 
     def refresh_achats(self):
         try:
-            for row in self.achats_tree.get_children():
-                self.achats_tree.delete(row)
+            rows = []
             for ach in list_achats():
-                self.achats_tree.insert(
-                    "", "end", iid=ach["id"],
-                    values=(
+                rows.append((
+                    ach["id"],
+                    (
                         ach["article_name"],
                         ach["article_contenance"] if "article_contenance" in ach.keys() and ach["article_contenance"] is not None else "",
                         ach["date_achat"],
@@ -164,7 +165,8 @@ class BuvetteModule:
                         ach["facture"],
                         ach["exercice"]
                     )
-                )
+                ))
+            sync_treeview(self.achats_tree, rows)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des achats."))
 
@@ -217,10 +219,10 @@ class BuvetteModule:
 
     def refresh_inventaires(self):
         try:
-            for row in self.inventaires_tree.get_children():
-                self.inventaires_tree.delete(row)
-            for inv in inv_db.list_inventaires():
-                self.inventaires_tree.insert("", "end", iid=inv["id"], values=(inv["date_inventaire"], inv["type_inventaire"], inv["commentaire"]))
+            sync_treeview(self.inventaires_tree, [
+                (inv["id"], (inv["date_inventaire"], inv["type_inventaire"], inv["commentaire"]))
+                for inv in inv_db.list_inventaires()
+            ])
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des inventaires."))
 
@@ -282,14 +284,22 @@ class BuvetteModule:
         frame = ttk.Frame(self.notebook)
         self.notebook.add(frame, text="Mouvements")
 
-        self.mouvements_tree = ttk.Treeview(frame, columns=("date", "article_name", "contenance", "type", "quantite", "commentaire"), show="headings")
-        self.mouvements_tree.heading("date", text="Date")
-        self.mouvements_tree.heading("article_name", text="Article")
-        self.mouvements_tree.heading("contenance", text="Contenance")
-        self.mouvements_tree.heading("type", text="Type")
-        self.mouvements_tree.heading("quantite", text="Quantité")
-        self.mouvements_tree.heading("commentaire", text="Commentaire")
-        self.mouvements_tree.pack(fill=tk.BOTH, expand=True, side=tk.LEFT, padx=3, pady=3)
+        # Liste virtuelle : lignes lues par pages, tri en SQL
+        self.mouvements_listing = VirtualTreeview(
+            frame, mouvements_source(),
+            columns=[
+                ("date", "Date", 100, "w"),
+                ("article_name", "Article", 180, "w"),
+                ("contenance", "Contenance", 90, "w"),
+                ("type", "Type", 80, "w"),
+                ("quantite", "Quantité", 80, "e"),
+                ("commentaire", "Commentaire", 220, "w"),
+            ],
+            formatter=lambda m: tuple("" if m[c] is None else m[c] for c in (
+                "date", "article_name", "contenance", "type", "quantite", "commentaire")),
+        )
+        self.mouvements_listing.pack(fill=tk.BOTH, expand=True, side=tk.LEFT, padx=3, pady=3)
+        self.mouvements_tree = self.mouvements_listing.tree
 
         self.refresh_mouvements()
 
@@ -301,13 +311,7 @@ class BuvetteModule:
 
     def refresh_mouvements(self):
         try:
-            for row in self.mouvements_tree.get_children():
-                self.mouvements_tree.delete(row)
-            for mvt in list_mouvements():
-                self.mouvements_tree.insert(
-                    "", "end", iid=mvt["id"],
-                    values=(mvt["date"], mvt["article_name"], mvt["article_contenance"] if "article_contenance" in mvt.keys() and mvt["article_contenance"] is not None else "", mvt["type"], mvt["quantite"], mvt["commentaire"])
-                )
+            self.mouvements_listing.refresh()
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des mouvements."))
 
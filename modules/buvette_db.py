@@ -125,6 +125,24 @@ def list_mouvements():
     conn.close()
     return rows
 
+def mouvements_source():
+    """Source paginée des mouvements (ui/virtual_treeview.py), plus récents d'abord."""
+    from db.paging import SqlDataSource
+    return SqlDataSource(
+        columns=[
+            ("date", "m.date_mouvement"),
+            ("article_name", "ar.name"),
+            ("contenance", "ar.contenance"),
+            ("type", "m.type_mouvement"),
+            ("quantite", "m.quantite"),
+            ("commentaire", "m.motif"),
+        ],
+        from_sql="FROM buvette_mouvements m LEFT JOIN buvette_articles ar ON m.article_id = ar.id",
+        key="m.id",
+        order_by=[("date", True)],
+        search_columns=["article_name", "type", "commentaire"],
+    )
+
 def get_mouvement_by_id(mvt_id):
     conn = get_conn()
     row = conn.execute("""
@@ -93,9 +93,7 @@ def delete_ligne_inventaire(ligne_id):
     conn.commit()
     conn.close()
 
-def upsert_ligne_inventaire(inventaire_id, article_id, quantite, commentaire=None):
-    conn = get_conn()
-    cur = conn.cursor()
+def _upsert_ligne(cur, inventaire_id, article_id, quantite, commentaire=None):
     cur.execute("""
         SELECT id FROM buvette_inventaire_lignes WHERE inventaire_id=? AND article_id=?
     """, (inventaire_id, article_id))
@@ -110,9 +108,30 @@ def upsert_ligne_inventaire(inventaire_id, article_id, quantite, commentaire=Non
             INSERT INTO buvette_inventaire_lignes (inventaire_id, article_id, quantite, commentaire)
             VALUES (?, ?, ?, ?)
         """, (inventaire_id, article_id, quantite, commentaire))
+
+def upsert_ligne_inventaire(inventaire_id, article_id, quantite, commentaire=None):
+    conn = get_conn()
+    _upsert_ligne(conn.cursor(), inventaire_id, article_id, quantite, commentaire)
     conn.commit()
     conn.close()
 
+def upsert_lignes_inventaire(inventaire_id, lignes):
+    """
+    Enregistre les lignes [(article_id, quantite)] d'un inventaire en une seule
+    transaction (un seul commit, annulé en entier en cas d'erreur).
+    """
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        for article_id, quantite in lignes:
+            _upsert_ligne(cur, inventaire_id, article_id, quantite)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 # ----- EVENEMENTS UTILITY -----
 def list_events():
     conn = get_conn()
@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 from datetime import date
 import modules.buvette_inventaire_db as db
 import modules.buvette_db as buvette_db
+from db.db import pragma_profile
 from utils.app_logger import get_logger
 from modules.db_row_utils import _row_to_dict, _rows_to_dicts
 from modules.inventory_lines_dialog import load_inventory_lines
@@ -264,17 +265,17 @@ class InventaireDialog(tk.Toplevel):
             else:
                 inv_id = db.insert_inventaire(date_inv, event_id, type_inv, commentaire)
             
-            # Save lines
+            # Save lines (profil "bulk-import" le temps de l'enregistrement massif)
+            # en une transaction : un seul commit pour toutes les lignes
+            lignes = []
             for item in self.lines_tree.get_children():
                 values = self.lines_tree.item(item)["values"]
-                article_id = values[0]
-                quantite = values[4]
+                lignes.append((values[0], values[4]))
+            with pragma_profile("bulk-import"):
+                db.upsert_lignes_inventaire(inv_id, lignes)
                 
-                # Upsert line
-                db.upsert_ligne_inventaire(inv_id, article_id, quantite)
-            
-            # Update article stock if quantite field exists
-            self._update_article_stock()
+                # Update article stock if quantite field exists
+                self._update_article_stock()
             
             messagebox.showinfo("Succès", "Inventaire enregistré avec succès.")
             
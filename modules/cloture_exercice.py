@@ -1,16 +1,21 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog
-import zipfile
-import os
+from tkinter import ttk, messagebox, filedialog
 import pandas as pd
 
-from db.db import get_connection
+from db.db import pragma_profile
 from exports.exports import (
     export_bilan_reporte_pdf,
     export_bilan_argumente_pdf,
     export_bilan_argumente_word
 )
 from dialogs.cloture_confirm_dialog import ClotureConfirmDialog
+from utils.zip_helpers import write_tables_zip, DEFAULT_COMPRESSLEVEL
+from utils.app_logger import get_logger
+
+logger = get_logger("cloture_exercice_module")
+
+# Niveau deflate de l'archive ZIP, au choix dans la fenêtre
+COMPRESSION_LEVELS = {"Rapide": 1, "Normale": DEFAULT_COMPRESSLEVEL, "Maximale": 9}
 
 class ClotureExerciceModule:
     def __init__(self, master, visualisation_mode=False):
@@ -18,7 +23,7 @@ class ClotureExerciceModule:
         self.visualisation_mode = visualisation_mode
         self.top = tk.Toplevel(master)
         self.top.title("Clôture de l'exercice")
-        self.top.geometry("520x420")
+        self.top.geometry("520x460")
         self.create_widgets()
 
     def create_widgets(self):
@@ -33,7 +38,12 @@ class ClotureExerciceModule:
                                "- (Optionnel) Réinitialiser les données pour le nouvel exercice\n\n"
                                "⚠️ Cette opération est IRRÉVERSIBLE", fg="red").grid(row=row, column=0, columnspan=2, pady=8)
         row += 1
-        tk.Button(self.top, text="Exporter l'exercice en ZIP", command=self.export_zip, width=36).grid(row=row, column=0, columnspan=2, pady=18)
+        tk.Label(self.top, text="Compression de l'archive :").grid(row=row, column=0, sticky="e", pady=(10, 0))
+        self.compression_var = tk.StringVar(value="Normale")
+        ttk.Combobox(self.top, textvariable=self.compression_var, values=list(COMPRESSION_LEVELS),
+                     state="readonly", width=12).grid(row=row, column=1, sticky="w", pady=(10, 0))
+        row += 1
+        tk.Button(self.top, text="Exporter l'exercice en ZIP", command=self.export_zip, width=36).grid(row=row, column=0, columnspan=2, pady=(6, 18))
         row += 1
         tk.Button(self.top, text="Exporter le bilan PDF rédigé", command=self.export_bilan_pdf, width=36).grid(row=row, column=0, columnspan=2, pady=10)
         row += 1
@@ -48,7 +58,7 @@ class ClotureExerciceModule:
 
     def export_zip(self):
         tables = [
-            "events", "event_modules", "event_module_fields", "event_module_data",
+            "events", "event_modules", "event_module_fields", "event_module_data", "event_module_rows",
             "members", "dons_subventions", "depenses_regulieres", "depenses_diverses",
             "journal", "categories", "stock"
         ]
@@ -59,27 +69,15 @@ class ClotureExerciceModule:
         )
         if not file_path:
             return
-        tmp_dir = "tmp_cloture_export"
-        os.makedirs(tmp_dir, exist_ok=True)
-        conn = get_connection()
-        for tab in tables:
-            df = pd.read_sql_query(f"SELECT * FROM {tab}", conn)
-            df.to_csv(os.path.join(tmp_dir, f"{tab}.csv"), index=False, encoding="utf-8")
-        conn.close()
-        with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for tab in tables:
-                zf.write(os.path.join(tmp_dir, f"{tab}.csv"), arcname=f"{tab}.csv")
-        # Clean temp
-        for tab in tables:
-            try:
-                os.remove(os.path.join(tmp_dir, f"{tab}.csv"))
-            except Exception:
-                pass
-        try:
-            os.rmdir(tmp_dir)
-        except Exception:
-            pass
-        messagebox.showinfo("Clôture", f"Archive exportée :\n{file_path}")
+        level = COMPRESSION_LEVELS.get(self.compression_var.get(), DEFAULT_COMPRESSLEVEL)
+        # Une passe, sans dossier temporaire : chaque table est écrite dans son entrée du ZIP
+        with pragma_profile("report") as conn:
+            manifest = write_tables_zip(conn, file_path, tables, compresslevel=level)
+        if manifest["missing"]:
+            logger.warning(f"Tables absentes ignorées dans l'export ZIP : {', '.join(manifest['missing'])}")
+        total = sum(info["rows"] for info in manifest["tables"].values())
+        logger.info(f"Archive de clôture {file_path} : {len(manifest['tables'])} tables, {total} lignes")
+        messagebox.showinfo("Clôture", f"Archive exportée :\n{file_path}\n{len(manifest['tables'])} tables, {total} lignes")
 
     def export_bilan_pdf(self):
         # Tu peux adapter ici pour rassembler les synthèses nécessaires
@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from db.db import get_df_or_sql, get_connection
-import pandas as pd
+from db.paging import SqlDataSource
+from ui.virtual_treeview import VirtualTreeview
 from datetime import date
 
 class DepotsRetraitsBanqueModule:
@@ -25,50 +26,44 @@ class DepotsRetraitsBanqueModule:
         self.cmb_banque = ttk.Combobox(frm_btn, textvariable=self.var_banque, width=15, state="readonly")
         self.cmb_banque.pack(side=tk.LEFT)
         self.cmb_banque.bind("<<ComboboxSelected>>", lambda e: self.refresh_table())
-        tk.Button(frm_btn, text="Tout afficher", command=lambda: self.var_banque.set('')).pack(side=tk.LEFT, padx=3)
-
-        self.tree = ttk.Treeview(
-            self.top,
-            columns=("id", "date", "type", "montant", "reference", "banque", "pointe", "commentaire"),
-            show="headings", selectmode="browse"
+        tk.Button(frm_btn, text="Tout afficher", command=lambda: (self.var_banque.set(''), self.refresh_table())).pack(side=tk.LEFT, padx=3)
+
+        # Liste virtuelle : lignes lues par pages, tri et filtre banque en SQL
+        self.source = SqlDataSource(
+            columns=[(c, c) for c in ("date", "type", "montant", "reference", "banque", "pointe", "commentaire")],
+            from_sql="FROM depots_retraits_banque",
+            order_by=[("date", False)],
+            search_columns=["reference", "banque", "commentaire"],
+        )
+        self.listing = VirtualTreeview(
+            self.top, self.source,
+            columns=[
+                (col, col.capitalize(), w, "w")
+                for col, w in zip(("date", "type", "montant", "reference", "banque", "pointe", "commentaire"),
+                                  [90, 120, 90, 110, 90, 60, 250])
+            ],
+            formatter=lambda r: (
+                r["date"], r["type"], f"{r['montant'] or 0:.2f}", r["reference"] or "",
+                r["banque"] or "", "Oui" if r["pointe"] else "Non", r["commentaire"] or ""
+            ),
         )
-        for col, w in zip(
-            ("id", "date", "type", "montant", "reference", "banque", "pointe", "commentaire"),
-            [0, 90, 120, 90, 110, 90, 60, 250]
-        ):
-            self.tree.heading(col, text=col.capitalize())
-            self.tree.column(col, width=w)
-        self.tree["displaycolumns"] = ("date", "type", "montant", "reference", "banque", "pointe", "commentaire")
-        self.tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.listing.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.tree = self.listing.tree
         self.tree.bind("<Double-1>", self.toggle_pointage)
 
     def refresh_table(self):
         banque = self.var_banque.get()
-        query = "SELECT * FROM depots_retraits_banque"
-        if banque:
-            query += " WHERE banque = ?"
-            df = pd.read_sql_query(query, get_connection(), params=(banque,))
-        else:
-            df = get_df_or_sql("depots_retraits_banque")
-
-        banques = sorted(get_df_or_sql("SELECT DISTINCT banque FROM depots_retraits_banque WHERE banque IS NOT NULL AND banque!=''")["banque"].unique().tolist())
+        conn = get_connection()
+        banques = [r[0] for r in conn.execute(
+            "SELECT DISTINCT banque FROM depots_retraits_banque WHERE banque IS NOT NULL AND banque!='' ORDER BY banque"
+        )]
+        conn.close()
         self.cmb_banque["values"] = [""] + banques
-
-        self.tree.delete(*self.tree.get_children())
-        for _, row in df.iterrows():
-            self.tree.insert(
-                "", "end", iid=row["id"],
-                values=(
-                    row["id"],
-                    row["date"],
-                    row["type"],
-                    f"{row['montant']:.2f}",
-                    row.get("reference", ""),
-                    row.get("banque", ""),
-                    "Oui" if row.get("pointe", 0) else "Non",
-                    row.get("commentaire", "")
-                )
-            )
+        filters = [("banque = ?", (banque,))] if banque else []
+        if filters == self.source.filters:
+            self.listing.refresh()  # Même filtre : position de défilement conservée
+        else:
+            self.listing.set_filters(filters)
 
     def ajouter_mouvement(self):
         win = tk.Toplevel(self.top)
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from db.db import get_connection
+from ui.tree_sync import sync_treeview
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
 
@@ -33,23 +34,23 @@ class EventCaissesWindow(tk.Toplevel):
 
     def refresh_caisses(self):
         try:
-            for row in self.tree.get_children():
-                self.tree.delete(row)
             conn = get_connection()
             caisses = conn.execute(
                 "SELECT * FROM event_caisses WHERE event_id = ? ORDER BY id", (self.event_id,)
             ).fetchall()
-            for caisse in caisses:
-                self.tree.insert(
-                    "", "end",
-                    values=(
+            conn.close()
+            sync_treeview(self.tree, [
+                (
+                    caisse["id"],
+                    (
                         caisse["id"],
                         caisse["nom"],
                         f"{caisse['solde_initial']:.2f}" if caisse["solde_initial"] is not None else "",
                         caisse["responsable"] or ""
                     )
                 )
-            conn.close()
+                for caisse in caisses
+            ])
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des caisses."))
 
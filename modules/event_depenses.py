@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from db.db import get_connection
+from ui.tree_sync import sync_treeview
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
 
@@ -36,16 +37,15 @@ class EventDepensesWindow(tk.Toplevel):
 
     def refresh_depenses(self):
         try:
-            for row in self.tree.get_children():
-                self.tree.delete(row)
             conn = get_connection()
             depenses = conn.execute(
                 "SELECT * FROM event_depenses WHERE event_id = ? ORDER BY date, id", (self.event_id,)
             ).fetchall()
+            rows = []
             for dep in depenses:
-                self.tree.insert(
-                    "", "end",
-                    values=(
+                rows.append((
+                    dep["id"],
+                    (
                         dep["id"],
                         dep["date"],
                         dep["fournisseur"] or "",
@@ -54,8 +54,9 @@ class EventDepensesWindow(tk.Toplevel):
                         dep["description"] or "",
                         dep["justificatif"] or ""
                     )
-                )
+                ))
             conn.close()
+            sync_treeview(self.tree, rows)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des dépenses."))
 
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import pandas as pd
 from db.db import get_connection, DataSource, get_df_or_sql
+from modules.event_modules_db import load_module_grid, save_module_row, delete_module_row
 from utils.error_handler import handle_exception
 from utils.app_logger import get_logger
 
@@ -65,18 +66,9 @@ class EventModuleDataWindow(tk.Toplevel):
         try:
             for row in self.tree.get_children():
                 self.tree.delete(row)
-            conn = get_connection()
-            df = pd.read_sql_query("SELECT * FROM event_module_data WHERE module_id=? ORDER BY row_index", conn, params=(self.module_id,))
-            conn.close()
-            grouped = {}
-            for _, row in df.iterrows():
-                idx = row["row_index"]
-                if idx not in grouped:
-                    grouped[idx] = {}
-                grouped[idx][row["field_id"]] = row["valeur"]
-            for idx in sorted(grouped):
-                vals = [idx] + [grouped[idx].get(f[0], "") for f in self.fields]
-                self.tree.insert("", "end", values=vals)
+            _, rows = load_module_grid(self.module_id, self.fields)
+            for idx, values in rows:
+                self.tree.insert("", "end", values=(idx,) + values)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des données du module."))
 
@@ -89,12 +81,6 @@ class EventModuleDataWindow(tk.Toplevel):
 
     def add_row(self):
         try:
-            # Détermine le prochain row_index
-            conn = get_connection()
-            res = conn.execute("SELECT MAX(row_index) FROM event_module_data WHERE module_id=?", (self.module_id,)).fetchone()
-            next_idx = (res[0] or 0) + 1
-            conn.close()
-
             row_values = []
             for field in self.fields:
                 field_id, nom_champ, modele_colonne = field
@@ -114,15 +100,8 @@ class EventModuleDataWindow(tk.Toplevel):
                     return  # Annulé
                 row_values.append((field_id, valeur))
 
-            # Enregistre chaque valeur dans event_module_data
-            conn = get_connection()
-            for field_id, valeur in row_values:
-                conn.execute(
-                    "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
-                    (self.module_id, next_idx, field_id, valeur)
-                )
-            conn.commit()
-            conn.close()
+            # Nouvelle ligne en fin de tableau, selon le mode de stockage du module
+            save_module_row(self.module_id, dict(row_values))
             self.load_data()
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'ajout d'une ligne."))
@@ -134,10 +113,7 @@ class EventModuleDataWindow(tk.Toplevel):
         rowidx = self.get_selected_row_index()
         if rowidx is not None and messagebox.askyesno("Suppression", f"Supprimer la ligne {rowidx} ?"):
             try:
-                conn = get_connection()
-                conn.execute("DELETE FROM event_module_data WHERE module_id=? AND row_index=?", (self.module_id, rowidx))
-                conn.commit()
-                conn.close()
+                delete_module_row(self.module_id, rowidx)
                 self.load_data()
             except Exception as e:
                 messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de la suppression de la ligne."))
\ No newline at end of file
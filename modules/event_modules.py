@@ -1,10 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from db.db import get_connection
+from db.db import get_connection, traced
+from modules.event_modules_db import (
+    STORAGE_CELLS, STORAGE_ROWS, list_module_fields, load_module_grid, module_grid_dataframe,
+    save_module_row, set_module_cell, delete_module_row, delete_module_field_values,
+    delete_module_values, recompute_module_totals, get_module_storage, set_module_storage
+)
 from modules.model_colonnes import GestionModelColonnes, ask_add_custom_column, get_choix_pour_colonne
 from dialogs.add_row_dialog import AddRowDialog
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
+from ui.task_runner import run_task
 
 logger = get_logger("event_modules")
 
@@ -121,7 +127,7 @@ class EventModulesWindow(tk.Toplevel):
             conn = get_connection()
             conn.execute("DELETE FROM event_modules WHERE id=?", (mid,))
             conn.execute("DELETE FROM event_module_fields WHERE module_id=?", (mid,))
-            conn.execute("DELETE FROM event_module_data WHERE module_id=?", (mid,))
+            delete_module_values(mid, conn)
             conn.commit()
             conn.close()
             self.refresh_modules()
@@ -189,6 +195,7 @@ class ModuleTableWindow(tk.Toplevel):
         tk.Button(btnf, text="Exporter PDF", command=self.export_pdf).pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(btnf, text="Exporter Excel", command=self.export_excel).pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(btnf, text="Modèles de colonnes", command=self.open_model_colonnes).pack(side=tk.LEFT, padx=4, pady=4)
+        tk.Button(btnf, text="Mode de stockage", command=self.change_storage).pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(btnf, text="Fermer", command=self.destroy).pack(side=tk.RIGHT, padx=5, pady=4)
 
         self.fields = []
@@ -199,13 +206,28 @@ class ModuleTableWindow(tk.Toplevel):
     def open_model_colonnes(self):
         GestionModelColonnes(self)
 
+    def change_storage(self):
+        try:
+            current = get_module_storage(self.module_id)
+            target = STORAGE_ROWS if current == STORAGE_CELLS else STORAGE_CELLS
+            if target == STORAGE_ROWS:
+                question = ("Stockage actuel : une entrée par cellule.\n\n"
+                            "Passer au stockage compact (une entrée par ligne) ?\n"
+                            "Recommandé pour les tableaux de plusieurs milliers de lignes.")
+            else:
+                question = ("Stockage actuel : compact (une entrée par ligne).\n\n"
+                            "Revenir au stockage par cellule ?")
+            if not messagebox.askyesno("Mode de stockage", question):
+                return
+            count = set_module_storage(self.module_id, target)
+            logger.info(f"Module {self.module_id} converti en stockage '{target}' ({count} ligne(s)).")
+            self.refresh_data()
+        except Exception as e:
+            messagebox.showerror("Erreur", handle_exception(e, "Erreur lors du changement de mode de stockage."))
+
     def refresh_fields(self):
         try:
-            conn = get_connection()
-            self.fields = conn.execute(
-                "SELECT * FROM event_module_fields WHERE module_id = ? ORDER BY id", (self.module_id,)
-            ).fetchall()
-            conn.close()
+            self.fields = list_module_fields(self.module_id)
             # Update tree columns
             self.tree["columns"] = [f["id"] for f in self.fields]
             for f in self.fields:
@@ -225,24 +247,15 @@ class ModuleTableWindow(tk.Toplevel):
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de la récupération des colonnes du module."))
 
+    @traced()
     def refresh_data(self):
         try:
             for row in self.tree.get_children():
                 self.tree.delete(row)
-            conn = get_connection()
-            rows = conn.execute(
-                "SELECT row_index FROM event_module_data WHERE module_id = ? GROUP BY row_index ORDER BY row_index", (self.module_id,)
-            ).fetchall()
-            for row in rows:
-                values = []
-                for f in self.fields:
-                    val = conn.execute(
-                        "SELECT valeur FROM event_module_data WHERE module_id = ? AND row_index = ? AND field_id = ?",
-                        (self.module_id, row["row_index"], f["id"])
-                    ).fetchone()
-                    values.append("" if not val else val["valeur"])
-                self.tree.insert("", "end", iid=row["row_index"], values=values)
-            conn.close()
+            # Toutes les cellules du module en une requête (modules/event_modules_db.py)
+            _, rows = load_module_grid(self.module_id, self.fields)
+            for row_index, values in rows:
+                self.tree.insert("", "end", iid=row_index, values=values)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors du rafraîchissement des données du module."))
 
@@ -285,7 +298,7 @@ class ModuleTableWindow(tk.Toplevel):
                 return
             field_id = self.fields[idx-1]["id"]
             conn = get_connection()
-            conn.execute("DELETE FROM event_module_data WHERE module_id=? AND field_id=?", (self.module_id, field_id))
+            delete_module_field_values(self.module_id, field_id, conn)
             conn.execute("DELETE FROM event_module_fields WHERE id=?", (field_id,))
             if self.id_col_total and int(field_id) == self.id_col_total:
                 conn.execute("UPDATE event_modules SET id_col_total=NULL WHERE id=?", (self.module_id,))
@@ -364,21 +377,9 @@ class ModuleTableWindow(tk.Toplevel):
             dlg = AddRowDialog(self, self.fields, get_choices)
             if not dlg.result:
                 return
-            conn = get_connection()
-            row_idx = conn.execute(
-                "SELECT MAX(row_index) as mx FROM event_module_data WHERE module_id = ?", (self.module_id,)
-            ).fetchone()
-            next_row = 1 if not row_idx or not row_idx["mx"] else row_idx["mx"] + 1
-            for f in self.fields:
-                val = dlg.result.get(f["id"], "")
-                conn.execute(
-                    "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
-                    (self.module_id, next_row, f["id"], val)
-                )
-            conn.commit()
+            next_row = save_module_row(self.module_id, {f["id"]: dlg.result.get(f["id"], "") for f in self.fields})
             if self.id_col_total:
                 self.recompute_total_for_row(next_row)
-            conn.close()
             self.refresh_data()
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'ajout de ligne."))
@@ -389,11 +390,7 @@ class ModuleTableWindow(tk.Toplevel):
             if not sel:
                 messagebox.showwarning("Sélection", "Sélectionne une ligne à supprimer.")
                 return
-            row_idx = int(sel[0])
-            conn = get_connection()
-            conn.execute("DELETE FROM event_module_data WHERE module_id=? AND row_index=?", (self.module_id, row_idx))
-            conn.commit()
-            conn.close()
+            delete_module_row(self.module_id, int(sel[0]))
             self.refresh_data()
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de la suppression de ligne."))
@@ -424,23 +421,7 @@ class ModuleTableWindow(tk.Toplevel):
         def on_validate(e=None):
             try:
                 new_value = entry.get()
-                conn = get_connection()
-                res = conn.execute(
-                    "SELECT id FROM event_module_data WHERE module_id=? AND row_index=? AND field_id=?",
-                    (self.module_id, int(rowid), selected_field["id"])
-                ).fetchone()
-                if res:
-                    conn.execute(
-                        "UPDATE event_module_data SET valeur=? WHERE id=?",
-                        (new_value, res["id"])
-                    )
-                else:
-                    conn.execute(
-                        "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
-                        (self.module_id, int(rowid), selected_field["id"], new_value)
-                    )
-                conn.commit()
-                conn.close()
+                set_module_cell(self.module_id, int(rowid), selected_field["id"], new_value)
                 entry.destroy()
                 self.editing_entry = None
                 if self.id_col_total:
@@ -494,40 +475,7 @@ class ModuleTableWindow(tk.Toplevel):
         try:
             if not self.id_col_total:
                 return
-            conn = get_connection()
-            total = 0.0
-            for f in self.fields:
-                val_prix = f["prix_unitaire"] if "prix_unitaire" in f.keys() else None
-                if val_prix not in (None, "", 0):
-                    try:
-                        prix = float(val_prix)
-                    except Exception:
-                        prix = 0
-                    val_row = conn.execute(
-                        "SELECT valeur FROM event_module_data WHERE module_id=? AND row_index=? AND field_id=?",
-                        (self.module_id, rowid, f["id"])
-                    ).fetchone()
-                    try:
-                        qte = float(val_row["valeur"]) if val_row and val_row["valeur"] not in (None, "") else 0
-                    except Exception:
-                        qte = 0
-                    total += qte * prix
-            res_total = conn.execute(
-                "SELECT id FROM event_module_data WHERE module_id=? AND row_index=? AND field_id=?",
-                (self.module_id, rowid, self.id_col_total)
-            ).fetchone()
-            if res_total:
-                conn.execute(
-                    "UPDATE event_module_data SET valeur=? WHERE id=?",
-                    (f"{total:.2f}", res_total["id"])
-                )
-            else:
-                conn.execute(
-                    "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
-                    (self.module_id, rowid, self.id_col_total, f"{total:.2f}")
-                )
-            conn.commit()
-            conn.close()
+            recompute_module_totals(self.module_id, self.id_col_total, row_index=rowid)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors du calcul du total ligne."))
 
@@ -535,13 +483,8 @@ class ModuleTableWindow(tk.Toplevel):
         try:
             if not self.id_col_total:
                 return
-            conn = get_connection()
-            rows = conn.execute(
-                "SELECT row_index FROM event_module_data WHERE module_id = ? GROUP BY row_index ORDER BY row_index", (self.module_id,)
-            ).fetchall()
-            conn.close()
-            for row in rows:
-                self.recompute_total_for_row(row["row_index"])
+            # Toutes les lignes en une passe et une transaction (modules/event_modules_db.py)
+            recompute_module_totals(self.module_id, self.id_col_total)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors du recalcul des totaux."))
 
@@ -556,31 +499,12 @@ class ModuleTableWindow(tk.Toplevel):
             messagebox.showerror("Export PDF", "Le module d'export PDF n'est pas disponible.")
             return
 
-        try:
-            conn = get_connection()
-            fields = conn.execute(
-                "SELECT * FROM event_module_fields WHERE module_id = ? ORDER BY id", (self.module_id,)
-            ).fetchall()
-            rows = conn.execute(
-                "SELECT row_index FROM event_module_data WHERE module_id = ? GROUP BY row_index ORDER BY row_index", (self.module_id,)
-            ).fetchall()
-            headers = [f["nom_champ"] for f in fields]
-            data = []
-            for row in rows:
-                values = []
-                for f in fields:
-                    val = conn.execute(
-                        "SELECT valeur FROM event_module_data WHERE module_id=? AND row_index=? AND field_id=?",
-                        (self.module_id, row["row_index"], f["id"])
-                    ).fetchone()
-                    values.append("" if not val else val["valeur"])
-                data.append(values)
-            import pandas as pd
-            df = pd.DataFrame(data, columns=headers)
-            conn.close()
-            export_dataframe_to_pdf(df, title="Export PDF - Module personnalisé")
-        except Exception as e:
-            messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'export PDF du module personnalisé."))
+        # Grille lue en arrière-plan, fichier écrit dans le thread Tk (dialogue d'enregistrement)
+        run_task(
+            self, module_grid_dataframe, self.module_id,
+            on_done=lambda df: export_dataframe_to_pdf(df, title="Export PDF - Module personnalisé"),
+            title="Export PDF", message="Lecture du module…",
+        )
 
     def export_excel(self):
         try:
@@ -594,28 +518,9 @@ class ModuleTableWindow(tk.Toplevel):
             messagebox.showerror("Export Excel", "Le module d'export Excel n'est pas disponible.")
             return
 
-        try:
-            conn = get_connection()
-            fields = conn.execute(
-                "SELECT * FROM event_module_fields WHERE module_id = ? ORDER BY id", (self.module_id,)
-            ).fetchall()
-            rows = conn.execute(
-                "SELECT row_index FROM event_module_data WHERE module_id = ? GROUP BY row_index ORDER BY row_index", (self.module_id,)
-            ).fetchall()
-            headers = [f["nom_champ"] for f in fields]
-            data = []
-            for row in rows:
-                values = []
-                for f in fields:
-                    val = conn.execute(
-                        "SELECT valeur FROM event_module_data WHERE module_id=? AND row_index=? AND field_id=?",
-                        (self.module_id, row["row_index"], f["id"])
-                    ).fetchone()
-                    values.append("" if not val else val["valeur"])
-                data.append(values)
-            import pandas as pd
-            df = pd.DataFrame(data, columns=headers)
-            conn.close()
-            export_dataframe_to_excel(df, title="Export Excel - Module personnalisé")
-        except Exception as e:
-            messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'export Excel du module personnalisé."))
\ No newline at end of file
+        # Grille lue en arrière-plan, fichier écrit dans le thread Tk (dialogue d'enregistrement)
+        run_task(
+            self, module_grid_dataframe, self.module_id,
+            on_done=lambda df: export_dataframe_to_excel(df, title="Export Excel - Module personnalisé"),
+            title="Export Excel", message="Lecture du module…",
+        )
\ No newline at end of file
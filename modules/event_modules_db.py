@@ -0,0 +1,405 @@
+"""
+Accès aux tableaux personnalisés des modules d'événement.
+
+Deux modes de stockage, choisis par module (colonne event_modules.storage) :
+- "cellules" (défaut) : une ligne event_module_data par cellule (module_id,
+  row_index, field_id, valeur) ;
+- "lignes" : une ligne event_module_rows par ligne du tableau, les valeurs en
+  objet JSON indexé par l'id de colonne. Pour les gros modules (commandes,
+  paiements), une ligne saisie n'écrit qu'un enregistrement au lieu d'un par
+  colonne, et la base ne porte plus d'index par cellule.
+
+Les fenêtres, exports et recettes liées passent par les fonctions ci-dessous,
+qui masquent le mode ; set_module_storage() convertit un module d'un mode à
+l'autre.
+
+load_module_grid() lit tout un module en une requête ordonnée et le pivote en
+mémoire en lignes alignées sur les colonnes : le nombre de requêtes ne dépend
+ni du nombre de lignes ni du nombre de colonnes. recompute_module_totals()
+recalcule la colonne « Montant total » de toutes les lignes (ou d'une seule) en
+une requête agrégée et une transaction ; sum_module_column() somme une colonne.
+Les nombres sont lus avec la conversion de db/module_values.py (virgule
+décimale), colonne calculée indexée valeur_num en mode "cellules".
+"""
+
+import json
+
+from db.db import get_connection
+from db.module_values import sql_numeric_value
+
+STORAGE_CELLS = "cellules"
+STORAGE_ROWS = "lignes"
+STORAGES = (STORAGE_CELLS, STORAGE_ROWS)
+
+
+def _json_path(field_id):
+    """Chemin JSON de la valeur d'une colonne dans event_module_rows.valeurs."""
+    return f'$."{int(field_id)}"'
+
+
+def _module_storage(conn, module_id):
+    row = conn.execute("SELECT storage FROM event_modules WHERE id = ?", (module_id,)).fetchone()
+    return row[0] if row and row[0] in STORAGES else STORAGE_CELLS
+
+
+def get_module_storage(module_id):
+    """Mode de stockage d'un module ("cellules" ou "lignes")."""
+    conn = get_connection()
+    try:
+        return _module_storage(conn, module_id)
+    finally:
+        conn.close()
+
+
+def list_module_fields(module_id, conn=None):
+    """Colonnes d'un module, dans l'ordre d'affichage (id croissant)."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        return conn.execute(
+            "SELECT * FROM event_module_fields WHERE module_id = ? ORDER BY id", (module_id,)
+        ).fetchall()
+    finally:
+        if own:
+            conn.close()
+
+
+def _cleaned(values):
+    return tuple("" if v is None else v for v in values)
+
+
+def load_module_grid(module_id, fields=None):
+    """
+    Tableau d'un module : (fields, rows).
+
+    fields : colonnes du module (relues si non fournies).
+    rows : liste de (row_index, valeurs) triée par row_index, valeurs étant un
+    tuple aligné sur fields ("" pour une cellule absente).
+    """
+    conn = get_connection()
+    try:
+        if fields is None:
+            fields = list_module_fields(module_id, conn)
+        if _module_storage(conn, module_id) == STORAGE_ROWS:
+            records = conn.execute(
+                "SELECT row_index, valeurs FROM event_module_rows WHERE module_id = ? ORDER BY row_index",
+                (module_id,)
+            ).fetchall()
+            keys = [str(f["id"]) for f in fields]
+            rows = []
+            for row_index, valeurs in records:
+                data = json.loads(valeurs or "{}")
+                rows.append((row_index, _cleaned(data.get(k) for k in keys)))
+            return fields, rows
+        cells = conn.execute(
+            "SELECT row_index, field_id, valeur FROM event_module_data "
+            "WHERE module_id = ? ORDER BY row_index, field_id, id",
+            (module_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    positions = {int(f["id"]): i for i, f in enumerate(fields)}
+    rows = []
+    current_index = object()
+    values = None
+    for row_index, field_id, valeur in cells:
+        if row_index != current_index:
+            if values is not None:
+                rows.append((current_index, _cleaned(values)))
+            current_index = row_index
+            values = [None] * len(fields)
+        pos = positions.get(field_id)
+        # Première valeur rencontrée pour une cellule en double
+        if pos is not None and values[pos] is None:
+            values[pos] = valeur
+    if values is not None:
+        rows.append((current_index, _cleaned(values)))
+    return fields, rows
+
+
+def module_grid_dataframe(module_id):
+    """Tableau d'un module en DataFrame (en-têtes = noms des colonnes), pour les exports."""
+    import pandas as pd
+    fields, rows = load_module_grid(module_id)
+    return pd.DataFrame([values for _, values in rows], columns=[f["nom_champ"] for f in fields])
+
+
+def load_module_row(module_id, row_index):
+    """Valeurs d'une ligne : dictionnaire {field_id: valeur}."""
+    conn = get_connection()
+    try:
+        if _module_storage(conn, module_id) == STORAGE_ROWS:
+            row = conn.execute(
+                "SELECT valeurs FROM event_module_rows WHERE module_id = ? AND row_index = ?",
+                (module_id, row_index)
+            ).fetchone()
+            data = json.loads(row[0] or "{}") if row else {}
+            return {int(k): v for k, v in data.items()}
+        values = {}
+        for field_id, valeur in conn.execute(
+            "SELECT field_id, valeur FROM event_module_data WHERE module_id = ? AND row_index = ? ORDER BY id",
+            (module_id, row_index)
+        ):
+            values.setdefault(field_id, valeur)
+        return values
+    finally:
+        conn.close()
+
+
+def save_module_row(module_id, values, row_index=None):
+    """
+    Enregistre une ligne ({field_id: valeur}) : nouvelle ligne en fin de tableau
+    si row_index est None, sinon remplace les valeurs de la ligne. Retourne row_index.
+    """
+    conn = get_connection()
+    try:
+        rows_mode = _module_storage(conn, module_id) == STORAGE_ROWS
+        table = "event_module_rows" if rows_mode else "event_module_data"
+        if row_index is None:
+            mx = conn.execute(f"SELECT MAX(row_index) FROM {table} WHERE module_id = ?", (module_id,)).fetchone()[0]
+            row_index = (mx or 0) + 1
+        if rows_mode:
+            conn.execute(
+                "INSERT OR REPLACE INTO event_module_rows (module_id, row_index, valeurs) VALUES (?, ?, ?)",
+                (module_id, row_index, json.dumps({str(k): v for k, v in values.items()}, ensure_ascii=False))
+            )
+        else:
+            conn.execute("DELETE FROM event_module_data WHERE module_id = ? AND row_index = ?", (module_id, row_index))
+            conn.executemany(
+                "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
+                [(module_id, row_index, field_id, valeur) for field_id, valeur in values.items()]
+            )
+        conn.commit()
+        return row_index
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _set_cells(conn, module_id, cells, storage=None):
+    """Écrit des cellules [(row_index, field_id, valeur)] dans le mode du module (sans commit)."""
+    if storage is None:
+        storage = _module_storage(conn, module_id)
+    if storage == STORAGE_ROWS:
+        conn.executemany(
+            "INSERT INTO event_module_rows (module_id, row_index, valeurs) VALUES (?, ?, json_object(?, ?)) "
+            "ON CONFLICT(module_id, row_index) DO UPDATE SET valeurs = json_set(valeurs, ?, ?)",
+            [
+                (module_id, row_index, str(int(field_id)), valeur, _json_path(field_id), valeur)
+                for row_index, field_id, valeur in cells
+            ]
+        )
+        return
+    cells = list(cells)
+    existing = {}
+    if cells:
+        field_ids = sorted({int(f) for _, f, _ in cells})
+        for cell_id, row_index, field_id in conn.execute(
+            "SELECT id, row_index, field_id FROM event_module_data "
+            f"WHERE module_id = ? AND field_id IN ({', '.join('?' * len(field_ids))}) ORDER BY id",
+            [module_id] + field_ids
+        ):
+            existing.setdefault((row_index, field_id), cell_id)
+    conn.executemany(
+        "UPDATE event_module_data SET valeur = ? WHERE id = ?",
+        [(valeur, existing[(r, int(f))]) for r, f, valeur in cells if (r, int(f)) in existing]
+    )
+    conn.executemany(
+        "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
+        [(module_id, r, f, valeur) for r, f, valeur in cells if (r, int(f)) not in existing]
+    )
+
+
+def set_module_cell(module_id, row_index, field_id, valeur):
+    """Modifie (ou crée) une cellule."""
+    conn = get_connection()
+    try:
+        _set_cells(conn, module_id, [(row_index, field_id, valeur)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def delete_module_row(module_id, row_index):
+    """Supprime une ligne du tableau."""
+    conn = get_connection()
+    try:
+        conn.execute("DELETE FROM event_module_data WHERE module_id = ? AND row_index = ?", (module_id, row_index))
+        conn.execute("DELETE FROM event_module_rows WHERE module_id = ? AND row_index = ?", (module_id, row_index))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def delete_module_field_values(module_id, field_id, conn):
+    """Supprime les valeurs d'une colonne (sans commit, dans la transaction de l'appelant)."""
+    conn.execute("DELETE FROM event_module_data WHERE module_id = ? AND field_id = ?", (module_id, field_id))
+    conn.execute(
+        "UPDATE event_module_rows SET valeurs = json_remove(valeurs, ?) WHERE module_id = ?",
+        (_json_path(field_id), module_id)
+    )
+
+
+def delete_module_values(module_id, conn):
+    """Supprime toutes les valeurs d'un module (sans commit)."""
+    conn.execute("DELETE FROM event_module_data WHERE module_id = ?", (module_id,))
+    conn.execute("DELETE FROM event_module_rows WHERE module_id = ?", (module_id,))
+
+
+def set_module_storage(module_id, storage):
+    """
+    Convertit un module vers le mode de stockage demandé, en une transaction.
+    Retourne le nombre de lignes du tableau converties (0 si déjà dans ce mode).
+    """
+    if storage not in STORAGES:
+        raise ValueError(f"Mode de stockage inconnu : {storage}")
+    conn = get_connection()
+    try:
+        if _module_storage(conn, module_id) == storage:
+            return 0
+        if storage == STORAGE_ROWS:
+            # Première valeur de chaque cellule (doublons ignorés), colonnes triées
+            conn.execute("""
+                INSERT OR REPLACE INTO event_module_rows (module_id, row_index, valeurs)
+                SELECT module_id, row_index, json_group_object(CAST(field_id AS TEXT), valeur)
+                FROM (
+                    SELECT d.module_id, d.row_index, d.field_id, d.valeur
+                    FROM event_module_data d
+                    WHERE d.module_id = ? AND d.id = (
+                        SELECT MIN(id) FROM event_module_data
+                        WHERE module_id = d.module_id AND row_index = d.row_index AND field_id = d.field_id
+                    )
+                    ORDER BY d.row_index, d.field_id
+                )
+                GROUP BY row_index
+            """, (module_id,))
+            count = conn.execute("SELECT COUNT(*) FROM event_module_rows WHERE module_id = ?", (module_id,)).fetchone()[0]
+            conn.execute("DELETE FROM event_module_data WHERE module_id = ?", (module_id,))
+        else:
+            count = conn.execute("SELECT COUNT(*) FROM event_module_rows WHERE module_id = ?", (module_id,)).fetchone()[0]
+            conn.execute("""
+                INSERT INTO event_module_data (module_id, row_index, field_id, valeur)
+                SELECT r.module_id, r.row_index, CAST(j.key AS INTEGER), j.value
+                FROM event_module_rows r, json_each(r.valeurs) j
+                WHERE r.module_id = ?
+                ORDER BY r.row_index, CAST(j.key AS INTEGER)
+            """, (module_id,))
+            conn.execute("DELETE FROM event_module_rows WHERE module_id = ?", (module_id,))
+        conn.execute("UPDATE event_modules SET storage = ? WHERE id = ?", (storage, module_id))
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _unit_price(field):
+    """Prix unitaire d'une colonne (None si la colonne n'est pas tarifée)."""
+    val_prix = field["prix_unitaire"] if "prix_unitaire" in field.keys() else None
+    if val_prix in (None, "", 0):
+        return None
+    try:
+        return float(str(val_prix).replace(",", "."))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def recompute_module_totals(module_id, total_field_id=None, row_index=None):
+    """
+    Recalcule la colonne « Montant total » d'un module : somme, pour chaque
+    ligne, des quantités × prix unitaire des colonnes tarifées.
+
+    Tout le module (ou la seule ligne row_index) est calculé par une requête
+    agrégée (GROUP BY row_index), puis écrit par executemany dans une seule
+    transaction.
+    total_field_id : colonne total (lue dans event_modules si None).
+    Retourne le nombre de lignes recalculées.
+    """
+    conn = get_connection()
+    try:
+        module = conn.execute("SELECT id_col_total, storage FROM event_modules WHERE id = ?", (module_id,)).fetchone()
+        if total_field_id is None:
+            total_field_id = module["id_col_total"] if module else None
+        if not total_field_id:
+            return 0
+        total_field_id = int(total_field_id)
+        storage = module["storage"] if module and module["storage"] in STORAGES else STORAGE_CELLS
+        rows_mode = storage == STORAGE_ROWS
+        prices = {}
+        for f in list_module_fields(module_id, conn):
+            prix = _unit_price(f)
+            if prix is not None:
+                prices[int(f["id"])] = prix
+
+        # Prix par colonne en CASE : les colonnes non tarifées comptent pour 0
+        if rows_mode:
+            field_sql, value_sql = "j.key", sql_numeric_value("j.value")
+            params = [p for fid, prix in prices.items() for p in (str(fid), prix)]
+        else:
+            field_sql, value_sql = "field_id", "valeur_num"
+            params = [p for item in prices.items() for p in item]
+        if prices:
+            price_sql = f"CASE {field_sql} " + " ".join("WHEN ? THEN ?" for _ in prices) + " ELSE 0 END"
+        else:
+            price_sql = "0"
+        if rows_mode:
+            sql = (
+                f"SELECT r.row_index, COALESCE(SUM({value_sql} * {price_sql}), 0) "
+                "FROM event_module_rows r LEFT JOIN json_each(r.valeurs) j WHERE r.module_id = ?"
+            )
+            params.append(module_id)
+            if row_index is not None:
+                sql += " AND r.row_index = ?"
+                params.append(row_index)
+            sql += " GROUP BY r.row_index"
+        else:
+            sql = (
+                f"SELECT row_index, COALESCE(SUM({value_sql} * {price_sql}), 0) "
+                "FROM event_module_data WHERE module_id = ?"
+            )
+            params.append(module_id)
+            if row_index is not None:
+                sql += " AND row_index = ?"
+                params.append(row_index)
+            sql += " GROUP BY row_index"
+        totals = dict(conn.execute(sql, params).fetchall())
+        if row_index is not None:
+            totals.setdefault(row_index, 0.0)
+
+        _set_cells(conn, module_id, [(r, total_field_id, f"{total:.2f}") for r, total in totals.items()], storage)
+        conn.commit()
+        return len(totals)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def sum_module_column(module_id, field_id):
+    """Somme des valeurs numériques d'une colonne de module (index module_id, field_id, valeur_num)."""
+    conn = get_connection()
+    try:
+        if _module_storage(conn, module_id) == STORAGE_ROWS:
+            row = conn.execute(
+                f"SELECT COALESCE(SUM({sql_numeric_value('json_extract(valeurs, ?1)')}), 0) "
+                "FROM event_module_rows WHERE module_id = ?2",
+                (_json_path(field_id), module_id)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT COALESCE(SUM(valeur_num), 0) FROM event_module_data WHERE module_id = ? AND field_id = ?",
+                (module_id, field_id)
+            ).fetchone()
+        return row[0]
+    finally:
+        conn.close()
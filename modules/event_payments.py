@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from db.db import get_connection
+from ui.tree_sync import sync_treeview
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
 
@@ -33,17 +34,17 @@ class PaymentsWindow(tk.Toplevel):
 
     def refresh_payments(self):
         try:
-            for row in self.tree.get_children():
-                self.tree.delete(row)
             conn = get_connection()
             pays = conn.execute(
                 "SELECT * FROM event_payments WHERE event_id = ? ORDER BY id DESC", (self.event_id,)
             ).fetchall()
-            for p in pays:
-                self.tree.insert("", "end", values=(
+            conn.close()
+            sync_treeview(self.tree, [
+                (p["id"], (
                     p["id"], p["nom_payeuse"], p["classe"], p["mode_paiement"], p["banque"], p["numero_cheque"], p["montant"], p["commentaire"]
                 ))
-            conn.close()
+                for p in pays
+            ])
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des paiements."))
 
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from db.db import get_connection
+from db.db import get_connection, traced
+from modules.events_db import list_event_recettes
+from ui.tree_sync import sync_treeview
+from modules.event_modules_db import sum_module_column
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
 
@@ -10,19 +13,9 @@ def update_vente_sur_place_recette(event_id):
     """Calcule le gain de toutes les caisses et l'ajoute/actualise la recette 'Vente sur place'."""
     try:
         conn = get_connection()
-        gain_total = 0
-        caisses = conn.execute("SELECT id FROM event_caisses WHERE event_id=?", (event_id,)).fetchall()
-        for caisse in caisses:
-            cid = caisse["id"]
-            r = conn.execute(
-                "SELECT SUM(CASE WHEN type='cheque' THEN valeur ELSE valeur*quantite END) AS tot FROM event_caisse_details WHERE caisse_id=? AND moment='debut'", (cid,)
-            ).fetchone()
-            fond_debut = r["tot"] if r["tot"] else 0
-            r = conn.execute(
-                "SELECT SUM(CASE WHEN type='cheque' THEN valeur ELSE valeur*quantite END) AS tot FROM event_caisse_details WHERE caisse_id=? AND moment='fin'", (cid,)
-            ).fetchone()
-            fond_fin = r["tot"] if r["tot"] else 0
-            gain_total += (fond_fin - fond_debut)
+        # Gain des caisses tenu à jour par triggers (event_caisse_totals -> event_totals)
+        r = conn.execute("SELECT caisse_gain FROM event_totals WHERE event_id=?", (event_id,)).fetchone()
+        gain_total = r["caisse_gain"] if r else 0
         exist = conn.execute("SELECT id FROM event_recettes WHERE event_id=? AND source='Vente sur place'", (event_id,)).fetchone()
         if exist:
             conn.execute("UPDATE event_recettes SET montant=? WHERE id=?", (gain_total, exist["id"]))
@@ -62,19 +55,13 @@ class EventRecettesWindow(tk.Toplevel):
             self.tree.column(col, width=120 if col in ("montant", "module") else 170)
         self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+    @traced()
     def refresh_recettes(self):
         try:
-            self.tree.delete(*self.tree.get_children())
-            conn = get_connection()
-            recettes = conn.execute("SELECT * FROM event_recettes WHERE event_id=? ORDER BY source", (self.event_id,)).fetchall()
-            for r in recettes:
-                module_name = ""
-                if r["module_id"]:
-                    mod = conn.execute("SELECT nom_module FROM event_modules WHERE id=?", (r["module_id"],)).fetchone()
-                    if mod:
-                        module_name = mod["nom_module"]
-                self.tree.insert("", "end", values=(r["id"], r["source"], module_name, f"{r['montant']:.2f}", r["commentaire"] if r["commentaire"] else ""))
-            conn.close()
+            sync_treeview(self.tree, [
+                (r["id"], (r["id"], r["source"], r["module_name"], f"{r['montant']:.2f}", r["commentaire"] if r["commentaire"] else ""))
+                for r in list_event_recettes(self.event_id)
+            ])
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des recettes."))
 
@@ -212,17 +199,7 @@ class RecetteDialog(tk.Toplevel):
             module_id = int(self.module_choices[module_idx][0])
             field_id = int(self.colonnes_choices[colonne_idx][0])
             try:
-                conn = get_connection()
-                rows = conn.execute(
-                    "SELECT valeur FROM event_module_data WHERE module_id=? AND field_id=?", (module_id, field_id)
-                ).fetchall()
-                somme = 0.0
-                for r in rows:
-                    try:
-                        somme += float(r["valeur"])
-                    except (TypeError, ValueError):
-                        pass
-                conn.close()
+                somme = sum_module_column(module_id, field_id)
                 self.montant_var.set(round(somme, 2))
             except Exception as e:
                 logger.error(f"Erreur update_montant_from_colonne: {e}")
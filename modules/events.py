@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from db.db import get_connection
+from db.db import get_connection, traced
+from modules.events_db import list_events_with_totals
+from ui.tree_sync import sync_treeview
 from modules.event_modules import EventModulesWindow
 from modules.event_payments import PaymentsWindow
 from modules.event_caisses import EventCaissesWindow
@@ -74,24 +76,17 @@ class EventsWindow(tk.Toplevel):
         tk.Button(bottom_frame, text="Recettes événement", command=self.open_recettes, **btn_style).pack(side=tk.LEFT, padx=6)
         tk.Button(bottom_frame, text="Dépenses événement", command=self.open_depenses, **btn_style).pack(side=tk.LEFT, padx=6)
 
+    @traced()
     def refresh_events(self):
         try:
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-            conn = get_connection()
-            events = conn.execute("SELECT * FROM events ORDER BY date DESC").fetchall()
-            for ev in events:
-                event_id = ev["id"]
-                recettes = conn.execute(
-                    "SELECT COALESCE(SUM(montant), 0) FROM event_recettes WHERE event_id = ?", (event_id,)
-                ).fetchone()[0]
-                depenses = conn.execute(
-                    "SELECT COALESCE(SUM(montant), 0) FROM event_depenses WHERE event_id = ?", (event_id,)
-                ).fetchone()[0]
+            rows = []
+            for ev in list_events_with_totals():
+                recettes = ev["recettes"]
+                depenses = ev["depenses"]
                 gain = recettes - depenses
-                self.tree.insert(
-                    "", "end",
-                    values=(
+                rows.append((
+                    ev["id"],
+                    (
                         ev["id"],
                         ev["name"],
                         ev["date"],
@@ -101,8 +96,9 @@ class EventsWindow(tk.Toplevel):
                         f"{depenses:.2f}",
                         f"{gain:.2f}"
                     )
-                )
-            conn.close()
+                ))
+            # Mise à jour par clé : sélection et défilement conservés
+            sync_treeview(self.tree, rows)
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des événements."))
 
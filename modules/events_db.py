@@ -0,0 +1,39 @@
+"""
+Requêtes de chargement des listes du module Événements.
+
+Chaque fonction renvoie ses lignes en un nombre fixe de requêtes, quel que soit
+le nombre d'événements ou de recettes (pas de requête par ligne).
+"""
+
+from db.db import get_connection
+
+
+def list_events_with_totals():
+    """Événements (plus récents d'abord) avec leurs totaux matérialisés (db/event_totals.py)."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT e.*,
+               COALESCE(t.recettes, 0) AS recettes,
+               COALESCE(t.depenses, 0) AS depenses,
+               COALESCE(t.caisse_gain, 0) AS caisse_gain,
+               COALESCE(t.nb_payments, 0) AS nb_payments
+        FROM events e
+        LEFT JOIN event_totals t ON t.event_id = e.id
+        ORDER BY e.date DESC
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def list_event_recettes(event_id):
+    """Recettes d'un événement avec le nom du module lié (ou chaîne vide)."""
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT r.*, COALESCE(m.nom_module, '') AS module_name
+        FROM event_recettes r
+        LEFT JOIN event_modules m ON m.id = r.module_id
+        WHERE r.event_id = ?
+        ORDER BY r.source
+    """, (event_id,)).fetchall()
+    conn.close()
+    return rows
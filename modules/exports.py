@@ -2,6 +2,8 @@ import pandas as pd
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from db.db import get_connection
+from db.event_totals import list_caisse_totals
+from utils.csv_helpers import export_query_csv
 
 # ========== EXPORTS BILAN EVENEMENT ==========
 
@@ -12,6 +14,7 @@ def export_bilan_evenement(event_id, format="xlsx", filename=None):
     if not event:
         messagebox.showerror("Erreur", "Événement introuvable.")
         return
+    totals = conn.execute("SELECT recettes, depenses FROM event_totals WHERE event_id=?", (event_id,)).fetchone()
 
     # Données recettes
     recettes = pd.read_sql_query(
@@ -23,21 +26,11 @@ def export_bilan_evenement(event_id, format="xlsx", filename=None):
         "SELECT categorie, montant, fournisseur, date_depense, paye_par, membre_id, commentaire FROM event_depenses WHERE event_id=?",
         conn, params=(event_id,)
     )
-    # Données caisses
-    caisses = pd.read_sql_query(
-        "SELECT id, nom_caisse, commentaire FROM event_caisses WHERE event_id=?",
-        conn, params=(event_id,)
-    )
-    # Détail fond de caisse
+    # Caisses et fonds de début/fin (event_caisse_totals, une requête)
     caisses_details = []
-    for _, caisse in caisses.iterrows():
-        cid = caisse["id"]
-        debut = conn.execute(
-            "SELECT SUM(CASE WHEN type='cheque' THEN valeur ELSE valeur*quantite END) as total FROM event_caisse_details WHERE caisse_id=? AND moment='debut'", (cid,)
-        ).fetchone()["total"] or 0.0
-        fin = conn.execute(
-            "SELECT SUM(CASE WHEN type='cheque' THEN valeur ELSE valeur*quantite END) as total FROM event_caisse_details WHERE caisse_id=? AND moment='fin'", (cid,)
-        ).fetchone()["total"] or 0.0
+    for caisse in list_caisse_totals(event_id):
+        debut = caisse["fond_debut"]
+        fin = caisse["fond_fin"]
         caisses_details.append({
             "Caisse": caisse["nom_caisse"],
             "Fond début (€)": f"{debut:.2f}",
@@ -93,8 +86,8 @@ def export_bilan_evenement(event_id, format="xlsx", filename=None):
             elements.append(Spacer(1, 16))
 
             # === TABLEAU SYNTHÉTIQUE (Recette/Dépense/Gain) ===
-            total_recettes = recettes["montant"].sum() if not recettes.empty else 0.0
-            total_depenses = depenses["montant"].sum() if not depenses.empty else 0.0
+            total_recettes = totals["recettes"] if totals else 0.0
+            total_depenses = totals["depenses"] if totals else 0.0
             gain = total_recettes - total_depenses
 
             synth_data = [
@@ -208,9 +201,7 @@ def export_bilan_evenement(event_id, format="xlsx", filename=None):
 
 # ========== EXPORTS GLOBAUX DÉPENSES / SUBVENTIONS ==========
 
-def export_depenses_global(format="xlsx", filename=None):
-    conn = get_connection()
-    depenses = pd.read_sql_query("""
+DEPENSES_GLOBAL_SQL = """
         SELECT 
             date_depense as date,
             categorie,
@@ -232,8 +223,9 @@ def export_depenses_global(format="xlsx", filename=None):
             commentaire,
             'Diverse' as type_depense
         FROM depenses_diverses
-    """, conn)
-    conn.close()
+    """
+
+def export_depenses_global(format="xlsx", filename=None):
     if filename is None:
         ext = "." + format
         filename = filedialog.asksaveasfilename(
@@ -244,12 +236,20 @@ def export_depenses_global(format="xlsx", filename=None):
         )
     if not filename:
         return
+    conn = get_connection()
+    if format == "csv":
+        # CSV écrit en flux depuis le curseur, sans DataFrame intermédiaire
+        try:
+            export_query_csv(conn, DEPENSES_GLOBAL_SQL, filename)
+        finally:
+            conn.close()
+        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
+        return
+    depenses = pd.read_sql_query(DEPENSES_GLOBAL_SQL, conn)
+    conn.close()
     if format == "xlsx":
         depenses.to_excel(filename, index=False)
         messagebox.showinfo("Export", f"Export Excel terminé :\n{filename}")
-    elif format == "csv":
-        depenses.to_csv(filename, index=False, encoding="utf-8")
-        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
     elif format == "pdf":
         try:
             from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -308,10 +308,9 @@ def export_depenses_global(format="xlsx", filename=None):
         except ImportError:
             messagebox.showerror("Export", "Le module reportlab n'est pas installé.")
 
+SUBVENTIONS_GLOBAL_SQL = "SELECT * FROM dons_subventions"
+
 def export_subventions_global(format="xlsx", filename=None):
-    conn = get_connection()
-    subventions = pd.read_sql_query("SELECT * FROM dons_subventions", conn)
-    conn.close()
     if filename is None:
         ext = "." + format
         filename = filedialog.asksaveasfilename(
@@ -322,12 +321,20 @@ def export_subventions_global(format="xlsx", filename=None):
         )
     if not filename:
         return
+    conn = get_connection()
+    if format == "csv":
+        # CSV écrit en flux depuis le curseur, sans DataFrame intermédiaire
+        try:
+            export_query_csv(conn, SUBVENTIONS_GLOBAL_SQL, filename)
+        finally:
+            conn.close()
+        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
+        return
+    subventions = pd.read_sql_query(SUBVENTIONS_GLOBAL_SQL, conn)
+    conn.close()
     if format == "xlsx":
         subventions.to_excel(filename, index=False)
         messagebox.showinfo("Export", f"Export Excel terminé :\n{filename}")
-    elif format == "csv":
-        subventions.to_csv(filename, index=False, encoding="utf-8")
-        messagebox.showinfo("Export", f"Export CSV terminé :\n{filename}")
     elif format == "pdf":
         try:
             from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -1,18 +1,66 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-from db.db import get_connection
+from db.db import get_connection, traced
+from db.ledger import list_entries, balance_before, ledger_source, period_filters
+from utils.date_helpers import parse_date, format_date
+from ui.virtual_treeview import VirtualTreeview
+from ui.task_runner import run_task
 from exports.exports import (
     export_dataframe_to_excel,
     export_dataframe_to_pdf,
     export_dataframe_to_csv
 )
 
+
+def opening_balance(date_from=None):
+    """Solde reporté en configuration, augmenté du solde des écritures antérieures à date_from."""
+    solde_ouverture = 0.0
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT solde_report FROM config ORDER BY id DESC LIMIT 1").fetchone()
+        if row and row[0] is not None:
+            solde_ouverture = float(row[0])
+    except Exception:
+        pass
+    finally:
+        conn.close()
+    # Solde avant la période : point de contrôle mensuel + fin de mois (db/ledger.py)
+    if date_from:
+        solde_ouverture += balance_before(date_from)
+    return solde_ouverture
+
+
+@traced()
+def journal_totals(source, date_from, task):
+    """(solde d'ouverture, totaux SQL de la sélection) : thread de travail, voir ui/task_runner.py."""
+    solde_ouverture = opening_balance(date_from)
+    task.check_cancelled()
+    totals = source.aggregate(
+        total="COALESCE(SUM(montant), 0)",
+        recettes="COALESCE(SUM(CASE WHEN montant > 0 THEN montant END), 0)",
+        depenses="COALESCE(SUM(CASE WHEN montant < 0 THEN montant END), 0)",
+    )
+    return solde_ouverture, totals
+
+
+def journal_dataframe(date_from, date_to, task):
+    """Écritures de la période avec solde progressif (exports)."""
+    import pandas as pd
+    rows = list_entries(date_from, date_to, solde_initial=opening_balance(date_from))
+    task.check_cancelled()
+    return pd.DataFrame(
+        [tuple(r) for r in rows],
+        columns=["date", "type", "libelle", "montant", "justificatif", "Solde"]
+    )
+
+
 class JournalModule:
     def __init__(self, master):
         self.top = tk.Toplevel(master)
         self.top.title("Journal Général")
         self.top.geometry("1200x700")
+        self._totals_task = None
+        self._pending_filter = None
         self.create_widgets()
         self.refresh_journal()
 
@@ -25,31 +73,38 @@ class JournalModule:
         search_entry = tk.Entry(filter_frame, textvariable=self.search_var, width=32)
         search_entry.pack(side=tk.LEFT, padx=5)
         search_entry.bind('<Return>', lambda e: self.apply_filter())
+        search_entry.bind('<KeyRelease>', self.schedule_filter)
         tk.Button(filter_frame, text="Filtrer", command=self.apply_filter).pack(side=tk.LEFT, padx=4)
         tk.Button(filter_frame, text="Effacer", command=self.clear_filter).pack(side=tk.LEFT, padx=4)
+        tk.Label(filter_frame, text="Du :").pack(side=tk.LEFT, padx=(12, 0))
+        self.date_from_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.date_from_var, width=11).pack(side=tk.LEFT, padx=3)
+        tk.Label(filter_frame, text="Au :").pack(side=tk.LEFT)
+        self.date_to_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.date_to_var, width=11).pack(side=tk.LEFT, padx=3)
+        tk.Button(filter_frame, text="Période", command=self.refresh_journal).pack(side=tk.LEFT, padx=4)
         tk.Button(filter_frame, text="Exporter Excel", command=self.export_excel).pack(side=tk.RIGHT, padx=4)
         tk.Button(filter_frame, text="Exporter PDF", command=self.export_pdf).pack(side=tk.RIGHT, padx=4)
         tk.Button(filter_frame, text="Exporter CSV", command=self.export_csv).pack(side=tk.RIGHT, padx=4)
 
-        # Tableau principal
-        columns = ("date", "type", "libelle", "montant", "justificatif")
-        self.tree = ttk.Treeview(self.top, columns=columns, show="headings")
-        for col, text, w, anchor in zip(
-            columns,
-            ["Date", "Type", "Libellé", "Montant (€)", "Justificatif/Commentaire"],
-            [100, 150, 290, 120, 470],
-            ["center", "w", "w", "e", "w"]
-        ):
-            self.tree.heading(col, text=text)
-            self.tree.column(col, width=w, anchor=anchor)
-        self.tree.pack(fill=tk.BOTH, expand=True, padx=6, pady=3)
-
-        # Scrollbars
-        vsb = ttk.Scrollbar(self.top, orient="vertical", command=self.tree.yview)
-        hsb = ttk.Scrollbar(self.top, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        vsb.pack(side='right', fill='y')
-        hsb.pack(side='bottom', fill='x')
+        # Tableau principal : liste virtuelle paginée sur le grand livre (tri/recherche en SQL)
+        self.source = ledger_source()
+        self.listing = VirtualTreeview(
+            self.top, self.source,
+            columns=[
+                ("date", "Date", 100, "center"),
+                ("type", "Type", 150, "w"),
+                ("libelle", "Libellé", 290, "w"),
+                ("montant", "Montant (€)", 120, "e"),
+                ("justificatif", "Justificatif/Commentaire", 470, "w"),
+            ],
+            formatter=lambda r: (r["date"], r["type"], r["libelle"], f"{r['montant'] or 0:.2f}", r["justificatif"]),
+            row_tags=lambda r: ("recette",) if (r["montant"] or 0) > 0 else ("depense",) if (r["montant"] or 0) < 0 else (),
+        )
+        self.listing.pack(fill=tk.BOTH, expand=True, padx=6, pady=3)
+        self.tree = self.listing.tree
+        self.tree.tag_configure('depense', background="#ffeaea")
+        self.tree.tag_configure('recette', background="#eaffea")
 
         # Ligne de total et solde progressif
         self.total_var = tk.StringVar()
@@ -72,103 +127,102 @@ class JournalModule:
         tk.Button(btn_frame, text="Fermer", command=self.top.destroy).pack(side=tk.RIGHT, padx=10)
 
     def refresh_journal(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        conn = get_connection()
-        # Récupérer le solde d'ouverture
-        solde_ouverture = 0.0
-        try:
-            row = conn.execute("SELECT solde_report FROM config ORDER BY id DESC LIMIT 1").fetchone()
-            if row and row[0] is not None:
-                solde_ouverture = float(row[0])
-        except Exception:
-            pass
-        df = pd.read_sql_query("""
-            SELECT date, 'Recette' as type, source as libelle, montant, justificatif FROM dons_subventions
-            UNION ALL
-            SELECT e.date as date, 'Recette évènement', er.source, er.montant, er.commentaire
-                FROM event_recettes er
-                JOIN events e ON er.event_id = e.id
-            UNION ALL
-            SELECT date_depense as date, 'Dépense régulière', categorie, -montant, commentaire AS justificatif FROM depenses_regulieres
-            UNION ALL
-            SELECT date_depense as date, 'Dépense diverse', commentaire, -montant, commentaire AS justificatif FROM depenses_diverses
-            UNION ALL
-            SELECT e.date as date, 'Dépense évènement', ed.categorie, -ed.montant, ed.commentaire
-                FROM event_depenses ed
-                JOIN events e ON ed.event_id = e.id
-            ORDER BY date
-        """, conn)
-        # Ajout du solde progressif avec solde d'ouverture
-        df = df.copy()
-        try:
-            df["montant"] = df["montant"].astype(float)
-        except Exception:
-            pass
-        df["Solde"] = df["montant"].cumsum() + solde_ouverture
-        self.df = df
-        self.solde_ouverture = solde_ouverture
-        self.populate_table(self.df)
-        conn.close()
+        date_from = self._period_bound(self.date_from_var)
+        date_to = self._period_bound(self.date_to_var)
+        self.date_from = date_from
+        self.date_to = date_to
+        self.df = None  # Construit à la demande pour les exports
+        self.source.set_filters(period_filters(date_from, date_to))
+        self.populate_table()
 
-    def populate_table(self, df):
-        self.tree.delete(*self.tree.get_children())
-        total = self.solde_ouverture
-        total_recettes = 0
-        total_depenses = 0
-        for _, row in df.iterrows():
-            montant = row["montant"]
-            try:
-                montant_float = float(montant)
-            except Exception:
-                montant_float = 0
-            total += montant_float
-            if montant_float > 0:
-                total_recettes += montant_float
-            else:
-                total_depenses += montant_float  # négatif
-            # Couleur selon type
-            tags = []
-            if montant_float > 0:
-                tags.append("recette")
-            elif montant_float < 0:
-                tags.append("depense")
-            self.tree.insert(
-                "", "end",
-                values=(row["date"], row["type"], row["libelle"], f"{montant_float:.2f}", row["justificatif"]),
-                tags=tags
-            )
-        self.tree.tag_configure('depense', background="#ffeaea")
-        self.tree.tag_configure('recette', background="#eaffea")
-        self.solde_ouv_var.set(f"Solde d'ouverture : {self.solde_ouverture:.2f} €")
+    def _period_bound(self, var):
+        """Borne de période saisie (AAAA-MM-JJ ou JJ/MM/AAAA) au format AAAA-MM-JJ, None si vide."""
+        text = var.get().strip()
+        if not text:
+            return None
+        parsed = parse_date(text)
+        if parsed is None:
+            messagebox.showwarning("Période", f"Date invalide ignorée : {text}")
+            var.set("")
+            return None
+        return format_date(parsed)
+
+    def populate_table(self):
+        # Page visible lue tout de suite (paginée) ; soldes et totaux calculés en arrière-plan
+        self.listing.refresh(keep_position=False)
+        if self._totals_task is not None:
+            self._totals_task.cancel()
+        for var in (self.solde_ouv_var, self.recette_var, self.depense_var, self.total_var):
+            var.set("…")
+        self._totals_task = run_task(
+            self.top, journal_totals, self.source, self.date_from,
+            on_done=self.display_totals, progress=False, title="Journal Général",
+        )
+
+    def display_totals(self, result):
+        self._totals_task = None
+        self.solde_ouverture, totals = result
+        total = self.solde_ouverture + totals["total"]
+        if self.date_from:
+            self.solde_ouv_var.set(f"Solde au {self.date_from} : {self.solde_ouverture:.2f} €")
+        else:
+            self.solde_ouv_var.set(f"Solde d'ouverture : {self.solde_ouverture:.2f} €")
         self.total_var.set(f"Solde global : {total:.2f} €")
-        self.recette_var.set(f"Total recettes : {total_recettes:.2f} €")
-        self.depense_var.set(f"Total dépenses : {abs(total_depenses):.2f} €")
+        self.recette_var.set(f"Total recettes : {totals['recettes']:.2f} €")
+        self.depense_var.set(f"Total dépenses : {abs(totals['depenses']):.2f} €")
+
+    def schedule_filter(self, event=None):
+        """Recherche à la saisie (index plein texte), relancée quand la frappe marque une pause."""
+        if self._pending_filter is not None:
+            self.top.after_cancel(self._pending_filter)
+        self._pending_filter = self.top.after(250, self.apply_filter)
 
     def apply_filter(self):
-        term = self.search_var.get().lower()
-        if not term:
-            self.populate_table(self.df)
+        if self._pending_filter is not None:
+            self.top.after_cancel(self._pending_filter)
+            self._pending_filter = None
+        search = self.search_var.get().strip()
+        if search == self.source.search:
             return
-        mask = self.df.apply(lambda row: row.astype(str).str.lower().str.contains(term).any(), axis=1)
-        filtered = self.df[mask]
-        self.populate_table(filtered)
+        self.source.set_search(search)
+        self.populate_table()
 
     def clear_filter(self):
         self.search_var.set("")
-        self.populate_table(self.df)
+        self.apply_filter()
+
+    def export_df(self, on_ready):
+        """
+        Écritures de la période avec solde progressif (exports) : lues en
+        arrière-plan à la première demande, puis on_ready(df) dans le thread Tk.
+        """
+        if self.df is not None:
+            on_ready(self.df)
+            return
+
+        def ready(df):
+            self.df = df
+            on_ready(df)
+
+        run_task(
+            self.top, journal_dataframe, self.date_from, self.date_to,
+            on_done=ready, title="Export du journal", message="Lecture des écritures…",
+        )
+
+    def _export(self, exporter, title):
+        def write(df):
+            if not df.empty:
+                exporter(df, title=title)
+        self.export_df(write)
 
     def export_excel(self):
-        if hasattr(self, 'df') and not self.df.empty:
-            export_dataframe_to_excel(self.df, title="Export Excel - Journal Général")
+        self._export(export_dataframe_to_excel, "Export Excel - Journal Général")
 
     def export_pdf(self):
-        if hasattr(self, 'df') and not self.df.empty:
-            export_dataframe_to_pdf(self.df, title="Export PDF - Journal Général")
+        self._export(export_dataframe_to_pdf, "Export PDF - Journal Général")
 
     def export_csv(self):
-        if hasattr(self, 'df') and not self.df.empty:
-            export_dataframe_to_csv(self.df, title="Export CSV - Journal Général")
+        self._export(export_dataframe_to_csv, "Export CSV - Journal Général")
 
     def show_detail(self, event):
         item = self.tree.identify_row(event.y)
@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 from db.db import get_connection
-import pandas as pd
+from db.paging import SqlDataSource
+from db.search_index import search_filter
+from ui.virtual_treeview import VirtualTreeview
 from utils.validation import is_email, is_required
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
@@ -26,23 +28,36 @@ class MembersModule:
         self.refresh_members()
 
     def create_table(self):
+        search_frame = tk.Frame(self.top)
+        search_frame.pack(fill=tk.X, padx=8, pady=(6, 0))
+        tk.Label(search_frame, text="Recherche :").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=32)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", lambda e: self.listing.set_search(self.search_var.get()))
         columns = (
             "id", "name", "prenom", "email", "cotisation", "commentaire",
             "telephone", "statut", "date_adhesion"
         )
-        self.tree = ttk.Treeview(self.top, columns=columns, show="headings")
         headings = [
             ("ID", 40), ("Name", 140), ("Prénom", 130), ("Email", 180),
             ("Cotisation", 90), ("Commentaire", 140),
             ("Téléphone", 110), ("Statut", 110), ("Date adhésion", 110)
         ]
-        for idx, (col, w) in enumerate(zip(columns, [h[1] for h in headings])):
-            self.tree.heading(col, text=headings[idx][0])
-            self.tree.column(col, width=w, anchor="center")
-        self.tree.pack(fill=tk.BOTH, expand=True)
-        vsb = ttk.Scrollbar(self.top, orient="vertical", command=self.tree.yview)
-        vsb.pack(side='right', fill='y')
-        self.tree.configure(yscroll=vsb.set)
+        # Liste virtuelle : seules les lignes visibles sont lues (tri et recherche en SQL)
+        self.source = SqlDataSource(
+            columns=[(col, col) for col in columns],
+            from_sql="FROM membres",
+            order_by=[("name", False), ("prenom", False)],
+            search_sql=lambda text: search_filter(text, "membre"),
+        )
+        self.listing = VirtualTreeview(
+            self.top, self.source,
+            columns=[(col, title, w, "center") for col, (title, w) in zip(columns, headings)],
+            formatter=lambda r: tuple("" if r[col] is None else r[col] for col in columns),
+        )
+        self.listing.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.listing.tree
 
     def create_buttons(self):
         btn_frame = tk.Frame(self.top)
@@ -55,21 +70,7 @@ class MembersModule:
 
     def refresh_members(self):
         try:
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-            conn = get_connection()
-            df = pd.read_sql_query("SELECT * FROM membres ORDER BY name, prenom", conn)
-            self.df = df
-            for _, row in df.iterrows():
-                self.tree.insert(
-                    "", "end",
-                    values=(
-                        row["id"], row["name"], row["prenom"], row["email"], row.get("cotisation", ""),
-                        row.get("commentaire", ""), row.get("telephone", ""), row.get("statut", ""),
-                        row.get("date_adhesion", "")
-                    )
-                )
-            conn.close()
+            self.listing.refresh()
         except Exception as e:
             messagebox.showerror("Erreur", handle_exception(e, "Erreur lors de l'affichage des membres."))
 
@@ -125,9 +126,13 @@ class MembersModule:
             )
             if not filepath:
                 return
-            df = getattr(self, "df", None)
-            if df is not None and not df.empty:
-                write_csv(filepath, df.values.tolist(), header=list(df.columns))
+            conn = get_connection()
+            cursor = conn.execute("SELECT * FROM membres ORDER BY name, prenom")
+            header = [d[0] for d in cursor.description]
+            rows = [tuple(r) for r in cursor.fetchall()]
+            conn.close()
+            if rows:
+                write_csv(filepath, rows, header=header)
                 messagebox.showinfo("Export CSV", f"Export réussi dans {filepath}")
             else:
                 messagebox.showwarning("Alerte", "Aucun membre à exporter.")
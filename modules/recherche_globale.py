@@ -0,0 +1,97 @@
+import tkinter as tk
+from tkinter import ttk
+from db.search_index import global_search, KIND_LABELS
+from ui.tree_sync import sync_treeview
+from utils.app_logger import get_logger
+
+logger = get_logger("recherche_globale")
+
+SEARCH_DELAY_MS = 200  # recherche relancée quand la saisie marque une pause
+
+
+class RechercheGlobaleWindow(tk.Toplevel):
+    """
+    Recherche globale (membres, événements, paiements, achats buvette, écritures)
+    sur l'index plein texte : insensible aux accents, chaque mot en préfixe.
+    Double-clic : ouvre le module correspondant.
+    """
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Recherche globale")
+        self.geometry("720x480")
+        self._pending = None
+        self._results = {}
+        self.create_widgets()
+
+    def create_widgets(self):
+        top = tk.Frame(self)
+        top.pack(fill=tk.X, padx=8, pady=6)
+        tk.Label(top, text="Rechercher :").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        entry = tk.Entry(top, textvariable=self.search_var, width=45)
+        entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        entry.bind("<KeyRelease>", self.schedule_search)
+        entry.bind("<Return>", lambda e: self.run_search())
+        entry.focus_set()
+        self.kind_var = tk.StringVar(value="Tout")
+        ttk.Combobox(
+            top, textvariable=self.kind_var, state="readonly", width=16,
+            values=["Tout"] + list(KIND_LABELS.values()),
+        ).pack(side=tk.LEFT, padx=5)
+        self.kind_var.trace_add("write", lambda *args: self.run_search())
+
+        self.tree = ttk.Treeview(self, columns=("type", "titre"), show="headings", selectmode="browse")
+        self.tree.heading("type", text="Type")
+        self.tree.heading("titre", text="Résultat")
+        self.tree.column("type", width=130)
+        self.tree.column("titre", width=540)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=4)
+        self.tree.bind("<Double-1>", self.open_result)
+
+        bottom = tk.Frame(self)
+        bottom.pack(fill=tk.X, padx=8, pady=4)
+        self.status_var = tk.StringVar()
+        tk.Label(bottom, textvariable=self.status_var, anchor="w").pack(side=tk.LEFT)
+        tk.Button(bottom, text="Fermer", command=self.destroy).pack(side=tk.RIGHT)
+
+    def schedule_search(self, event=None):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        self._pending = None
+        label = self.kind_var.get()
+        kinds = [k for k, l in KIND_LABELS.items() if l == label] or None
+        results = global_search(self.search_var.get(), kinds=kinds, limit=200)
+        self._results = {f"{r['kind']}:{r['id']}": r for r in results}
+        sync_treeview(self.tree, [(key, (KIND_LABELS[r["kind"]], r["titre"])) for key, r in self._results.items()])
+        if self.search_var.get().strip():
+            self.status_var.set(f"{len(results)} résultat(s)" + (" (200 premiers)" if len(results) == 200 else ""))
+        else:
+            self.status_var.set("")
+
+    def open_result(self, event=None):
+        result = self._results.get(self.tree.focus())
+        if result is None:
+            return
+        master = self.master
+        kind = result["kind"]
+        if kind == "membre":
+            from modules.members import MembersModule
+            window = MembersModule(master)
+            window.search_var.set(result["titre"])
+            window.listing.set_search(result["titre"])
+        elif kind in ("evenement", "paiement"):
+            from modules.events import EventsWindow
+            EventsWindow(master)
+        elif kind == "achat":
+            from modules.buvette import BuvetteModule
+            BuvetteModule(master)
+        elif kind == "ecriture":
+            from modules.journal import JournalModule
+            window = JournalModule(master)
+            window.search_var.set(self.search_var.get())
+            window.apply_filter()
+        logger.info(f"Recherche globale : ouverture {kind} {result['id']}")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Reconstruit les tables dérivées (maintenues par triggers) à partir des tables sources.
+
+À utiliser après une restauration, un import externe ou toute modification faite
+hors de l'application avec des triggers absents.
+
+Usage:
+    python scripts/rebuild_derived.py [--db-path association.db] [--only ledger]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.db import set_db_file, get_connection, migrate
+from db.ledger import rebuild_ledger
+from db.event_totals import rebuild_event_totals
+from db.module_values import rebuild_module_values
+from db.search_index import rebuild_search_index
+
+# nom -> fonction(conn) retournant le nombre de lignes reconstruites
+DERIVED_TABLES = {
+    "ledger": rebuild_ledger,
+    "event_totals": rebuild_event_totals,
+    "module_values": rebuild_module_values,
+    "search_index": rebuild_search_index,
+}
+
+
+def rebuild(names=None):
+    """Applique les migrations manquantes puis reconstruit les tables demandées (toutes par défaut)."""
+    conn = get_connection()
+    try:
+        migrate(conn)
+        results = {}
+        for name, func in DERIVED_TABLES.items():
+            if names and name not in names:
+                continue
+            results[name] = func(conn)
+            conn.commit()
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruction des tables dérivées")
+    parser.add_argument("--db-path", default="association.db", help="Chemin de la base (défaut: association.db)")
+    parser.add_argument("--only", action="append", choices=sorted(DERIVED_TABLES), help="Table dérivée à reconstruire (répétable)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_path):
+        print(f"✗ Base introuvable : {args.db_path}")
+        sys.exit(1)
+    set_db_file(args.db_path)
+    for name, count in rebuild(args.only).items():
+        print(f"✓ {name} : {count} ligne(s)")
+
+
+if __name__ == "__main__":
+    main()
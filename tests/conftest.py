@@ -0,0 +1,33 @@
+"""
+Fixtures pytest partagées.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import db
+
+
+@pytest.fixture
+def app_db(tmp_path):
+    """Base applicative complète (init_db) dans un fichier temporaire, active le temps du test."""
+    previous = db.get_db_file()
+    db.set_db_file(str(tmp_path / "association.db"))
+    db.init_db()
+    # Connexion du pool ouverte d'avance : ses PRAGMA ne comptent pas dans max_queries
+    db.get_connection().close()
+    yield db.get_db_file()
+    db.set_db_file(previous)
+
+
+@pytest.fixture
+def max_queries():
+    """
+    Garde anti N+1 : `with max_queries(2): ...` échoue si le bloc exécute plus
+    de 2 requêtes, en listant les requêtes répétées.
+    """
+    return db.max_queries
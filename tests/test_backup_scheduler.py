@@ -0,0 +1,89 @@
+"""
+Tests pour les sauvegardes automatiques planifiées (ui/backup_scheduler.py).
+
+Comme pour le task runner, la boucle Tk est remplacée par un widget minimal
+dont les rappels after() sont exécutés par le test.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from db import db
+from ui.backup_scheduler import BackupScheduler, format_backup_age
+from utils.backup_store import list_snapshots
+
+
+class FakeWidget:
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+        return len(self.pending)
+
+    def winfo_exists(self):
+        return True
+
+    def run_until_idle(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while self.pending:
+            assert time.monotonic() < deadline, "tâche non terminée"
+            self.pending.pop(0)()
+            time.sleep(0.005)
+
+
+def _write(n=1):
+    conn = db.get_connection()
+    for i in range(n):
+        conn.execute("INSERT INTO membres (name, prenom) VALUES (?, ?)", (f"Membre {i}", "Test"))
+        conn.commit()
+    conn.close()
+
+
+def test_backup_after_changed_polls(app_db, tmp_path):
+    store = str(tmp_path / "backups")
+    changes = []
+    scheduler = BackupScheduler(FakeWidget(), interval_min=0, after_changes=2, store_dir=store,
+                                on_change=lambda: changes.append(scheduler.status_text()))
+    scheduler.poll_changes()
+    assert scheduler.changes == 1  # base jamais sauvegardée
+    scheduler.changes = 0
+    _write(5)
+    scheduler.poll_changes()
+    assert scheduler.changes == 1 and scheduler.due() is None  # une rafale : un relevé
+    _write()
+    scheduler.poll_changes()
+    assert scheduler.due() == "modifications"
+
+    scheduler.run_backup("modifications")
+    assert scheduler.due() is None  # une seule sauvegarde à la fois
+    scheduler.widget.run_until_idle()
+    snapshots = list_snapshots(store)
+    assert len(snapshots) == 1 and snapshots[0]["quick_check"] == "ok"
+    assert set(snapshots[0]["durations"]) == {"copy", "quick_check"}
+    assert scheduler.changes == 0 and scheduler.last_error is None
+    assert changes[-1] == "Dernière sauvegarde : à l'instant"
+    scheduler.release()
+
+
+def test_interval_needs_changes(app_db, tmp_path):
+    scheduler = BackupScheduler(FakeWidget(), interval_min=60, after_changes=0, store_dir=str(tmp_path / "b"))
+    scheduler.poll_changes()
+    scheduler.changes = 0
+    scheduler.last_backup = datetime.now() - timedelta(hours=2)
+    assert scheduler.due() is None  # rien de modifié depuis la dernière sauvegarde
+    _write()
+    scheduler.poll_changes()
+    assert scheduler.due() == "intervalle"
+    scheduler.last_backup = datetime.now() - timedelta(minutes=10)
+    assert scheduler.due() is None
+    scheduler.release()
+
+
+def test_format_backup_age():
+    now = datetime(2024, 6, 15, 12, 0)
+    assert format_backup_age(None) == "jamais"
+    assert format_backup_age(now - timedelta(seconds=20), now) == "à l'instant"
+    assert format_backup_age(now - timedelta(minutes=42), now) == "il y a 42 min"
+    assert format_backup_age(now - timedelta(hours=5), now) == "il y a 5 h"
+    assert format_backup_age(now - timedelta(days=3), now) == "il y a 3 j"
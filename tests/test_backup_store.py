@@ -0,0 +1,173 @@
+"""
+Tests pour le dépôt de sauvegardes dédupliqué (utils/backup_store.py).
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import db
+from ui.task_runner import Task
+from utils import backup_restore
+from utils.backup_store import (
+    collect_garbage, create_snapshot, list_snapshots, prune_snapshots,
+    restore_snapshot, select_retained,
+)
+
+
+def _insert(n, start=0):
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO dons_subventions (source, montant, date) VALUES (?, ?, '2024-01-10')",
+        [(f"Don {i} " + "x" * 400, i) for i in range(start, start + n)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _chunk_files(store):
+    return sum(len(files) for _, _, files in os.walk(os.path.join(store, "chunks")))
+
+
+def test_snapshots_share_unchanged_chunks(app_db, tmp_path):
+    store = str(tmp_path / "backups")
+    _insert(2000)
+    first = create_snapshot(app_db, store, when=datetime(2024, 6, 1, 20, 0))
+    assert first["new_chunks"] == len(set(first["chunks"]))
+    stored = _chunk_files(store)
+
+    _insert(5, start=2000)
+    second = create_snapshot(app_db, store, when=datetime(2024, 6, 2, 20, 0))
+    assert 0 < second["new_chunks"] < len(second["chunks"]) / 2
+    assert _chunk_files(store) == stored + second["new_chunks"]
+    assert [s["name"] for s in list_snapshots(store)] == [second["name"], first["name"]]
+
+    dest = restore_snapshot(first["name"], str(tmp_path / "restauree.db"), store)
+    copy = sqlite3.connect(dest)
+    try:
+        assert copy.execute("SELECT COUNT(*) FROM dons_subventions").fetchone()[0] == 2000
+    finally:
+        copy.close()
+
+
+def test_restore_rejects_altered_chunk(app_db, tmp_path):
+    store = str(tmp_path / "backups")
+    _insert(100)
+    manifest = create_snapshot(app_db, store)
+    digest = manifest["chunks"][-1]
+    with open(os.path.join(store, "chunks", digest[:2], digest), "r+b") as f:
+        f.write(b"\x00\x01")
+    dest = str(tmp_path / "restauree.db")
+    with pytest.raises(ValueError):
+        restore_snapshot(manifest, dest, store)
+    assert not os.path.exists(dest) and not os.path.exists(dest + ".part")
+
+
+def test_retention_keeps_latest_per_period():
+    start = datetime(2024, 1, 1, 12, 0)
+    # Deux instantanés par jour (0 h et 12 h) du 01/01 au 30/12 12 h
+    snapshots = [
+        {"name": f"s{i:03d}", "created_at": (start + timedelta(hours=12 * i)).isoformat()}
+        for i in range(731)
+    ]
+    keep = select_retained(snapshots, daily=7, weekly=4, monthly=12)
+    by_name = {s["name"]: datetime.fromisoformat(s["created_at"]) for s in snapshots}
+    kept = sorted(by_name[name] for name in keep)
+    assert len(keep) <= 7 + 4 + 12
+    assert kept[-1] == max(by_name.values())
+    assert all(d.hour == 12 for d in kept)  # le dernier instantané de chaque jour
+    assert len({(d.year, d.month) for d in kept}) == 12
+
+
+def test_prune_collects_unreferenced_chunks(app_db, tmp_path):
+    store = str(tmp_path / "backups")
+    _insert(500)
+    create_snapshot(app_db, store, when=datetime(2024, 6, 1, 8, 0))
+    _insert(500, start=500)
+    create_snapshot(app_db, store, when=datetime(2024, 6, 1, 20, 0))
+    removed, chunks = prune_snapshots(store, policy=(7, 4, 12))
+    assert len(removed) == 1 and chunks > 0
+    assert [s["created_at"] for s in list_snapshots(store)] == ["2024-06-01T20:00:00"]
+    assert collect_garbage(store) == 0
+    assert _chunk_files(store) == len(set(list_snapshots(store)[0]["chunks"]))
+
+
+def test_retention_is_applied_per_database(app_db, tmp_path):
+    store = str(tmp_path / "backups")
+    _insert(300)
+    other = str(tmp_path / "autre.db")
+    conn = sqlite3.connect(other)
+    conn.execute("CREATE TABLE notes (texte TEXT)")
+    conn.executemany("INSERT INTO notes VALUES (?)", [("note " * 50,)] * 200)
+    conn.commit()
+    conn.close()
+
+    kept = create_snapshot(other, store, when=datetime(2024, 6, 1, 8, 0))
+    for hour in (9, 10):
+        _insert(10, start=300 + hour * 10)
+        create_snapshot(app_db, store, when=datetime(2024, 6, 1, hour, 0))
+    removed, _ = prune_snapshots(store, policy=(7, 4, 12))
+
+    assert len(removed) == 1  # seul l'ancien instantané de la base applicative
+    remaining = {s["source"]: s["name"] for s in list_snapshots(store)}
+    assert remaining[os.path.abspath(other)] == kept["name"]
+    assert len(remaining) == 2
+    dest = restore_snapshot(kept["name"], str(tmp_path / "autre_restauree.db"), store)
+    copy = sqlite3.connect(dest)
+    try:
+        assert copy.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 200
+    finally:
+        copy.close()
+
+
+def _open_files(path):
+    """
+    Fichiers de la base (db, -wal, -shm) ouverts par le processus, y compris
+    ceux remplacés ou supprimés depuis (Linux : /proc/self/fd).
+    """
+    names = {path, path + "-wal", path + "-shm"}
+    opened = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(os.path.join("/proc/self/fd", fd))
+        except OSError:
+            continue
+        if target.removesuffix(" (deleted)") in names:
+            opened.append(target)
+    return opened
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="nécessite /proc")
+def test_restore_after_background_task(app_db, tmp_path):
+    store = str(tmp_path / "backups")
+    _insert(50)
+    manifest = create_snapshot(app_db, store)
+    _insert(25, start=50)
+
+    def count():
+        return db.get_connection().execute("SELECT COUNT(*) FROM dons_subventions").fetchone()[0]
+
+    assert Task(count).start().future.result(5) == 75  # le thread de travail garde sa connexion
+    assert _open_files(app_db)
+
+    staging = restore_snapshot(manifest, app_db + ".restauration", store)
+    backup_restore._install_database_file(staging, app_db, move=True)
+    assert _open_files(app_db) == []
+    assert count() == 50
+    assert Task(count).start().future.result(5) == 50
+
+
+def test_release_before_deleting_database(app_db, monkeypatch):
+    released = []
+    monkeypatch.setattr(backup_restore, "_release_callbacks", [lambda: released.append(True)])
+    _insert(5)
+
+    def count():
+        return db.get_connection().execute("SELECT COUNT(*) FROM dons_subventions").fetchone()[0]
+
+    assert Task(count).start().future.result(5) == 5
+    backup_restore.release_database_file(app_db)
+    assert _open_files(app_db) == [] and released == [True]
+    assert not os.path.exists(app_db + "-wal") and not os.path.exists(app_db + "-shm")
@@ -0,0 +1,52 @@
+"""
+Tests pour l'enregistrement groupé des lignes d'inventaire buvette (modules/buvette_inventaire_db.py).
+"""
+
+import pytest
+
+from db import db
+from modules import buvette_inventaire_db as inv_db
+
+
+def _inventaire_with_articles(n):
+    conn = db.get_connection()
+    inv_id = conn.execute(
+        "INSERT INTO buvette_inventaires (date_inventaire, type_inventaire) VALUES ('2025-01-15', 'hors_evenement')"
+    ).lastrowid
+    articles = [
+        conn.execute("INSERT INTO buvette_articles (name) VALUES (?)", (f"Article {i}",)).lastrowid
+        for i in range(n)
+    ]
+    conn.commit()
+    conn.close()
+    return inv_id, articles
+
+
+def _quantites(inv_id):
+    conn = db.get_connection()
+    rows = conn.execute(
+        "SELECT article_id, quantite FROM buvette_inventaire_lignes WHERE inventaire_id = ? ORDER BY article_id",
+        (inv_id,)
+    ).fetchall()
+    conn.close()
+    return [tuple(r) for r in rows]
+
+
+def test_lines_saved_in_one_transaction(app_db):
+    inv_id, articles = _inventaire_with_articles(3)
+    inv_db.upsert_ligne_inventaire(inv_id, articles[0], 1)
+    inv_db.upsert_lignes_inventaire(inv_id, [(a, 10 + i) for i, a in enumerate(articles)])
+    assert _quantites(inv_id) == [(a, 10 + i) for i, a in enumerate(articles)]
+
+
+def test_failed_batch_saves_nothing(app_db):
+    inv_id, articles = _inventaire_with_articles(3)
+
+    def lignes():
+        yield articles[0], 5
+        yield articles[1], 6
+        raise ValueError("ligne invalide")
+
+    with pytest.raises(ValueError):
+        inv_db.upsert_lignes_inventaire(inv_id, lignes())
+    assert _quantites(inv_id) == []
@@ -0,0 +1,126 @@
+"""
+Tests pour le gestionnaire de connexions persistantes de db/db.py.
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import db
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.paths = []
+        self.previous_db = db.get_db_file()
+        self.db_path = self._make_db()
+        db.set_db_file(self.db_path)
+
+    def tearDown(self):
+        db.set_db_file(self.previous_db)
+        for path in self.paths:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def _make_db(self):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.commit()
+        conn.close()
+        self.paths.append(path)
+        return path
+
+    def test_same_connection_reused_and_close_is_noop(self):
+        conn1 = db.get_connection()
+        conn1.close()
+        conn2 = db.get_connection()
+        self.assertIs(conn1, conn2)
+        # Toujours utilisable après close()
+        self.assertEqual(conn2.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+        self.assertEqual(conn2.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        conn2.close()
+
+    def test_row_factory_reset_on_checkout(self):
+        conn = db.get_connection()
+        conn.row_factory = None
+        conn.close()
+        conn = db.get_connection()
+        self.assertIs(conn.row_factory, sqlite3.Row)
+        conn.close()
+
+    def test_uncommitted_changes_rolled_back_on_last_close(self):
+        conn = db.get_connection()
+        conn.execute("INSERT INTO t (v) VALUES ('perdu')")
+        conn.close()
+        conn = db.get_connection()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+        conn.close()
+
+    def test_nested_close_keeps_outer_transaction(self):
+        outer = db.get_connection()
+        outer.execute("INSERT INTO t (v) VALUES ('garde')")
+        inner = db.get_connection()
+        inner.execute("SELECT COUNT(*) FROM t").fetchone()
+        inner.close()
+        self.assertTrue(outer.in_transaction)
+        outer.commit()
+        outer.close()
+        check = sqlite3.connect(self.db_path)
+        self.assertEqual(check.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+        check.close()
+
+    def test_helper_between_writes_keeps_outer_transaction(self):
+        outer = db.get_connection()
+        helper = db.get_connection()
+        helper.execute("SELECT COUNT(*) FROM t").fetchone()
+        helper.close()
+        outer.execute("INSERT INTO t (v) VALUES ('garde')")
+        helper = db.get_connection()
+        helper.execute("SELECT COUNT(*) FROM t").fetchone()
+        helper.close()
+        outer.commit()
+        outer.close()
+        check = sqlite3.connect(self.db_path)
+        self.assertEqual(check.execute("SELECT COUNT(*) FROM t").fetchone()[0], 1)
+        check.close()
+
+    def test_set_db_file_switches_connection(self):
+        conn1 = db.get_connection()
+        conn1.close()
+        other = self._make_db()
+        db.set_db_file(other)
+        conn2 = db.get_connection()
+        self.assertIsNot(conn1, conn2)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn1.execute("SELECT 1")
+        conn2.close()
+
+    def test_one_connection_per_thread(self):
+        main_conn = db.get_connection()
+        main_conn.close()
+        result = {}
+
+        def worker():
+            conn = db.get_connection()
+            result["same"] = conn is main_conn
+            result["count"] = conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+            conn.close()
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        self.assertFalse(result["same"])
+        self.assertEqual(result["count"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+Tests pour l'export CSV en flux (utils/csv_helpers.py).
+"""
+
+import csv
+import io
+import sqlite3
+
+from utils.csv_helpers import export_query_csv, read_csv, write_cursor_csv
+
+
+def _conn(n):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, libelle TEXT, montant REAL)")
+    conn.executemany(
+        "INSERT INTO t (libelle, montant) VALUES (?, ?)",
+        [(f"Ligne {i}, « accentuée »", i * 1.5) for i in range(n)]
+    )
+    return conn
+
+
+def test_export_query_csv_by_chunks(tmp_path):
+    conn = _conn(25)
+    path = tmp_path / "sous" / "t.csv"
+    assert export_query_csv(conn, "SELECT * FROM t WHERE id > ?", str(path), params=(5,), chunk_size=7) == 20
+    rows = read_csv(str(path))
+    assert rows[0] == ["id", "libelle", "montant"]
+    assert len(rows) == 21
+    assert rows[1] == ["6", "Ligne 5, « accentuée »", "7.5"]
+
+
+def test_write_cursor_csv_to_open_file():
+    conn = _conn(0)
+    buffer = io.StringIO()
+    assert write_cursor_csv(buffer, conn.execute("SELECT libelle, montant FROM t")) == 0
+    assert list(csv.reader(io.StringIO(buffer.getvalue()))) == [["libelle", "montant"]]
@@ -0,0 +1,43 @@
+"""
+Tests pour les données du tableau de bord (dashboard/dashboard_data.py).
+"""
+
+from db import db
+from dashboard.dashboard_data import dashboard_snapshot, SourceTotal
+
+
+def _sample(conn, events=3):
+    conn.executemany("INSERT INTO membres (name, prenom) VALUES (?, ?)", [("A", "a"), ("B", "b")])
+    conn.executemany(
+        "INSERT INTO dons_subventions (source, montant, date) VALUES (?, ?, ?)",
+        [("Mairie", 300, "2024-01-10"), ("Mairie", 200, "2024-03-10"), ("Région", 100, "2024-02-01")]
+    )
+    conn.execute("INSERT INTO depenses_diverses (montant, date_depense, commentaire) VALUES (40, '2024-02-20', 'Timbres')")
+    for i in range(events):
+        event_id = conn.execute("INSERT INTO events (name, date) VALUES (?, ?)", (f"Fête {i}", f"2024-05-{i + 1:02d}")).lastrowid
+        conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (?, 'Buvette', 50)", (event_id,))
+        conn.execute("INSERT INTO event_depenses (event_id, categorie, montant) VALUES (?, 'Achats', 20)", (event_id,))
+    conn.commit()
+
+
+def test_snapshot_totals(app_db):
+    _sample(db.get_connection())
+    snap = dashboard_snapshot()
+    assert (snap.nb_membres, snap.nb_events, snap.nb_stock) == (2, 3, 0)
+    assert snap.total_dons == 600 and snap.total_evt_recettes == 150
+    assert snap.depenses == (("Dépenses diverses", 40), ("Dépenses événements", 60))
+    assert snap.solde == 750 - 100
+    assert snap.sources == (
+        SourceTotal("don", "Mairie", 500), SourceTotal("don", "Région", 100),
+        SourceTotal("evenement", "Buvette", 150),
+    )
+    assert [(e.name, e.solde) for e in snap.events] == [("Fête 2", 30), ("Fête 1", 30), ("Fête 0", 30)]
+    assert [op.libelle for op in snap.last_operations][:2] == ["Achats", "Buvette"]
+
+
+def test_query_count_independent_of_size(app_db, max_queries):
+    conn = db.get_connection()
+    _sample(conn, events=40)
+    with max_queries(4, "tableau de bord"):
+        snap = dashboard_snapshot()
+    assert len(snap.events) == 40
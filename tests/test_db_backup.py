@@ -0,0 +1,55 @@
+"""
+Tests pour la sauvegarde à chaud par l'API de backup SQLite (utils/db_backup.py).
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from db import db
+from ui.task_runner import Task, TaskCancelled
+from utils.db_backup import online_backup
+
+
+def _fill(n=300):
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO dons_subventions (source, montant, date) VALUES (?, ?, '2024-01-10')",
+        [(f"Don {i} " + "x" * 500, i) for i in range(n)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _noop():
+    pass
+
+
+def test_backup_includes_wal_content(app_db, tmp_path):
+    _fill()
+    assert os.path.getsize(app_db + "-wal") > 0  # pas encore reporté dans le fichier principal
+    dest = online_backup(app_db, str(tmp_path / "b" / "copie.bak"), pages=8)
+    copy = sqlite3.connect(dest)
+    try:
+        assert copy.execute("SELECT COUNT(*) FROM dons_subventions").fetchone()[0] == 300
+        assert copy.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+    finally:
+        copy.close()
+    assert not os.path.exists(dest + ".part")
+
+
+def test_backup_progress_and_cancel(app_db, tmp_path):
+    _fill()
+    task = Task(_noop)
+    out = tmp_path / "sauvegardes"
+    dest = online_backup(app_db, str(out / "ok.bak"), pages=16, task=task)
+    fractions = [fraction for fraction, _ in task.progress_events()]
+    assert len(fractions) > 2 and fractions == sorted(fractions) and fractions[-1] == 1.0
+    assert os.path.exists(dest)
+
+    task = Task(_noop)
+    task.cancel()
+    with pytest.raises(TaskCancelled):
+        online_backup(app_db, str(out / "annulee.bak"), pages=16, task=task)
+    assert os.listdir(out) == ["ok.bak"]
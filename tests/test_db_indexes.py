@@ -0,0 +1,94 @@
+"""
+Tests pour le jeu d'index secondaires déclaré dans db/db.py (INDEXES).
+
+Vérifie via EXPLAIN QUERY PLAN que les requêtes chaudes des fenêtres
+événements / buvette utilisent bien les index créés par init_db().
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import db
+
+
+def query_plan(conn, sql, params=()):
+    """Retourne le plan d'exécution sous forme d'une seule chaîne."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return " | ".join(r[3] for r in rows)
+
+
+class TestDbIndexes(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.previous_db = db.get_db_file()
+        db.set_db_file(self.db_path)
+        db.init_db()
+        self.conn = sqlite3.connect(self.db_path)
+
+    def tearDown(self):
+        self.conn.close()
+        db.set_db_file(self.previous_db)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_init_db_creates_all_declared_indexes(self):
+        names = {r[0] for r in self.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        for name, _, _ in db.INDEXES:
+            self.assertIn(name, names)
+
+    def test_hot_queries_use_indexes(self):
+        hot_queries = [
+            ("SELECT valeur FROM event_module_data WHERE module_id=? AND row_index=? AND field_id=?",
+             (1, 1, 1), "idx_event_module_data_cell"),
+            ("SELECT * FROM event_module_fields WHERE module_id=? ORDER BY id",
+             (1,), "idx_event_module_fields_module"),
+            ("SELECT COALESCE(SUM(montant), 0) FROM event_recettes WHERE event_id=?",
+             (1,), "idx_event_recettes_event_source"),
+            ("SELECT id FROM event_recettes WHERE event_id=? AND source='Vente sur place'",
+             (1,), "idx_event_recettes_event_source"),
+            ("SELECT COALESCE(SUM(montant), 0) FROM event_depenses WHERE event_id=?",
+             (1,), "idx_event_depenses_event"),
+            ("SELECT * FROM event_payments WHERE event_id=?",
+             (1,), "idx_event_payments_event"),
+            ("SELECT SUM(valeur) FROM event_caisse_details WHERE caisse_id=? AND moment='debut'",
+             (1,), "idx_event_caisse_details_caisse_moment"),
+            ("SELECT * FROM buvette_inventaire_lignes WHERE inventaire_id=?",
+             (1,), "idx_buvette_inventaire_lignes_inventaire"),
+            ("SELECT * FROM buvette_achats WHERE article_id=?",
+             (1,), "idx_buvette_achats_article"),
+        ]
+        for sql, params, index_name in hot_queries:
+            plan = query_plan(self.conn, sql, params)
+            self.assertIn(index_name, plan, f"{sql} -> {plan}")
+
+    def test_create_indexes_on_legacy_database(self):
+        """Les tables/colonnes absentes d'une ancienne base sont ignorées sans erreur."""
+        fd, legacy_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(legacy_path)
+            conn.execute("CREATE TABLE event_recettes (id INTEGER PRIMARY KEY, event_id INTEGER, montant REAL)")
+            conn.execute("CREATE TABLE event_payments (id INTEGER PRIMARY KEY, event_id INTEGER)")
+            created = db.create_indexes(conn)
+            conn.commit()
+            self.assertIn("idx_event_payments_event", created)
+            # 'source' et 'module_id' manquent : index composites ignorés
+            self.assertNotIn("idx_event_recettes_event_source", created)
+            self.assertNotIn("idx_event_recettes_module", created)
+            # Idempotent
+            self.assertEqual(created, db.create_indexes(conn))
+            conn.close()
+        finally:
+            os.remove(legacy_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Tests pour l'accès aux tableaux de modules (modules/event_modules_db.py).
+"""
+
+from db import db
+from modules.event_modules_db import (
+    STORAGE_CELLS, STORAGE_ROWS, load_module_grid, module_grid_dataframe, recompute_module_totals,
+    load_module_row, save_module_row, set_module_cell, delete_module_row, sum_module_column,
+    get_module_storage, set_module_storage
+)
+
+
+def _make_module(conn, nb_rows, nb_fields):
+    event_id = conn.execute("INSERT INTO events (name, date) VALUES ('Kermesse', '2024-06-01')").lastrowid
+    module_id = conn.execute(
+        "INSERT INTO event_modules (event_id, nom_module) VALUES (?, 'Commandes')", (event_id,)
+    ).lastrowid
+    field_ids = [
+        conn.execute(
+            "INSERT INTO event_module_fields (module_id, nom_champ, type_champ) VALUES (?, ?, 'TEXT')",
+            (module_id, f"Col {i}")
+        ).lastrowid
+        for i in range(nb_fields)
+    ]
+    conn.executemany(
+        "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)",
+        [(module_id, r, f, f"{r}-{f}") for r in range(1, nb_rows + 1) for f in field_ids],
+    )
+    return module_id, field_ids
+
+
+def test_grid_is_pivoted_row_major(app_db):
+    conn = db.get_connection()
+    module_id, field_ids = _make_module(conn, 3, 2)
+    # Cellule manquante sur la ligne 2
+    conn.execute("DELETE FROM event_module_data WHERE row_index = 2 AND field_id = ?", (field_ids[1],))
+    conn.commit()
+
+    fields, rows = load_module_grid(module_id)
+    assert [f["id"] for f in fields] == field_ids
+    assert rows == [
+        (1, (f"1-{field_ids[0]}", f"1-{field_ids[1]}")),
+        (2, (f"2-{field_ids[0]}", "")),
+        (3, (f"3-{field_ids[0]}", f"3-{field_ids[1]}")),
+    ]
+
+
+def test_grid_loads_in_fixed_query_count(app_db, max_queries):
+    conn = db.get_connection()
+    module_id, _ = _make_module(conn, 200, 12)
+    conn.commit()
+
+    with max_queries(3, "load_module_grid"):
+        fields, rows = load_module_grid(module_id)
+    assert len(rows) == 200
+    assert all(len(values) == 12 for _, values in rows)
+
+    with max_queries(3, "module_grid_dataframe"):
+        df = module_grid_dataframe(module_id)
+    assert df.shape == (200, 12)
+    assert list(df.columns) == [f["nom_champ"] for f in fields]
+
+
+def _priced_module(conn):
+    module_id, _ = _make_module(conn, 0, 0)
+    qte_a = conn.execute(
+        "INSERT INTO event_module_fields (module_id, nom_champ, prix_unitaire) VALUES (?, 'Crêpes', 2.5)", (module_id,)
+    ).lastrowid
+    qte_b = conn.execute(
+        "INSERT INTO event_module_fields (module_id, nom_champ, prix_unitaire) VALUES (?, 'Boissons', 1)", (module_id,)
+    ).lastrowid
+    nom = conn.execute(
+        "INSERT INTO event_module_fields (module_id, nom_champ) VALUES (?, 'Nom')", (module_id,)
+    ).lastrowid
+    total = conn.execute(
+        "INSERT INTO event_module_fields (module_id, nom_champ) VALUES (?, 'Total')", (module_id,)
+    ).lastrowid
+    conn.execute("UPDATE event_modules SET id_col_total = ? WHERE id = ?", (total, module_id))
+    return module_id, qte_a, qte_b, nom, total
+
+
+def _totals_by_row(conn, module_id, total):
+    return dict(conn.execute(
+        "SELECT row_index, valeur FROM event_module_data WHERE module_id = ? AND field_id = ? ORDER BY row_index",
+        (module_id, total)
+    ).fetchall())
+
+
+def test_recompute_module_totals(app_db, max_queries):
+    conn = db.get_connection()
+    module_id, qte_a, qte_b, nom, total = _priced_module(conn)
+    cells = []
+    for r in range(1, 301):
+        cells += [(module_id, r, qte_a, str(r % 4)), (module_id, r, qte_b, "x" if r == 7 else "2"), (module_id, r, nom, "A")]
+    # Ligne 1 : total déjà présent (mis à jour, pas dupliqué)
+    cells.append((module_id, 1, total, "999"))
+    conn.executemany(
+        "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, ?, ?, ?)", cells
+    )
+    conn.commit()
+
+    with max_queries(6, "recompute_module_totals"):
+        assert recompute_module_totals(module_id) == 300
+    totals = _totals_by_row(conn, module_id, total)
+    assert len(totals) == 300
+    assert totals[1] == "4.50"
+    assert totals[4] == "2.00"
+    assert totals[7] == "7.50"  # quantité illisible comptée 0
+    assert conn.execute(
+        "SELECT COUNT(*) FROM event_module_data WHERE module_id = ? AND row_index = 1 AND field_id = ?",
+        (module_id, total)
+    ).fetchone()[0] == 1
+
+    # Ligne seule : même moteur, les autres lignes ne bougent pas
+    conn.execute("UPDATE event_module_data SET valeur = '10' WHERE row_index = 2 AND field_id = ?", (qte_a,))
+    conn.execute("UPDATE event_module_data SET valeur = '10' WHERE row_index = 3 AND field_id = ?", (qte_a,))
+    conn.commit()
+    assert recompute_module_totals(module_id, total, row_index=2) == 1
+    totals = _totals_by_row(conn, module_id, total)
+    assert totals[2] == "27.00"
+    assert totals[3] == "9.50"
+
+
+def test_recompute_without_total_column(app_db):
+    conn = db.get_connection()
+    module_id, _ = _make_module(conn, 2, 2)
+    conn.commit()
+    assert recompute_module_totals(module_id) == 0
+
+
+def test_row_storage_round_trip(app_db, max_queries):
+    conn = db.get_connection()
+    module_id, qte_a, qte_b, nom, total = _priced_module(conn)
+    conn.commit()
+    for r in range(1, 101):
+        save_module_row(module_id, {qte_a: str(r % 3), qte_b: "1,5", nom: f"Client {r}"})
+    fields, cells_rows = load_module_grid(module_id)
+    recompute_module_totals(module_id)
+    cells_totals = load_module_grid(module_id)[1]
+
+    assert set_module_storage(module_id, STORAGE_ROWS) == 100
+    assert get_module_storage(module_id) == STORAGE_ROWS
+    assert conn.execute("SELECT COUNT(*) FROM event_module_data WHERE module_id = ?", (module_id,)).fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM event_module_rows WHERE module_id = ?", (module_id,)).fetchone()[0] == 100
+    with max_queries(3, "load_module_grid (lignes)"):
+        assert load_module_grid(module_id)[1] == cells_totals
+
+    # Écritures et calculs via le même accès, quel que soit le mode
+    set_module_cell(module_id, 2, qte_a, "4")
+    assert recompute_module_totals(module_id, total, row_index=2) == 1
+    assert load_module_row(module_id, 2)[total] == "11.50"
+    assert sum_module_column(module_id, qte_b) == 150.0
+    new_row = save_module_row(module_id, {qte_a: "1", nom: "Dernier"})
+    assert new_row == 101
+    delete_module_row(module_id, 1)
+    fields, rows = load_module_grid(module_id)
+    assert [r for r, _ in rows][:2] == [2, 3]
+    assert rows[-1] == (101, ("1", "", "Dernier", ""))
+
+    # Retour au stockage par cellule : valeur_num recalculée par les triggers
+    assert set_module_storage(module_id, STORAGE_CELLS) == 100
+    assert load_module_grid(module_id)[1] == rows
+    assert sum_module_column(module_id, qte_b) == 148.5
+    assert not conn.execute("SELECT COUNT(*) FROM event_module_rows").fetchone()[0]
@@ -0,0 +1,142 @@
+"""
+Tests pour les totaux matérialisés par événement (db/event_totals.py).
+"""
+
+import pytest
+
+from db import db
+from db.event_totals import rebuild_caisse_totals, rebuild_event_totals, get_event_totals
+from modules.events_db import list_events_with_totals
+
+
+def _totals(conn, event_id):
+    row = conn.execute(
+        "SELECT recettes, depenses, caisse_gain, nb_payments FROM event_totals WHERE event_id = ?", (event_id,)
+    ).fetchone()
+    return tuple(row) if row else None
+
+
+def _fill_event(conn, name="Kermesse"):
+    event_id = conn.execute("INSERT INTO events (name, date) VALUES (?, '2024-06-01')", (name,)).lastrowid
+    conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (?, 'Tombola', 100)", (event_id,))
+    conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (?, 'Dons', 20.5)", (event_id,))
+    conn.execute("INSERT INTO event_depenses (event_id, categorie, montant) VALUES (?, 'Lots', 30)", (event_id,))
+    conn.execute("INSERT INTO event_payments (event_id, nom_payeuse, montant) VALUES (?, 'Martin', 12)", (event_id,))
+    caisse_id = conn.execute("INSERT INTO event_caisses (event_id, nom_caisse) VALUES (?, 'Buvette')", (event_id,)).lastrowid
+    details = [("debut", "billet", 10, 5), ("debut", "piece", 1, 20), ("fin", "billet", 10, 12), ("fin", "cheque", 15, None)]
+    conn.executemany(
+        "INSERT INTO event_caisse_details (caisse_id, moment, type, valeur, quantite) VALUES (?, ?, ?, ?, ?)",
+        [(caisse_id,) + d for d in details],
+    )
+    return event_id, caisse_id
+
+
+def test_triggers_maintain_totals(app_db):
+    conn = db.get_connection()
+    event_id, caisse_id = _fill_event(conn)
+    conn.commit()
+    # caisses : fin 120 + 15 - début 50 + 20
+    assert _totals(conn, event_id) == (120.5, 30.0, 65.0, 1)
+
+    conn.execute("UPDATE event_recettes SET montant = 200 WHERE source = 'Tombola'")
+    conn.execute("DELETE FROM event_depenses WHERE event_id = ?", (event_id,))
+    conn.execute("DELETE FROM event_caisse_details WHERE caisse_id = ? AND type = 'cheque'", (caisse_id,))
+    conn.commit()
+    assert _totals(conn, event_id) == (220.5, 0.0, 50.0, 1)
+
+    conn.execute("DELETE FROM event_caisses WHERE id = ?", (caisse_id,))
+    conn.commit()
+    assert _totals(conn, event_id)[2] == 0
+
+    conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+    conn.commit()
+    assert _totals(conn, event_id) is None
+    conn.close()
+
+
+def test_moving_a_row_updates_both_events(app_db):
+    conn = db.get_connection()
+    first, _ = _fill_event(conn, "A")
+    second = conn.execute("INSERT INTO events (name) VALUES ('B')").lastrowid
+    conn.execute("UPDATE event_recettes SET event_id = ? WHERE source = 'Dons'", (second,))
+    conn.commit()
+    assert _totals(conn, first)[0] == 100
+    assert _totals(conn, second)[0] == 20.5
+    conn.close()
+
+
+def test_rebuild_matches_triggers(app_db):
+    conn = db.get_connection()
+    ids = [_fill_event(conn, f"Ev {i}")[0] for i in range(5)]
+    conn.commit()
+    expected = [_totals(conn, i) for i in ids]
+    conn.execute("UPDATE event_totals SET recettes = 0, caisse_gain = 0")
+    conn.commit()
+    assert rebuild_event_totals(conn) == 5
+    conn.commit()
+    assert [_totals(conn, i) for i in ids] == expected
+    assert get_event_totals(ids[0])["nb_payments"] == 1
+    conn.close()
+
+
+def test_rebuild_caisse_totals_only_touches_caisse_gain(app_db):
+    conn = db.get_connection()
+    ids = [_fill_event(conn, f"Ev {i}")[0] for i in range(3)]
+    conn.commit()
+    conn.execute("DELETE FROM event_caisse_totals")
+    conn.execute("UPDATE event_totals SET recettes = -1, caisse_gain = 0")
+    conn.commit()
+    assert rebuild_caisse_totals(conn) == 3
+    conn.commit()
+    assert [_totals(conn, i) for i in ids] == [(-1.0, 30.0, 65.0, 1)] * 3
+    conn.close()
+
+
+def test_event_listing_reads_one_row_per_event(app_db, max_queries):
+    conn = db.get_connection()
+    for i in range(20):
+        _fill_event(conn, f"Ev {i}")
+    conn.commit()
+    conn.close()
+    with max_queries(1):
+        events = list_events_with_totals()
+    assert len(events) == 20
+    assert all(ev["recettes"] == pytest.approx(120.5) and ev["caisse_gain"] == 65 for ev in events)
+
+
+def test_caisse_totals_maintained_per_caisse(app_db, max_queries):
+    from db.event_totals import list_caisse_totals
+    conn = db.get_connection()
+    event_id, caisse_id = _fill_event(conn)
+    other = conn.execute("INSERT INTO event_caisses (event_id, nom_caisse) VALUES (?, 'Crêpes')", (event_id,)).lastrowid
+    conn.execute("INSERT INTO event_caisse_details (caisse_id, moment, type, valeur, quantite) VALUES (?, 'fin', 'billet', 5, 4)", (other,))
+    conn.commit()
+    with max_queries(1):
+        caisses = list_caisse_totals(event_id)
+    assert [(c["nom_caisse"], c["fond_debut"], c["fond_fin"]) for c in caisses] == [
+        ("Buvette", 70.0, 135.0), ("Crêpes", 0.0, 20.0)
+    ]
+    assert _totals(conn, event_id)[2] == 85.0
+
+    # Passage d'une ligne de 'debut' à 'fin' : les deux fonds sont recalculés
+    conn.execute("UPDATE event_caisse_details SET moment = 'fin' WHERE caisse_id = ? AND type = 'piece'", (caisse_id,))
+    conn.commit()
+    row = conn.execute("SELECT fond_debut, fond_fin FROM event_caisse_totals WHERE caisse_id = ?", (caisse_id,)).fetchone()
+    assert tuple(row) == (50.0, 155.0)
+    assert _totals(conn, event_id)[2] == 125.0
+    conn.close()
+
+
+def test_caisse_refresh_uses_index_with_many_caisses(app_db):
+    conn = db.get_connection()
+    event_id, caisse_id = _fill_event(conn)
+    for i in range(50):
+        cid = conn.execute("INSERT INTO event_caisses (event_id, nom_caisse) VALUES (?, ?)", (event_id, f"C{i}")).lastrowid
+        conn.execute("INSERT INTO event_caisse_details (caisse_id, moment, type, valeur, quantite) VALUES (?, 'fin', 'billet', 1, 1)", (cid,))
+    conn.commit()
+    plan = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT SUM(valeur) FROM event_caisse_details WHERE caisse_id = ? AND moment = 'fin'", (caisse_id,)
+    ))
+    assert "idx_event_caisse_details_caisse_moment" in plan
+    assert _totals(conn, event_id)[2] == 115.0
+    conn.close()
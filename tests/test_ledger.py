@@ -0,0 +1,148 @@
+"""
+Tests pour le grand livre matérialisé (db/ledger.py, table ledger_entries).
+"""
+
+import pytest
+
+from db import db
+import random
+
+from db.ledger import rebuild_ledger, list_entries, last_entries, balance_before, refresh_checkpoints
+
+
+def _entries(conn):
+    return [tuple(r) for r in conn.execute(
+        "SELECT source_table, source_id, event_id, date, type, libelle, montant FROM ledger_entries ORDER BY date, id"
+    )]
+
+
+def test_triggers_keep_ledger_in_sync(app_db):
+    conn = db.get_connection()
+    conn.execute("INSERT INTO dons_subventions (date, source, montant, justificatif) VALUES ('15/03/2024', 'Mairie', 100, 'arrêté')")
+    conn.execute("INSERT INTO events (name, date) VALUES ('Kermesse', '2024-06-01')")
+    conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (1, 'Tombola', 50)")
+    conn.execute("INSERT INTO event_depenses (event_id, categorie, montant) VALUES (1, 'Lots', 20)")
+    conn.execute("INSERT INTO depenses_regulieres (categorie, montant, date_depense) VALUES ('Assurance', 80, '2024-01-10')")
+    conn.execute("INSERT INTO depenses_diverses (commentaire, montant, date_depense) VALUES ('Timbres', 5, '2024-02-01')")
+    conn.commit()
+    assert _entries(conn) == [
+        ("depenses_regulieres", 1, None, "2024-01-10", "Dépense régulière", "Assurance", -80.0),
+        ("depenses_diverses", 1, None, "2024-02-01", "Dépense diverse", "Timbres", -5.0),
+        ("dons_subventions", 1, None, "2024-03-15", "Recette", "Mairie", 100.0),
+        ("event_recettes", 1, 1, "2024-06-01", "Recette évènement", "Tombola", 50.0),
+        ("event_depenses", 1, 1, "2024-06-01", "Dépense évènement", "Lots", -20.0),
+    ]
+
+    conn.execute("UPDATE dons_subventions SET montant = 120 WHERE id = 1")
+    conn.execute("UPDATE events SET date = '02/06/2024' WHERE id = 1")
+    conn.execute("DELETE FROM depenses_diverses WHERE id = 1")
+    conn.commit()
+    rows = {(r[0], r[1]): r for r in _entries(conn)}
+    assert rows[("dons_subventions", 1)][6] == 120.0
+    assert rows[("event_recettes", 1)][3] == "2024-06-02"
+    assert ("depenses_diverses", 1) not in rows
+
+    conn.execute("DELETE FROM events WHERE id = 1")
+    conn.commit()
+    assert {r[0] for r in _entries(conn)} == {"dons_subventions", "depenses_regulieres"}
+    conn.close()
+
+
+def test_event_entries_require_existing_event(app_db):
+    conn = db.get_connection()
+    conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (42, 'Orpheline', 10)")
+    conn.commit()
+    assert _entries(conn) == []
+    conn.close()
+
+
+def test_rebuild_matches_triggers(app_db):
+    conn = db.get_connection()
+    conn.execute("INSERT INTO events (name, date) VALUES ('Loto', '2024-03-01')")
+    for i in range(10):
+        conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (1, ?, ?)", (f"R{i}", i))
+        conn.execute("INSERT INTO dons_subventions (date, source, montant) VALUES (?, 'Don', ?)", (f"2024-01-{i + 1:02d}", i))
+    conn.commit()
+    expected = sorted(_entries(conn))
+    # Simule une base modifiée sans triggers
+    conn.execute("DELETE FROM ledger_entries")
+    conn.commit()
+    assert rebuild_ledger(conn) == 20
+    conn.commit()
+    assert sorted(_entries(conn)) == expected
+    conn.close()
+
+
+def test_list_entries_date_range_and_last(app_db, max_queries):
+    conn = db.get_connection()
+    for month in range(1, 13):
+        conn.execute("INSERT INTO dons_subventions (date, source, montant) VALUES (?, 'Don', 10)", (f"2024-{month:02d}-05",))
+    conn.commit()
+    conn.close()
+    with max_queries(1):
+        rows = list_entries("2024-03-01", "2024-05-31")
+    assert [r["date"] for r in rows] == ["2024-03-05", "2024-04-05", "2024-05-05"]
+    with max_queries(1):
+        last = last_entries(2)
+    assert [r["date"] for r in last] == ["2024-12-05", "2024-11-05"]
+
+
+def test_date_range_query_uses_index(app_db):
+    conn = db.get_connection()
+    plan = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM ledger_entries WHERE date >= ? AND date <= ? ORDER BY date, id", ("a", "b")
+    ))
+    conn.close()
+    assert "idx_ledger_entries_date" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def _checkpoint_months(conn):
+    return [r[0] for r in conn.execute("SELECT month FROM ledger_checkpoints ORDER BY month")]
+
+
+def test_balance_before_matches_full_sum(app_db):
+    rng = random.Random(7)
+    conn = db.get_connection()
+    for _ in range(200):
+        date = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        conn.execute("INSERT INTO dons_subventions (date, source, montant) VALUES (?, 'Don', ?)", (date, rng.randint(-50, 100)))
+    conn.commit()
+    for date in ("2023-12-31", "2024-01-01", "2024-03-15", "2024-07-01", "2024-12-28", "2025-01-01"):
+        expected = conn.execute("SELECT COALESCE(SUM(montant), 0) FROM ledger_entries WHERE date < ?", (date,)).fetchone()[0]
+        assert balance_before(date) == pytest.approx(expected)
+    conn.close()
+
+
+def test_checkpoints_invalidated_from_edited_month_only(app_db):
+    conn = db.get_connection()
+    for month in range(1, 13):
+        conn.execute("INSERT INTO dons_subventions (date, source, montant) VALUES (?, 'Don', 10)", (f"2024-{month:02d}-10",))
+    conn.commit()
+    refresh_checkpoints(conn)
+    conn.commit()
+    assert len(_checkpoint_months(conn)) == 12
+
+    conn.execute("UPDATE dons_subventions SET montant = 110 WHERE date = '2024-06-10'")
+    conn.commit()
+    assert _checkpoint_months(conn) == [f"2024-{m:02d}" for m in range(1, 7)]
+    assert balance_before("2024-09-01") == pytest.approx(180)
+    assert len(_checkpoint_months(conn)) == 12
+
+    # Le déplacement d'une écriture invalide à partir du plus ancien des deux mois
+    conn.execute("UPDATE dons_subventions SET date = '2024-11-01' WHERE date = '2024-03-10'")
+    conn.commit()
+    assert _checkpoint_months(conn)[-1] == "2024-03"
+    conn.close()
+
+
+def test_list_entries_running_balance_on_period(app_db):
+    conn = db.get_connection()
+    for month in range(1, 7):
+        conn.execute("INSERT INTO dons_subventions (date, source, montant) VALUES (?, 'Don', ?)", (f"2024-{month:02d}-05", month))
+    conn.commit()
+    conn.close()
+    opening = 1000 + balance_before("2024-04-01")
+    rows = list_entries("2024-04-01", "2024-05-05", solde_initial=opening)
+    assert opening == pytest.approx(1006)
+    assert [(r["date"], r["solde"]) for r in rows] == [("2024-04-05", 1010), ("2024-05-05", 1015)]
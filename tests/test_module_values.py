@@ -0,0 +1,76 @@
+"""
+Tests pour la valeur numérique des cellules de modules (db/module_values.py).
+"""
+
+from db import db
+from db.module_values import create_module_values_schema
+from modules.event_modules_db import sum_module_column
+
+
+def _module_with_column(conn):
+    module_id = conn.execute("INSERT INTO event_modules (event_id, nom_module) VALUES (NULL, 'Commandes')").lastrowid
+    field_id = conn.execute(
+        "INSERT INTO event_module_fields (module_id, nom_champ) VALUES (?, 'Montant')", (module_id,)
+    ).lastrowid
+    return module_id, field_id
+
+
+def _num(conn, cell_id):
+    return conn.execute("SELECT valeur_num FROM event_module_data WHERE id = ?", (cell_id,)).fetchone()[0]
+
+
+def test_valeur_num_set_on_write(app_db):
+    conn = db.get_connection()
+    module_id, field_id = _module_with_column(conn)
+    cases = {"12": 12.0, "2,50": 2.5, "1 200,5": 1200.5, "-3": -3.0, "Martin": None, "": None, "1.2.3": None}
+    ids = {}
+    for valeur in cases:
+        ids[valeur] = conn.execute(
+            "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (?, 1, ?, ?)",
+            (module_id, field_id, valeur)
+        ).lastrowid
+    conn.commit()
+    assert {v: _num(conn, i) for v, i in ids.items()} == cases
+
+    conn.execute("UPDATE event_module_data SET valeur = '7,25' WHERE id = ?", (ids["Martin"],))
+    conn.commit()
+    assert _num(conn, ids["Martin"]) == 7.25
+    assert sum_module_column(module_id, field_id) == 12 + 2.5 + 1200.5 - 3 + 7.25
+
+
+def test_sum_of_empty_column_is_zero(app_db):
+    conn = db.get_connection()
+    module_id, field_id = _module_with_column(conn)
+    conn.commit()
+    assert sum_module_column(module_id, field_id) == 0
+
+
+def test_backfill_of_legacy_table(tmp_path):
+    path = str(tmp_path / "ancienne.db")
+    previous = db.get_db_file()
+    db.set_db_file(path)
+    try:
+        conn = db.get_connection()
+        conn.execute(
+            "CREATE TABLE event_module_data (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "module_id INTEGER, row_index INTEGER, field_id INTEGER, valeur TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO event_module_data (module_id, row_index, field_id, valeur) VALUES (1, ?, 1, ?)",
+            [(1, "3,5"), (2, "abc"), (3, "4")]
+        )
+        conn.commit()
+        create_module_values_schema(conn)
+        conn.commit()
+        triggers = conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name='event_module_data'")
+        assert triggers.fetchall() == []
+        values = [r[0] for r in conn.execute("SELECT valeur_num FROM event_module_data ORDER BY row_index")]
+        assert values == [3.5, None, 4.0]
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT SUM(valeur_num) FROM event_module_data WHERE module_id = 1 AND field_id = 1"
+        ))
+        assert "idx_event_module_data_num" in plan
+        conn.close()
+    finally:
+        db.set_db_file(previous)
+
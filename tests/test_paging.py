@@ -0,0 +1,83 @@
+"""
+Tests pour les sources de lignes paginées (db/paging.py).
+"""
+
+from db import db
+from db.ledger import ledger_source, period_filters
+from db.paging import SqlDataSource
+from modules.buvette_db import mouvements_source
+
+
+def _members(conn, count):
+    conn.executemany(
+        "INSERT INTO membres (name, prenom, email) VALUES (?, ?, ?)",
+        [(f"Nom{i:04d}", f"Prénom{i}", f"user{i}@ex.fr" if i % 10 else "100%_ok@ex.fr") for i in range(count)]
+    )
+    conn.commit()
+
+
+def _members_source():
+    return SqlDataSource(
+        columns=[("id", "id"), ("name", "name"), ("prenom", "prenom"), ("email", "email")],
+        from_sql="FROM membres",
+        order_by=[("name", False), ("prenom", False)],
+        search_columns=["name", "email"],
+    )
+
+
+def test_pages_in_sql_order(app_db, max_queries):
+    _members(db.get_connection(), 1000)
+    source = _members_source()
+    with max_queries(2, "comptage + une page"):
+        assert source.count() == 1000
+        page = source.fetch(400, 50)
+    assert [r["name"] for r in page] == [f"Nom{i:04d}" for i in range(400, 450)]
+    assert page[0]["_key"] == page[0]["id"]
+    with max_queries(0, "comptage en cache"):
+        source.count()
+
+    source.set_sort("name", descending=True)
+    assert source.fetch(0, 2)[0]["name"] == "Nom0999"
+
+
+def test_search_and_filters(app_db):
+    _members(db.get_connection(), 100)
+    source = _members_source()
+    source.set_search("nom001")
+    assert source.count() == 10
+    # % et _ saisis sont cherchés littéralement
+    source.set_search("100%_")
+    assert source.count() == 10
+    source.set_search("")
+    source.set_filters([("name < ?", ("Nom0005",))])
+    assert [r["name"] for r in source.fetch(0, 100)] == [f"Nom{i:04d}" for i in range(5)]
+    assert source.aggregate(n="COUNT(*)") == {"n": 5}
+
+
+def test_ledger_source_period(app_db):
+    conn = db.get_connection()
+    conn.executemany(
+        "INSERT INTO dons_subventions (source, montant, date) VALUES (?, ?, ?)",
+        [("Don A", 10, "2024-01-15"), ("Don B", 20, "2024-02-10"), ("Don C", 30, "2024-03-05")]
+    )
+    conn.execute("INSERT INTO depenses_diverses (montant, date_depense, commentaire) VALUES (5, '2024-02-20', 'Timbres')")
+    conn.commit()
+    source = ledger_source()
+    source.set_filters(period_filters("2024-02-01", "2024-02-29"))
+    assert [r["libelle"] for r in source.fetch(0, 10)] == ["Don B", "Timbres"]
+    totals = source.aggregate(total="SUM(montant)")
+    assert totals["total"] == 15
+
+
+def test_mouvements_source(app_db):
+    conn = db.get_connection()
+    article_id = conn.execute("INSERT INTO buvette_articles (name, contenance) VALUES ('Soda', '33cl')").lastrowid
+    conn.executemany(
+        "INSERT INTO buvette_mouvements (date_mouvement, article_id, type_mouvement, quantite, motif) VALUES (?, ?, ?, ?, ?)",
+        [("2024-05-01", article_id, "entrée", 24, "Achat"), ("2024-05-02", article_id, "sortie", 3, "Vente")]
+    )
+    conn.commit()
+    rows = mouvements_source().fetch(0, 10)
+    assert [(r["date"], r["article_name"], r["type"]) for r in rows] == [
+        ("2024-05-02", "Soda", "sortie"), ("2024-05-01", "Soda", "entrée")
+    ]
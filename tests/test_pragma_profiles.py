@@ -0,0 +1,91 @@
+"""
+Tests pour les profils de PRAGMA de performance (db/db.py).
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import db
+
+
+def pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+class TestPragmaProfiles(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        conn.commit()
+        conn.close()
+        self.previous_db = db.get_db_file()
+        self.previous_profile = db.get_pragma_profile()
+        db.set_db_file(self.db_path)
+
+    def tearDown(self):
+        db.set_pragma_profile(self.previous_profile)
+        db.set_db_file(self.previous_db)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_default_profile_applied_on_open(self):
+        conn = db.get_connection()
+        self.assertEqual(conn.profile, db.get_pragma_profile())
+        self.assertEqual(pragma(conn, "synchronous"), 1)  # NORMAL
+        self.assertEqual(pragma(conn, "temp_store"), 2)  # MEMORY
+        self.assertEqual(pragma(conn, "cache_size"), db.PRAGMA_PROFILES["interactive"]["cache_size"])
+        self.assertEqual(pragma(conn, "foreign_keys"), 0)
+        conn.close()
+
+    def test_temporary_profile_is_restored(self):
+        with db.pragma_profile("bulk-import") as conn:
+            self.assertEqual(conn.profile, "bulk-import")
+            self.assertEqual(pragma(conn, "cache_size"), db.PRAGMA_PROFILES["bulk-import"]["cache_size"])
+        conn = db.get_connection()
+        self.assertEqual(conn.profile, "interactive")
+        self.assertEqual(pragma(conn, "cache_size"), db.PRAGMA_PROFILES["interactive"]["cache_size"])
+        conn.close()
+
+    def test_report_profile_is_read_only(self):
+        with db.pragma_profile("report") as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO t DEFAULT VALUES")
+        conn = db.get_connection()
+        conn.execute("INSERT INTO t DEFAULT VALUES")
+        conn.commit()
+        conn.close()
+
+    def test_set_pragma_profile_reopens_pool(self):
+        db.set_pragma_profile("report")
+        conn = db.get_connection()
+        self.assertEqual(conn.profile, "report")
+        self.assertEqual(pragma(conn, "query_only"), 1)
+        conn.close()
+
+    def test_profile_on_plain_connection(self):
+        # Connexion hors pool (export de clôture, sauvegarde) : PRAGMA appliqués, pas d'attribut profile
+        conn = sqlite3.connect(self.db_path)
+        try:
+            db.apply_pragma_profile(conn, "report")
+            self.assertEqual(pragma(conn, "query_only"), 1)
+            self.assertEqual(pragma(conn, "cache_size"), db.PRAGMA_PROFILES["report"]["cache_size"])
+        finally:
+            conn.close()
+
+    def test_unknown_profile_rejected(self):
+        with self.assertRaises(ValueError):
+            db.set_pragma_profile("turbo")
+
+
+if __name__ == '__main__':
+    unittest.main()
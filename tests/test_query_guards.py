@@ -0,0 +1,66 @@
+"""
+Gardes anti N+1 : les chargements des fenêtres s'exécutent en un nombre fixe
+de requêtes, quel que soit le volume de données (db.max_queries).
+"""
+
+import pytest
+
+from db import db
+from modules.events_db import list_events_with_totals, list_event_recettes
+
+
+def _populate(nb_events=30):
+    conn = db.get_connection()
+    for i in range(nb_events):
+        cur = conn.execute("INSERT INTO events (name, date) VALUES (?, ?)", (f"Ev {i}", f"2024-01-{i % 28 + 1:02d}"))
+        event_id = cur.lastrowid
+        module_id = conn.execute(
+            "INSERT INTO event_modules (event_id, nom_module) VALUES (?, ?)", (event_id, f"Module {i}")
+        ).lastrowid
+        conn.execute("INSERT INTO event_recettes (event_id, source, montant, module_id) VALUES (?, 'Tombola', 10, ?)",
+                     (event_id, module_id))
+        conn.execute("INSERT INTO event_recettes (event_id, source, montant) VALUES (?, 'Dons', 5.5)", (event_id,))
+        if i % 2 == 0:
+            conn.execute("INSERT INTO event_depenses (event_id, categorie, montant) VALUES (?, 'Achat', 4)", (event_id,))
+    conn.commit()
+    conn.close()
+
+
+def test_max_queries_reports_repeated_shapes(app_db):
+    conn = db.get_connection()
+    with pytest.raises(db.TooManyQueriesError) as excinfo:
+        with db.max_queries(2, label="boucle"):
+            for i in range(5):
+                conn.execute("SELECT COUNT(*) FROM events WHERE id = ?", (i,)).fetchone()
+    conn.close()
+    message = str(excinfo.value)
+    assert "5 requête(s)" in message
+    assert "5 x SELECT COUNT(*) FROM events WHERE id = ?" in message
+
+
+def test_max_queries_counts_without_global_trace(app_db, max_queries):
+    assert not db.query_trace_enabled()
+    with max_queries(1) as block:
+        conn = db.get_connection()
+        conn.execute("SELECT 1").fetchone()
+        conn.close()
+    assert block.count == 1
+    assert db.get_query_stats() == []
+
+
+def test_events_list_is_single_query(app_db, max_queries):
+    _populate()
+    with max_queries(1):
+        events = list_events_with_totals()
+    assert len(events) == 30
+    by_name = {ev["name"]: ev for ev in events}
+    assert by_name["Ev 0"]["recettes"] == pytest.approx(15.5)
+    assert by_name["Ev 0"]["depenses"] == pytest.approx(4)
+    assert by_name["Ev 1"]["depenses"] == 0
+
+
+def test_event_recettes_list_is_single_query(app_db, max_queries):
+    _populate(3)
+    with max_queries(1):
+        recettes = list_event_recettes(1)
+    assert [(r["source"], r["module_name"]) for r in recettes] == [("Dons", ""), ("Tombola", "Module 0")]
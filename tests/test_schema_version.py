@@ -0,0 +1,128 @@
+"""
+Tests pour le versionnage du schéma (PRAGMA user_version, db.MIGRATIONS).
+"""
+
+import sqlite3
+
+from db import db
+
+
+def test_new_database_is_stamped(app_db):
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.schema_is_current()
+
+
+def test_current_database_check_is_single_query(app_db, max_queries):
+    with max_queries(1):
+        assert db.schema_is_current()
+    with max_queries(1):
+        assert db.migrate() == []
+
+
+def test_versions_are_ordered():
+    versions = [version for version, _, _ in db.MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert versions[0] == 1
+
+
+def test_legacy_database_migrated(tmp_path):
+    path = str(tmp_path / "ancienne.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE config (id INTEGER PRIMARY KEY, exercice TEXT, date TEXT)")
+    conn.execute("CREATE TABLE membres (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("INSERT INTO membres (name) VALUES ('Dupont')")
+    conn.commit()
+    conn.close()
+
+    previous = db.get_db_file()
+    db.set_db_file(path)
+    try:
+        assert db.get_schema_version() == 0
+        assert db.migrate() == [version for version, _, _ in db.MIGRATIONS]
+        conn = db.get_connection()
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(membres)")}
+        assert {"cotisation", "statut", "date_adhesion"} <= cols
+        assert conn.execute("SELECT name FROM membres").fetchone()[0] == "Dupont"
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name='idx_event_recettes_event_source'").fetchone()
+        conn.close()
+        assert db.schema_is_current()
+    finally:
+        db.set_db_file(previous)
+
+
+def _legacy_db(tmp_path):
+    path = str(tmp_path / "ancienne.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE config (id INTEGER PRIMARY KEY, exercice TEXT, date TEXT)")
+    conn.execute("CREATE TABLE membres (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _count_calls(monkeypatch, module, name, calls):
+    original = getattr(module, name)
+
+    def counted(*args, **kwargs):
+        calls.append(name)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(module, name, counted)
+
+
+def test_legacy_upgrade_rebuilds_ledger_once(tmp_path, monkeypatch):
+    from db import ledger
+    calls = []
+    _count_calls(monkeypatch, ledger, "rebuild_ledger", calls)
+    previous = db.get_db_file()
+    db.set_db_file(_legacy_db(tmp_path))
+    try:
+        db.migrate()
+        assert calls == ["rebuild_ledger"]
+        conn = db.get_connection()
+        triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'")}
+        assert "trg_ledger_checkpoints_ins" in triggers
+        conn.close()
+    finally:
+        db.set_db_file(previous)
+
+
+def test_legacy_upgrade_rebuilds_event_totals_once(tmp_path, monkeypatch):
+    from db import event_totals
+    calls = []
+    _count_calls(monkeypatch, event_totals, "rebuild_event_totals", calls)
+    previous = db.get_db_file()
+    db.set_db_file(_legacy_db(tmp_path))
+    try:
+        db.migrate()
+        assert calls == ["rebuild_event_totals"]
+        conn = db.get_connection()
+        triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'")}
+        assert "trg_caisse_totals_details_ins" in triggers
+        assert "trg_event_totals_event_caisse_totals_upd" in triggers
+        conn.close()
+    finally:
+        db.set_db_file(previous)
+
+
+def test_only_missing_steps_run(app_db, monkeypatch):
+    calls = []
+    step = (db.SCHEMA_VERSION + 1, "Étape de test", lambda conn: calls.append(conn))
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS + [step])
+    monkeypatch.setattr(db, "SCHEMA_VERSION", step[0])
+    assert not db.schema_is_current()
+    assert db.migrate() == [step[0]]
+    assert db.migrate() == []
+    assert len(calls) == 1
+    assert db.get_schema_version() == step[0]
+
+
+def test_drop_tables_resets_version(app_db):
+    conn = db.get_connection()
+    db.drop_tables(conn)
+    conn.close()
+    assert db.get_schema_version() == 0
+    db.init_db()
+    assert db.schema_is_current()
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,81 @@
+"""
+Tests pour l'index de recherche plein texte (db/search_index.py).
+"""
+
+from db import db
+from db.ledger import ledger_source
+from db.search_index import global_search, match_query, rebuild_search_index
+
+
+def _sample(conn):
+    conn.executemany(
+        "INSERT INTO membres (name, prenom, email) VALUES (?, ?, ?)",
+        [("Martin", "Hélène", "helene@ex.fr"), ("Dupont", "Jérôme", None)]
+    )
+    event_id = conn.execute("INSERT INTO events (name, date, lieu) VALUES ('Fête de l''école', '2024-06-15', 'Préau')").lastrowid
+    conn.execute(
+        "INSERT INTO event_payments (event_id, nom_payeuse, classe, montant) VALUES (?, 'Mme Lefèvre', 'CE2', 12)",
+        (event_id,)
+    )
+    conn.execute("INSERT INTO dons_subventions (source, montant, date) VALUES ('Subvention mairie', 500, '2024-01-10')")
+    conn.execute(
+        "INSERT INTO depenses_diverses (montant, date_depense, commentaire, fournisseur, paye_par) "
+        "VALUES (40, '2024-02-20', 'Goûter', 'Boulangerie Élise', 'Trésorière')"
+    )
+    conn.execute("INSERT INTO buvette_achats (date_achat, fournisseur, facture) VALUES ('2024-03-01', 'Métro', 'F-118')")
+    conn.commit()
+    return event_id
+
+
+def test_match_query():
+    assert match_query("  ") is None
+    assert match_query("%_") is None
+    assert match_query('fête "école') == '"fête"* "école"*'
+
+
+def test_accent_insensitive_prefix_search(app_db):
+    conn = db.get_connection()
+    event_id = _sample(conn)
+
+    results = global_search("helen")
+    assert [(r["kind"], r["titre"]) for r in results] == [("membre", "Martin Hélène")]
+    assert [r["kind"] for r in global_search("ECOLE")] == ["evenement"]
+    assert global_search("ecole")[0]["id"] == event_id
+    assert [r["kind"] for r in global_search("lefevre ce2")] == ["paiement"]
+    assert [r["kind"] for r in global_search("metro")] == ["achat"]
+    assert {r["kind"] for r in global_search("2024", kinds=["achat", "evenement"])} == {"achat", "evenement"}
+
+
+def test_index_follows_writes(app_db):
+    conn = db.get_connection()
+    _sample(conn)
+    member_id = conn.execute("SELECT id FROM membres WHERE name = 'Dupont'").fetchone()[0]
+    conn.execute("UPDATE membres SET name = 'Durand' WHERE id = ?", (member_id,))
+    conn.commit()
+    assert global_search("dupont") == []
+    assert global_search("durand")[0]["id"] == member_id
+
+    conn.execute("DELETE FROM membres WHERE id = ?", (member_id,))
+    conn.commit()
+    assert global_search("durand") == []
+
+    # Reconstruction complète : mêmes résultats
+    before = global_search("2024")
+    assert rebuild_search_index(conn) == conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    assert global_search("2024") == before
+
+
+def test_journal_search_uses_index(app_db, max_queries):
+    conn = db.get_connection()
+    _sample(conn)
+    source = ledger_source()
+    source.set_search("boulangerie")  # fournisseur de la dépense, absent des colonnes du journal
+    with max_queries(2, "comptage + page"):
+        assert source.count() == 1
+        assert [r["libelle"] for r in source.fetch(0, 10)] == ["Goûter"]
+    source.set_search("subv mair")
+    assert [r["libelle"] for r in source.fetch(0, 10)] == ["Subvention mairie"]
+    source.set_search("tresoriere goute")
+    assert source.count() == 1
+    source.set_search("%")
+    assert source.count() == 2
@@ -0,0 +1,115 @@
+"""
+Tests pour l'instrumentation SQL optionnelle (db/query_trace.py via db/db.py).
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db import db
+from db import query_trace
+
+
+class TestSqlTrace(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.executemany("INSERT INTO t (v) VALUES (?)", [("a",), ("b",), ("c",)])
+        conn.commit()
+        conn.close()
+        self.previous_db = db.get_db_file()
+        self.previous_trace = db.query_trace_enabled()
+        db.set_db_file(self.db_path)
+        # Ouverture préalable : les PRAGMA d'ouverture ne faussent pas les compteurs
+        db.get_connection().close()
+        db.reset_query_stats()
+
+    def tearDown(self):
+        db.set_query_trace(self.previous_trace)
+        db.reset_query_stats()
+        db.set_db_file(self.previous_db)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            query_trace.normalize_sql("SELECT *  FROM t\n WHERE id = 12 AND v = 'x''y';"),
+            "SELECT * FROM t WHERE id = ? AND v = ?",
+        )
+
+    def test_disabled_trace_records_nothing(self):
+        db.set_query_trace(False)
+        conn = db.get_connection()
+        conn.execute("SELECT * FROM t").fetchall()
+        conn.close()
+        self.assertEqual(db.get_query_stats(), [])
+
+    def test_stats_grouped_by_normalized_statement(self):
+        db.set_query_trace(True)
+        conn = db.get_connection()
+        for i in (1, 2, 3):
+            conn.execute(f"SELECT v FROM t WHERE id = {i}").fetchone()
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM t")
+        self.assertEqual(len(list(cur)), 3)
+        conn.close()
+
+        stats = {s.sql: s for s in db.get_query_stats()}
+        by_id = stats["SELECT v FROM t WHERE id = ?"]
+        self.assertEqual(by_id.calls, 3)
+        self.assertEqual(by_id.rows, 3)
+        self.assertEqual(len(by_id.samples), 3)
+        self.assertGreaterEqual(by_id.p95_ms, 0)
+        self.assertEqual(stats["SELECT * FROM t"].calls, 1)
+        self.assertEqual(stats["SELECT * FROM t"].rows, 3)
+        self.assertIn("SELECT * FROM t", db.format_query_stats())
+
+    def test_traced_counts_queries_of_a_method(self):
+        db.set_query_trace(True)
+
+        class Window:
+            @db.traced()
+            def refresh(self):
+                conn = db.get_connection()
+                conn.execute("SELECT COUNT(*) FROM t").fetchone()
+                conn.execute("SELECT * FROM t").fetchall()
+                conn.close()
+
+        with self.assertLogs("sql_trace", level="INFO") as logs:
+            Window().refresh()
+        self.assertTrue(any("Window.refresh : 2 requête(s)" in line for line in logs.output))
+
+    def test_repeated_query_flagged_as_n_plus_one(self):
+        db.set_query_trace(True)
+        with self.assertLogs("sql_trace", level="WARNING") as logs:
+            with db.trace_block("boucle"):
+                conn = db.get_connection()
+                for i in range(query_trace.N_PLUS_ONE_THRESHOLD):
+                    conn.execute("SELECT v FROM t WHERE id = ?", (i,)).fetchone()
+                conn.close()
+        self.assertIn("N+1 probable", logs.output[0])
+
+    def test_slow_query_logged(self):
+        db.set_query_trace(True)
+        previous = query_trace.SLOW_QUERY_MS
+        query_trace.SLOW_QUERY_MS = 0
+        try:
+            with self.assertLogs("sql_slow", level="WARNING") as logs:
+                conn = db.get_connection()
+                conn.execute("SELECT 1").fetchone()
+                conn.close()
+        finally:
+            query_trace.SLOW_QUERY_MS = previous
+        self.assertIn("SELECT ?", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
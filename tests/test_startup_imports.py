@@ -0,0 +1,54 @@
+"""
+Budget de démarrage : `python -X importtime -c "import main"` ne doit charger
+aucune bibliothèque lourde et rester sous IMPORT_BUDGET_US. Les fenêtres sont
+importées à la première ouverture (main.WINDOWS).
+
+Exécuté dans un sous-processus (interpréteur neuf, répertoire temporaire : main
+crée association.db à l'import si elle manque).
+"""
+
+import os
+import subprocess
+import sys
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "reportlab", "docx", "openpyxl", "tkcalendar")
+IMPORT_BUDGET_US = 500_000  # import de main à froid : ~80 ms mesurées, ~1,5 s avant le chargement paresseux
+
+
+def _run(tmp_path, code):
+    env = dict(os.environ, PYTHONPATH=REPO)
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+
+def _cumulative_us(stderr, module):
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise AssertionError(f"{module} absent de la sortie -X importtime")
+
+
+def test_main_import_budget(tmp_path):
+    proc = _run(tmp_path, "import sys, main; print(' '.join(sys.modules))")
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    loaded = set(proc.stdout.split())
+    assert sorted(m for m in HEAVY_MODULES if m in loaded) == []
+    elapsed = _cumulative_us(proc.stderr, "main")
+    assert elapsed < IMPORT_BUDGET_US, f"import main : {elapsed / 1000:.0f} ms"
+
+
+def test_window_registry_resolves(tmp_path):
+    code = (
+        "import importlib, main\n"
+        "for module_name, class_name in main.WINDOWS.values():\n"
+        "    assert callable(getattr(importlib.import_module(module_name), class_name)), class_name\n"
+    )
+    proc = _run(tmp_path, code)
+    assert proc.returncode == 0, proc.stderr[-2000:]
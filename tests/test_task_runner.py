@@ -0,0 +1,112 @@
+"""
+Tests pour l'exécution en arrière-plan (ui/task_runner.py).
+
+La boucle Tk est remplacée par un widget minimal (after, winfo_exists) dont les
+rappels sont exécutés par le test : aucun affichage n'est nécessaire.
+"""
+
+import threading
+import time
+
+from db import db
+from ui.task_runner import Task, TaskCancelled, run_task
+
+
+class FakeWidget:
+    def __init__(self):
+        self.pending = []
+        self.alive = True
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+
+    def winfo_exists(self):
+        return self.alive
+
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.pending:
+            assert time.monotonic() < deadline, "tâche non terminée"
+            callback = self.pending.pop(0)
+            callback()
+            time.sleep(0.005)
+
+
+def test_result_delivered_in_calling_thread(app_db):
+    widget = FakeWidget()
+    seen = {}
+
+    def load(task):
+        seen["thread"] = threading.current_thread()
+        task.report(0.5, "Moitié")
+        return db.get_connection().execute("SELECT COUNT(*) FROM membres").fetchone()[0]
+
+    def done(result):
+        seen["result"] = result
+        seen["done_thread"] = threading.current_thread()
+
+    run_task(widget, load, on_done=done, progress=False)
+    widget.run_until_idle()
+    assert seen["result"] == 0
+    assert seen["thread"] is not threading.current_thread()
+    assert seen["done_thread"] is threading.current_thread()
+
+
+def test_arguments_and_progress_events():
+    started = threading.Event()
+    release = threading.Event()
+
+    def work(a, b, task):
+        task.report(0.25, "Début")
+        started.set()
+        release.wait(5)
+        task.report(1.0)
+        return a + b
+
+    task = Task(work, (2, 3)).start()
+    assert started.wait(5)
+    assert task.progress_events() == [(0.25, "Début")]
+    release.set()
+    task.future.result(5)
+    assert task.progress_events() == [(1.0, None)]
+    assert task.outcome() == (5, None)
+
+
+def test_cancellation():
+    widget = FakeWidget()
+    started = threading.Event()
+    outcome = []
+
+    def slow(task):
+        started.set()
+        while True:
+            task.check_cancelled()
+            time.sleep(0.01)
+
+    task = run_task(widget, slow, on_done=outcome.append,
+                    on_cancel=lambda: outcome.append("annulée"), progress=False)
+    assert started.wait(5)
+    task.cancel()
+    widget.run_until_idle()
+    assert outcome == ["annulée"]
+    assert isinstance(task.future.exception(), TaskCancelled)
+
+
+def test_errors_and_closed_window():
+    widget = FakeWidget()
+    errors = []
+
+    def boom():
+        raise ValueError("données invalides")
+
+    task = run_task(widget, boom, on_error=errors.append, progress=False)
+    widget.run_until_idle()
+    assert isinstance(errors[0], ValueError)
+    assert "données invalides" in task.traceback
+
+    # Fenêtre fermée avant la fin : tâche annulée, aucun rappel
+    calls = []
+    task = run_task(widget, lambda: 1, on_done=calls.append, progress=False)
+    widget.alive = False
+    widget.run_until_idle()
+    assert calls == [] and task.cancelled
@@ -0,0 +1,110 @@
+"""
+Tests pour le rafraîchissement incrémental des Treeview (ui/tree_sync.py).
+
+Le Treeview est remplacé par un équivalent en mémoire (get_children, insert,
+item, move, delete) qui compte les opérations : les tests n'ont pas besoin
+d'affichage.
+"""
+
+import random
+
+from ui.tree_sync import sync_treeview
+
+
+class MemoryTree:
+    def __init__(self):
+        self.order = []
+        self.items = {}
+        self.calls = []
+
+    def get_children(self, parent=""):
+        return tuple(self.order)
+
+    def insert(self, parent, index, iid, values, tags=()):
+        self.calls.append(("insert", iid))
+        self.order.insert(len(self.order) if index == "end" else index, iid)
+        self.items[iid] = (tuple(values), tuple(tags))
+
+    def item(self, iid, values, tags=()):
+        self.calls.append(("item", iid))
+        self.items[iid] = (tuple(values), tuple(tags))
+
+    def move(self, iid, parent, index):
+        self.calls.append(("move", iid))
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def delete(self, *iids):
+        self.calls.append(("delete",) + iids)
+        for iid in iids:
+            self.order.remove(iid)
+            del self.items[iid]
+
+
+def _rows(n, changed=None):
+    return [(i, (i, f"Ligne {i}" if i != changed else "Modifiée", None)) for i in range(1, n + 1)]
+
+
+def test_single_edit_touches_one_item():
+    tree = MemoryTree()
+    assert sync_treeview(tree, _rows(3000))["inserted"] == 3000
+    tree.calls.clear()
+
+    stats = sync_treeview(tree, _rows(3000, changed=1500))
+    assert stats == {"inserted": 0, "updated": 1, "moved": 0, "deleted": 0}
+    assert tree.calls == [("item", "1500")]
+    assert tree.items["1500"] == ((1500, "Modifiée", ""), ())
+
+
+def test_insert_delete_and_reorder():
+    tree = MemoryTree()
+    sync_treeview(tree, _rows(5))
+    tree.calls.clear()
+
+    rows = [r for r in _rows(5) if r[0] != 2]
+    rows.insert(1, (9, (9, "Nouvelle", None), ("recette",)))
+    stats = sync_treeview(tree, rows)
+    assert stats == {"inserted": 1, "updated": 0, "moved": 0, "deleted": 1}
+    assert tree.order == ["1", "9", "3", "4", "5"]
+    assert tree.items["9"][1] == ("recette",)
+
+    stats = sync_treeview(tree, list(reversed(rows)))
+    assert stats["moved"] == 4 and stats["updated"] == 0
+    assert tree.order == ["5", "4", "3", "9", "1"]
+
+
+def test_rows_deleted_elsewhere_are_forgotten():
+    tree = MemoryTree()
+    sync_treeview(tree, _rows(5))
+    tree.delete("2", "5")
+    tree.calls.clear()
+
+    stats = sync_treeview(tree, _rows(4))
+    assert stats == {"inserted": 1, "updated": 0, "moved": 0, "deleted": 0}
+    assert tree.order == ["1", "2", "3", "4"]
+    assert set(tree._synced_rows[""]) == {"1", "2", "3", "4"}
+
+
+def test_moving_one_row_moves_one_item():
+    tree = MemoryTree()
+    sync_treeview(tree, _rows(100))
+    tree.calls.clear()
+
+    rows = _rows(100)
+    rows.insert(10, rows.pop(80))
+    stats = sync_treeview(tree, rows)
+    assert stats == {"inserted": 0, "updated": 0, "moved": 1, "deleted": 0}
+    assert tree.calls == [("move", "81")]
+    assert tree.order == [str(r[0]) for r in rows]
+
+
+def test_shuffle_with_inserts_reaches_wanted_order():
+    rng = random.Random(4)
+    tree = MemoryTree()
+    sync_treeview(tree, _rows(40))
+    for _ in range(20):
+        rows = [r for r in _rows(60) if rng.random() < 0.7]
+        rng.shuffle(rows)
+        stats = sync_treeview(tree, rows)
+        assert tree.order == [str(r[0]) for r in rows]
+        assert stats["moved"] < len(rows)
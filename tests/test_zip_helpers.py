@@ -0,0 +1,68 @@
+"""
+Tests pour l'archive ZIP de clôture écrite en flux (utils/zip_helpers.py).
+"""
+
+import csv
+import io
+import zipfile
+
+from db import db
+from utils.cloture_exercice import export_all_tables_to_csv
+from utils.zip_helpers import MANIFEST_NAME, verify_zip_manifest, write_tables_zip
+
+
+def _sample(conn):
+    conn.executemany(
+        "INSERT INTO dons_subventions (source, montant, date) VALUES (?, ?, ?)",
+        [(f"Don n°{i}", 10 + i, "2024-01-10") for i in range(30)]
+    )
+    conn.execute("INSERT INTO membres (name, prenom) VALUES ('Martin', 'Hélène')")
+    conn.commit()
+
+
+def test_tables_streamed_with_manifest(app_db, tmp_path):
+    conn = db.get_connection()
+    _sample(conn)
+    path = tmp_path / "cloture.zip"
+    manifest = write_tables_zip(conn, str(path), ["dons_subventions", "membres", "journal"], compresslevel=9)
+
+    assert not conn.in_transaction
+    assert manifest["missing"] == ["journal"]
+    assert {t: info["rows"] for t, info in manifest["tables"].items()} == {"dons_subventions": 30, "membres": 1}
+    with zipfile.ZipFile(path) as zf:
+        assert sorted(zf.namelist()) == ["dons_subventions.csv", MANIFEST_NAME, "membres.csv"]
+        rows = list(csv.reader(io.TextIOWrapper(zf.open("membres.csv"), encoding="utf-8", newline="")))
+    assert rows[1][1:3] == ["Martin", "Hélène"]
+    assert verify_zip_manifest(str(path)) == []
+
+
+def test_all_tables_skip_fts_shadow_tables(app_db, tmp_path):
+    conn = db.get_connection()
+    _sample(conn)
+    manifest = write_tables_zip(conn, str(tmp_path / "all.zip"))
+    assert "dons_subventions" in manifest["tables"]
+    assert not [t for t in manifest["tables"] if t.startswith("search_index")]
+
+
+def test_csv_directory_export_skips_fts_shadow_tables(app_db, tmp_path):
+    conn = db.get_connection()
+    _sample(conn)
+    conn.close()
+    export_dir = export_all_tables_to_csv(db.get_db_file(), str(tmp_path / "csv"))
+    files = sorted(p.name for p in (tmp_path / "csv").iterdir())
+    assert export_dir == str(tmp_path / "csv")
+    assert "dons_subventions.csv" in files
+    assert not [f for f in files if f.startswith("search_index")]
+
+
+def test_verify_detects_altered_entry(app_db, tmp_path):
+    conn = db.get_connection()
+    _sample(conn)
+    path = tmp_path / "cloture.zip"
+    write_tables_zip(conn, str(path), ["dons_subventions", "membres"])
+    altered = tmp_path / "altered.zip"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(altered, "w") as dst:
+        for name in src.namelist():
+            data = src.read(name)
+            dst.writestr(name, data.replace(b"Martin", b"Martine") if name == "membres.csv" else data)
+    assert verify_zip_manifest(str(altered)) == ["membres.csv"]
@@ -0,0 +1,224 @@
+"""
+Sauvegardes automatiques planifiées de la base active (voir MainApp).
+
+Toutes les CHECK_MS, dans la boucle Tk, le planificateur relève
+PRAGMA data_version sur une connexion qui lui est propre : la valeur change dès
+qu'une autre connexion a validé une écriture, mais ne dit pas combien : le
+planificateur compte donc les relevés avec modification (une rafale de
+100 écritures entre deux relevés compte pour un). Une sauvegarde (instantané
+du dépôt, utils/backup_store.backup_snapshot, contrôlée par PRAGMA
+quick_check) est lancée sur le task runner, sans fenêtre :
+- quand l'intervalle ASSO_BACKUP_INTERVAL_MIN (minutes, défaut 60) est écoulé
+  depuis la dernière sauvegarde et que la base a changé depuis ;
+- ou après ASSO_BACKUP_AFTER_CHANGES relevés avec modification (défaut 100,
+  soit au moins 100 × CHECK_MS d'activité).
+0 désactive le déclencheur correspondant. Après un échec, nouvel essai au plus
+tôt RETRY_DELAY_S plus tard.
+
+Ce module n'importe pas tkinter : il n'utilise que after() du widget.
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from db.db import get_db_file
+from ui.task_runner import run_task
+from utils.app_logger import get_logger
+from utils.backup_store import backup_snapshot, latest_snapshot
+from utils.db_backup import BACKUP_DIR
+
+logger = get_logger("backup_scheduler")
+
+CHECK_MS = 5000  # période des relevés de data_version
+RETRY_DELAY_S = 300  # attente avant un nouvel essai après une sauvegarde en échec
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"{name} invalide, valeur par défaut {default}")
+        return default
+
+
+def format_backup_age(last_backup, now=None):
+    """Âge d'une sauvegarde pour la barre d'état : « il y a 5 min », « jamais »…"""
+    if last_backup is None:
+        return "jamais"
+    seconds = ((now or datetime.now()) - last_backup).total_seconds()
+    if seconds < 60:
+        return "à l'instant"
+    if seconds < 3600:
+        return f"il y a {int(seconds // 60)} min"
+    if seconds < 86400:
+        return f"il y a {int(seconds // 3600)} h"
+    return f"il y a {int(seconds // 86400)} j"
+
+
+class BackupScheduler:
+    """
+    Planificateur de sauvegardes attaché à la fenêtre principale.
+    on_change() est appelé (thread Tk) quand l'état affiché change : sauvegarde
+    terminée ou en échec, âge de la dernière sauvegarde.
+    """
+
+    def __init__(self, widget, interval_min=None, after_changes=None, store_dir=BACKUP_DIR, on_change=None):
+        self.widget = widget
+        if interval_min is None:
+            interval_min = _env_int("ASSO_BACKUP_INTERVAL_MIN", 60)
+        if after_changes is None:
+            after_changes = _env_int("ASSO_BACKUP_AFTER_CHANGES", 100)
+        self.interval_s = interval_min * 60
+        self.after_changes = after_changes
+        self.store_dir = store_dir
+        self.on_change = on_change
+        self.changes = 0
+        self.last_backup = None
+        self.last_error = None
+        self.task = None
+        self._retry_at = 0.0
+        self._monitor = None
+        self._monitor_file = None
+        self._data_version = None
+        self._job = None
+        self._status = None
+
+    @property
+    def enabled(self):
+        return bool(self.interval_s or self.after_changes)
+
+    def start(self):
+        if self.enabled:
+            self._job = self.widget.after(CHECK_MS, self.tick)
+        else:
+            logger.info("Sauvegardes automatiques désactivées.")
+        return self
+
+    def stop(self):
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+        self._close_monitor()
+
+    def release(self):
+        """Ferme la connexion de relevé (avant remplacement du fichier de base) ; rouverte au relevé suivant."""
+        self._close_monitor()
+
+    def refresh_last_backup(self):
+        """Relit la date du dernier instantané de la base active (après une sauvegarde ou restauration manuelle)."""
+        snapshot = latest_snapshot(get_db_file(), self.store_dir)
+        self.last_backup = datetime.fromisoformat(snapshot["created_at"]) if snapshot else None
+
+    def status_text(self, now=None):
+        text = f"Dernière sauvegarde : {format_backup_age(self.last_backup, now)}"
+        if self.task is not None:
+            text += " (sauvegarde en cours…)"
+        elif self.last_error is not None:
+            text += " (échec de la sauvegarde automatique)"
+        return text
+
+    # --- Relevés -------------------------------------------------------------
+    def _close_monitor(self):
+        if self._monitor is not None:
+            self._monitor.close()
+        self._monitor = None
+        self._monitor_file = None
+        self._data_version = None
+
+    def _open_monitor(self, db_file):
+        self._close_monitor()
+        self._monitor = sqlite3.connect(db_file)
+        self._monitor_file = db_file
+        self.changes = 0
+        self.last_error = None
+        self.refresh_last_backup()
+        # Base modifiée depuis le dernier instantané (session précédente) : compte comme un relevé avec modification
+        modified = max(os.path.getmtime(p) for p in (db_file, db_file + "-wal") if os.path.exists(p))
+        if self.last_backup is None or modified > self.last_backup.timestamp():
+            self.changes = 1
+
+    def poll_changes(self):
+        """Relève data_version (un relevé avec modification de plus si elle a changé) ; rouvre la connexion de relevé si la base active a changé."""
+        db_file = get_db_file()
+        if not os.path.exists(db_file):
+            self._close_monitor()
+            return
+        if db_file != self._monitor_file:
+            self._open_monitor(db_file)
+        version = self._monitor.execute("PRAGMA data_version").fetchone()[0]
+        if self._data_version is not None and version != self._data_version:
+            self.changes += 1
+        self._data_version = version
+
+    def due(self, now=None):
+        """Raison de lancer une sauvegarde maintenant ("modifications", "intervalle"), ou None."""
+        if self.task is not None or not self.changes or time.monotonic() < self._retry_at:
+            return None
+        if self.after_changes and self.changes >= self.after_changes:
+            return "modifications"
+        if self.interval_s:
+            if self.last_backup is None:
+                return "intervalle"
+            if ((now or datetime.now()) - self.last_backup).total_seconds() >= self.interval_s:
+                return "intervalle"
+        return None
+
+    def tick(self):
+        self._job = None
+        try:
+            self.poll_changes()
+            reason = self.due()
+            if reason:
+                self.run_backup(reason)
+        except Exception as e:
+            logger.error(f"Planificateur de sauvegardes : {e}")
+        self._notify_if_changed()
+        self._job = self.widget.after(CHECK_MS, self.tick)
+
+    # --- Sauvegarde ------------------------------------------------------------
+    def run_backup(self, reason="manuelle"):
+        """Lance une sauvegarde de la base active sur le task runner (sans fenêtre de progression)."""
+        if self.task is not None:
+            return None
+        db_file = get_db_file()
+        changes = self.changes
+        started = time.perf_counter()
+        logger.info(f"Sauvegarde automatique de {db_file} (déclencheur : {reason}, {changes} relevé(s) avec modification)")
+        self.task = run_task(
+            self.widget, backup_snapshot, db_file, self.store_dir,
+            on_done=lambda manifest: self._done(manifest, changes, started),
+            on_error=lambda error: self._failed(error, started),
+            on_cancel=lambda: self._failed(None, started),
+            progress=False,
+        )
+        self._notify_if_changed()
+        return self.task
+
+    def _done(self, manifest, changes, started):
+        self.task = None
+        self.last_error = None
+        self.changes = max(0, self.changes - changes)
+        self.last_backup = datetime.fromisoformat(manifest["created_at"])
+        logger.info(
+            f"Sauvegarde automatique terminée : {manifest['name']} en {time.perf_counter() - started:.2f} s "
+            f"({manifest['new_bytes']} octets nouveaux, quick_check {manifest['quick_check']})"
+        )
+        self._notify_if_changed(force=True)
+
+    def _failed(self, error, started):
+        self.task = None
+        self.last_error = error
+        self._retry_at = time.monotonic() + RETRY_DELAY_S
+        logger.error(f"Sauvegarde automatique en échec après {time.perf_counter() - started:.2f} s : {error}")
+        self._notify_if_changed(force=True)
+
+    def _notify_if_changed(self, force=False):
+        status = self.status_text()
+        if (force or status != self._status) and self.on_change:
+            self.on_change()
+        self._status = status
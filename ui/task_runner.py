@@ -0,0 +1,290 @@
+"""
+Exécution des chargements et traitements longs hors du thread Tk.
+
+run_task() lance une fonction (requêtes, calculs de rapport, préparation d'un
+export) sur un thread de travail puis rapporte son issue dans la boucle Tk par
+after() : on_done(résultat), on_error(exception) et on_cancel() sont toujours
+appelés depuis le thread Tk, jamais depuis le thread de travail. Une fenêtre
+de progression (barre + bouton « Annuler ») s'affiche si la tâche dure plus de
+SHOW_DELAY_MS ; la fenêtre appelante reste utilisable pendant ce temps.
+
+Les threads de travail sont peu nombreux et réutilisés : chacun garde sa
+connexion du pool (db.get_connection() est propre à chaque thread).
+
+Si la fonction accepte un paramètre `task`, elle reçoit la Task en cours pour
+signaler son avancement (task.report(0.5, "Dépenses…")) et s'interrompre à la
+demande de l'utilisateur (task.check_cancelled() lève TaskCancelled).
+
+Ce module n'importe tkinter qu'à l'ouverture de la fenêtre de progression.
+"""
+
+import inspect
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.app_logger import get_logger
+
+logger = get_logger("task_runner")
+
+POLL_MS = 50  # période de relève des résultats/avancements dans la boucle Tk
+SHOW_DELAY_MS = 300  # pas de fenêtre de progression pour les tâches plus courtes
+MAX_WORKERS = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TaskCancelled(Exception):
+    """Levée par Task.check_cancelled() après une demande d'annulation."""
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="tache")
+        return _executor
+
+
+def release_worker_connections(timeout=10):
+    """
+    Ferme les connexions du pool tenues par les threads de travail (fichiers
+    .db, -wal et -shm ouverts). À appeler, avec db.close_connections() pour le
+    thread Tk, avant de remplacer ou supprimer le fichier de base.
+
+    Une demande de fermeture est soumise par thread ; chacune attend les autres
+    sur une barrière, ce qui garantit qu'elles occupent des threads distincts.
+    Lève RuntimeError si une tâche en cours occupe un thread au-delà de timeout.
+    """
+    with _executor_lock:
+        executor = _executor
+    if executor is None:
+        return
+    from db.db import release_thread_connections
+
+    barrier = threading.Barrier(MAX_WORKERS)
+
+    def release():
+        release_thread_connections()
+        barrier.wait(timeout)
+
+    futures = [executor.submit(release) for _ in range(MAX_WORKERS)]
+    try:
+        for future in futures:
+            future.result(timeout + 1)
+    except Exception as e:
+        barrier.abort()
+        raise RuntimeError("Une tâche d'arrière-plan utilise encore la base, réessayez après sa fin.") from e
+
+
+def _accepts_task(func):
+    try:
+        return "task" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+class Task:
+    """
+    Traitement exécuté sur un thread de travail.
+
+    Côté thread de travail : report(), cancelled, check_cancelled().
+    Côté thread Tk : cancel(), done, progress_events(), outcome().
+    """
+
+    def __init__(self, func, args=(), kwargs=None, name=None):
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.name = name or getattr(func, "__name__", "tâche")
+        if _accepts_task(func):
+            self.kwargs["task"] = self
+        self.future = None
+        self.traceback = None
+        self._cancel = threading.Event()
+        self._events = queue.Queue()
+
+    # --- Thread de travail -------------------------------------------------
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """À appeler entre deux étapes : interrompt la tâche si l'annulation a été demandée."""
+        if self._cancel.is_set():
+            raise TaskCancelled(self.name)
+
+    def report(self, fraction=None, message=None):
+        """Signale l'avancement : fraction entre 0 et 1 (None : indéterminé), message facultatif."""
+        self._events.put((fraction, message))
+
+    def _run(self):
+        self.check_cancelled()
+        started = time.perf_counter()
+        try:
+            return self.func(*self.args, **self.kwargs)
+        except TaskCancelled:
+            raise
+        except Exception:
+            # Trace capturée ici : elle n'existe plus une fois revenu dans le thread Tk
+            self.traceback = traceback.format_exc()
+            raise
+        finally:
+            logger.debug(f"Tâche '{self.name}' : {time.perf_counter() - started:.3f} s")
+
+    # --- Thread Tk -----------------------------------------------------------
+    def start(self):
+        self.future = _get_executor().submit(self._run)
+        return self
+
+    def cancel(self):
+        """Demande l'annulation ; le résultat éventuel sera ignoré."""
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()  # pas encore démarrée : ne démarrera pas
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def progress_events(self):
+        """Avancements signalés depuis le dernier appel, du plus ancien au plus récent."""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def outcome(self):
+        """
+        (résultat, erreur) d'une tâche terminée. erreur vaut None en cas de
+        succès, une TaskCancelled si l'annulation a été demandée entre-temps.
+        """
+        if self.cancelled or self.future.cancelled():
+            return None, TaskCancelled(self.name)
+        error = self.future.exception()
+        if error is not None:
+            return None, error
+        return self.future.result(), None
+
+
+class ProgressDialog:
+    """Petite fenêtre de progression avec bouton « Annuler » (non modale)."""
+
+    def __init__(self, master, title, message, on_cancel=None):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.top = tk.Toplevel(master)
+        self.top.title(title)
+        self.top.resizable(False, False)
+        self.top.transient(master.winfo_toplevel())
+        self.message_var = tk.StringVar(value=message)
+        tk.Label(self.top, textvariable=self.message_var, anchor="w", width=45).pack(fill=tk.X, padx=12, pady=(12, 4))
+        self.bar = ttk.Progressbar(self.top, mode="indeterminate", length=320)
+        self.bar.pack(padx=12, pady=4)
+        self.bar.start(12)
+        self.determinate = False
+        if on_cancel is not None:
+            tk.Button(self.top, text="Annuler", command=on_cancel).pack(pady=(4, 10))
+            self.top.protocol("WM_DELETE_WINDOW", on_cancel)
+
+    def update_progress(self, fraction=None, message=None):
+        if message:
+            self.message_var.set(message)
+        if fraction is None:
+            return
+        if not self.determinate:
+            self.bar.stop()
+            self.bar.configure(mode="determinate", maximum=100)
+            self.determinate = True
+        self.bar["value"] = max(0, min(100, fraction * 100))
+
+    def close(self):
+        try:
+            self.top.destroy()
+        except Exception:
+            pass
+
+
+def _show_error(error, task, title):
+    from tkinter import messagebox
+
+    logger.error(f"{title} : échec de la tâche '{task.name}' : {error}\n{task.traceback or ''}")
+    messagebox.showerror(title, f"{title} : une erreur est survenue.\n{error}")
+
+
+def run_task(widget, func, *args, on_done=None, on_error=None, on_cancel=None,
+             title="Traitement en cours", message="Chargement…", progress=True, **kwargs):
+    """
+    Exécute func(*args, **kwargs) sur un thread de travail et retourne la Task.
+
+    widget : widget Tk dont la boucle reçoit l'issue (after()) ; si la fenêtre
+    est fermée avant la fin, la tâche est annulée et aucun rappel n'est fait.
+    on_error par défaut : journalise et affiche un message d'erreur.
+    progress=False : pas de fenêtre de progression (chargement d'arrière-plan).
+    """
+    task = Task(func, args, kwargs).start()
+    watcher = _TaskWatcher(widget, task, on_done, on_error, on_cancel, title, message, progress)
+    widget.after(POLL_MS, watcher.poll)
+    return task
+
+
+class _TaskWatcher:
+    """Relève périodique (after) d'une tâche dans la boucle Tk."""
+
+    def __init__(self, widget, task, on_done, on_error, on_cancel, title, message, progress):
+        self.widget = widget
+        self.task = task
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.title = title
+        self.message = message
+        self.progress = progress
+        self.dialog = None
+        self.started = time.monotonic()
+
+    def _widget_alive(self):
+        try:
+            return bool(self.widget.winfo_exists())
+        except Exception:  # TclError : interpréteur ou fenêtre détruits
+            return False
+
+    def poll(self):
+        if not self._widget_alive():
+            self.task.cancel()
+            self._close_dialog()
+            return
+        events = self.task.progress_events()
+        if not self.task.done:
+            elapsed_ms = (time.monotonic() - self.started) * 1000
+            if self.progress and self.dialog is None and elapsed_ms >= SHOW_DELAY_MS:
+                self.dialog = ProgressDialog(self.widget, self.title, self.message, on_cancel=self.task.cancel)
+            if self.dialog is not None and events:
+                self.dialog.update_progress(*events[-1])
+            self.widget.after(POLL_MS, self.poll)
+            return
+
+        self._close_dialog()
+        result, error = self.task.outcome()
+        if isinstance(error, TaskCancelled):
+            logger.info(f"Tâche '{self.task.name}' annulée.")
+            if self.on_cancel:
+                self.on_cancel()
+        elif error is not None:
+            if self.on_error:
+                self.on_error(error)
+            else:
+                _show_error(error, self.task, self.title)
+        elif self.on_done:
+            self.on_done(result)
+
+    def _close_dialog(self):
+        if self.dialog is not None:
+            self.dialog.close()
+            self.dialog = None
@@ -0,0 +1,108 @@
+"""
+Rafraîchissement incrémental d'un ttk.Treeview.
+
+sync_treeview() applique au Treeview la différence entre son contenu et le
+nouveau résultat, ligne par ligne, par clé (iid) : suppression des lignes
+disparues, mise à jour des seules lignes modifiées, insertion des nouvelles et
+déplacement des seules lignes dont la place a changé (les lignes d'une plus
+longue sous-suite croissante, déjà dans le bon ordre relatif, ne bougent
+pas). Sans vidage du widget, la sélection et la position de défilement sont
+conservées ; modifier une ligne d'une liste de 3 000 lignes ne touche qu'un
+élément.
+
+Les valeurs posées sont mémorisées sur le widget, par parent
+(tree._synced_rows) : les lignes supprimées ailleurs en sont retirées au
+passage suivant, mais sync_treeview() doit rester le seul à modifier les
+valeurs des lignes (un tree.item(iid, values=...) extérieur ne serait pas vu).
+"""
+
+
+from bisect import bisect_left
+
+
+def _normalized(values):
+    return tuple("" if v is None else v for v in values)
+
+
+def _longest_increasing(positions):
+    """Indices d'une plus longue sous-suite strictement croissante de positions (O(n log n))."""
+    tails, tail_idx, previous = [], [], [None] * len(positions)
+    for i, pos in enumerate(positions):
+        k = bisect_left(tails, pos)
+        if k == len(tails):
+            tails.append(pos)
+            tail_idx.append(i)
+        else:
+            tails[k] = pos
+            tail_idx[k] = i
+        previous[i] = tail_idx[k - 1] if k else None
+    result = set()
+    i = tail_idx[-1] if tail_idx else None
+    while i is not None:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
+def sync_treeview(tree, rows, parent=""):
+    """
+    Met le Treeview en accord avec `rows`, itérable de (iid, valeurs) ou
+    (iid, valeurs, tags), dans l'ordre d'affichage voulu.
+    Retourne un dict {"inserted", "updated", "moved", "deleted"} (nombres d'éléments).
+    """
+    # Valeurs posées au dernier passage : comparées telles quelles (item() convertit les types)
+    caches = getattr(tree, "_synced_rows", None)
+    if caches is None:
+        caches = {}
+        tree._synced_rows = caches
+    cache = caches.setdefault(parent, {})
+
+    wanted = []
+    for row in rows:
+        iid, values = str(row[0]), _normalized(row[1])
+        tags = tuple(row[2]) if len(row) > 2 and row[2] else ()
+        wanted.append((iid, values, tags))
+    wanted_ids = {iid for iid, _, _ in wanted}
+
+    existing = list(tree.get_children(parent))
+    # Lignes disparues sans passer par sync_treeview (delete() extérieur) : oubliées
+    present = set(existing)
+    for iid in [iid for iid in cache if iid not in present]:
+        del cache[iid]
+    stale = [iid for iid in existing if iid not in wanted_ids]
+    if stale:
+        tree.delete(*stale)
+        for iid in stale:
+            cache.pop(iid, None)
+    kept = [iid for iid in existing if iid in wanted_ids]
+    kept_set = set(kept)
+
+    stats = {"inserted": 0, "updated": 0, "moved": 0, "deleted": len(stale)}
+    # Lignes conservées qui restent en place : plus longue sous-suite déjà dans l'ordre voulu
+    position = {iid: i for i, iid in enumerate(kept)}
+    kept_wanted = [iid for iid, _, _ in wanted if iid in kept_set]
+    staying = {kept_wanted[i] for i in _longest_increasing([position[iid] for iid in kept_wanted])}
+    # Ordre relatif inchangé : les index voulus sont justes au fil des insertions.
+    # Sinon chaque ligne placée l'est juste après sa devancière, d'après une
+    # copie de l'ordre du widget
+    order = None if len(staying) == len(kept) else list(kept)
+    for index, (iid, values, tags) in enumerate(wanted):
+        if iid in kept_set and cache.get(iid) != (values, tags):
+            tree.item(iid, values=values, tags=tags)
+            cache[iid] = (values, tags)
+            stats["updated"] += 1
+        if iid in staying:
+            continue
+        if order is not None:
+            if iid in kept_set:
+                order.remove(iid)
+            index = order.index(wanted[index - 1][0]) + 1 if index else 0
+            order.insert(index, iid)
+        if iid in kept_set:
+            tree.move(iid, parent, index)
+            stats["moved"] += 1
+        else:
+            tree.insert(parent, index, iid=iid, values=values, tags=tags)
+            cache[iid] = (values, tags)
+            stats["inserted"] += 1
+    return stats
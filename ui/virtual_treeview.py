@@ -0,0 +1,216 @@
+"""
+Treeview virtuel pour les grandes listes.
+
+VirtualTreeview n'insère dans le ttk.Treeview que les lignes visibles. Les
+lignes sont lues par pages auprès d'une source paginée (db/paging.py :
+count(), fetch(offset, limit), set_sort(), set_search()) au fil du défilement,
+avec un petit cache de pages. Tri (clic sur un en-tête) et recherche sont
+exécutés en SQL : l'ouverture d'une liste ne dépend pas du nombre de lignes.
+
+Le Treeview sous-jacent reste accessible (attribut tree) : les iid sont les
+clés de ligne de la source, selection()/focus()/item() s'utilisent comme avant.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    Liste virtuelle branchée sur une source paginée.
+
+    columns : liste de (nom, titre, largeur, ancrage) des colonnes affichées.
+    formatter : fonction(ligne) -> tuple des valeurs affichées (par défaut, les
+    valeurs des colonnes dans l'ordre).
+    row_tags : fonction(ligne) -> tags de la ligne (couleurs), optionnelle.
+    """
+
+    MAX_CACHED_PAGES = 20
+
+    def __init__(self, master, source, columns, formatter=None, row_tags=None,
+                 page_size=200, sortable=True, **kwargs):
+        super().__init__(master, **kwargs)
+        self.source = source
+        self.column_names = [c[0] for c in columns]
+        self.formatter = formatter or (lambda row: tuple(row[name] for name in self.column_names))
+        self.row_tags = row_tags
+        self.page_size = page_size
+        self.offset = 0
+        self.visible = 20
+        self.total = 0
+        self._pages = OrderedDict()
+        self._rows = {}  # iid -> ligne affichée
+        self._selected = None
+        self._version = None
+
+        self.tree = ttk.Treeview(self, columns=self.column_names, show="headings", selectmode="browse")
+        for name, title, width, anchor in columns:
+            if sortable:
+                self.tree.heading(name, text=title, command=lambda n=name: self.sort_by(n))
+            else:
+                self.tree.heading(name, text=title)
+            self.tree.column(name, width=width, anchor=anchor)
+        self._titles = {c[0]: c[1] for c in columns}
+        self._sort = (None, False)
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-self.visible))
+        self.tree.bind("<Next>", lambda e: self._move_selection(self.visible))
+        self.tree.bind("<Home>", lambda e: self._jump(0))
+        self.tree.bind("<End>", lambda e: self._jump(self.total))
+
+    # --- API -------------------------------------------------------------
+    def refresh(self, keep_position=True):
+        """Relit le nombre de lignes et la page visible (après ajout/modification/suppression)."""
+        self.source.invalidate()
+        if not keep_position:
+            self.offset = 0
+        self._render()
+
+    def set_search(self, text):
+        self.source.set_search(text)
+        self.offset = 0
+        self._render()
+
+    def set_filters(self, filters):
+        self.source.set_filters(filters)
+        self.offset = 0
+        self._render()
+
+    def sort_by(self, column):
+        current, descending = self._sort
+        descending = not descending if current == column else False
+        self._sort = (column, descending)
+        self.source.set_sort(column, descending)
+        for name, title in self._titles.items():
+            arrow = (" ▼" if descending else " ▲") if name == column else ""
+            self.tree.heading(name, text=title + arrow)
+        self.offset = 0
+        self._render()
+
+    def selected_key(self):
+        """Clé (iid) de la ligne sélectionnée, ou None."""
+        return self._selected
+
+    def selected_row(self):
+        """Ligne de la source correspondant à la sélection, ou None."""
+        return self._rows.get(self._selected)
+
+    def row(self, iid):
+        """Ligne de la source affichée sous l'iid donné (lignes visibles uniquement)."""
+        return self._rows.get(iid)
+
+    # --- Pagination ------------------------------------------------------
+    def _page(self, number):
+        if number in self._pages:
+            self._pages.move_to_end(number)
+            return self._pages[number]
+        rows = self.source.fetch(number * self.page_size, self.page_size)
+        self._pages[number] = rows
+        while len(self._pages) > self.MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return rows
+
+    def _window_rows(self):
+        rows = []
+        first_page = self.offset // self.page_size
+        last_page = (self.offset + self.visible - 1) // self.page_size
+        for number in range(first_page, last_page + 1):
+            rows.extend(self._page(number))
+        start = self.offset - first_page * self.page_size
+        return rows[start:start + self.visible]
+
+    def _render(self):
+        if self._version != self.source.version:
+            self._pages.clear()
+            self._version = self.source.version
+        self.total = self.source.count()
+        self.offset = max(0, min(self.offset, self.total - self.visible))
+        rows = self._window_rows() if self.total else []
+
+        self.tree.delete(*self.tree.get_children())
+        self._rows = {}
+        for row in rows:
+            iid = str(row["_key"])
+            self._rows[iid] = row
+            tags = self.row_tags(row) if self.row_tags else ()
+            self.tree.insert("", "end", iid=iid, values=self.formatter(row), tags=tags)
+        if self._selected in self._rows:
+            self.tree.selection_set(self._selected)
+            self.tree.focus(self._selected)
+        if self.total:
+            self.vsb.set(self.offset / self.total, min(1.0, (self.offset + self.visible) / self.total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def scroll(self, delta):
+        """Fait défiler de `delta` lignes."""
+        new_offset = max(0, min(self.offset + delta, self.total - self.visible))
+        if new_offset != self.offset:
+            self.offset = new_offset
+            self._render()
+
+    def _jump(self, offset):
+        self.offset = max(0, min(offset, self.total - self.visible))
+        self._render()
+        children = self.tree.get_children()
+        if children:
+            target = children[0] if offset == 0 else children[-1]
+            self.tree.selection_set(target)
+            self.tree.focus(target)
+            self._selected = target
+        return "break"
+
+    # --- Événements --------------------------------------------------------
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - 24) // rowheight)
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.offset = int(float(value) * self.total)
+            self.offset = max(0, min(self.offset, self.total - self.visible))
+            self._render()
+        elif action == "scroll":
+            step = self.visible if unit == "pages" else 1
+            self.scroll(int(value) * step)
+
+    def _on_select(self, event=None):
+        sel = self.tree.selection()
+        if sel:
+            self._selected = sel[0]
+
+    def _move_selection(self, delta):
+        children = list(self.tree.get_children())
+        if not children:
+            return "break"
+        current = self.tree.focus() or self._selected
+        index = children.index(current) if current in children else -1
+        target = index + delta
+        if 0 <= target < len(children):
+            return None  # Déplacement dans la page visible : comportement standard du Treeview
+        self.scroll(target - (len(children) - 1) if target >= len(children) else target)
+        children = self.tree.get_children()
+        if children:
+            iid = children[-1] if delta > 0 else children[0]
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+            self._selected = iid
+        return "break"
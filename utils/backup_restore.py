@@ -1,44 +1,144 @@
 import os
 import shutil
 from tkinter import filedialog, messagebox
+from db.db import get_db_file
 from utils.app_logger import get_logger
+from utils.backup_store import backup_snapshot, list_snapshots, restore_snapshot
+from utils.db_backup import BACKUP_DIR
 from utils.error_handler import handle_exception
 
 logger = get_logger("backup_restore")
 
-BACKUP_DIR = "backups"
-DEFAULT_DB_FILE = "association.db"
+_status_callback = None
+_release_callbacks = []
 
-def backup_database(db_file=DEFAULT_DB_FILE):
-    """Crée une copie de sauvegarde de la base au format .bak dans BACKUP_DIR."""
+def _backup_done(manifest):
+    _notify_status()
+    messagebox.showinfo("Sauvegarde", (
+        f"Sauvegarde réussie : instantané {manifest['name']}\n"
+        f"{manifest['new_bytes'] // 1024} Kio nouveaux sur {manifest['size'] // 1024} Kio"
+    ))
+
+def backup_database(db_file=None, master=None):
+    """
+    Sauvegarde à chaud de la base dans le dépôt dédupliqué BACKUP_DIR (voir
+    utils/backup_store) : seuls les blocs modifiés depuis les instantanés
+    précédents sont écrits, puis la politique de rétention est appliquée.
+    - db_file : base à sauvegarder (défaut : base active)
+    - master : fenêtre Tk ; la sauvegarde tourne alors sur un thread de travail
+      avec barre de progression, l'application reste utilisable. Sans master,
+      elle est faite directement et son manifeste est retourné.
+    """
     try:
+        db_file = db_file or get_db_file()
         if not os.path.exists(db_file):
             messagebox.showerror("Erreur", f"Base de données non trouvée : {db_file}")
             return
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        backup_name = f"{os.path.splitext(os.path.basename(db_file))[0]}_backup.bak"
-        backup_path = os.path.join(BACKUP_DIR, backup_name)
-        shutil.copy2(db_file, backup_path)
-        logger.info(f"Backup créé : {backup_path}")
-        messagebox.showinfo("Sauvegarde", f"Sauvegarde réussie dans {backup_path}")
+        if master is None:
+            manifest = backup_snapshot(db_file, BACKUP_DIR)
+            _backup_done(manifest)
+            return manifest
+        from ui.task_runner import run_task
+        run_task(
+            master, backup_snapshot, db_file, BACKUP_DIR,
+            on_done=_backup_done,
+            on_cancel=lambda: logger.info("Sauvegarde annulée."),
+            title="Sauvegarde", message="Sauvegarde de la base…",
+        )
     except Exception as e:
         message = handle_exception(e, "Erreur lors de la sauvegarde de la base.")
         messagebox.showerror("Erreur", message)
 
-def restore_database(db_file=DEFAULT_DB_FILE):
-    """Permet de restaurer la base à partir d'un fichier .bak choisi par l'utilisateur."""
+def release_database_file(db_file):
+    """
+    Libère le fichier de base db_file avant de le remplacer ou de le supprimer :
+    connexions du pool fermées (thread Tk et threads de travail du task runner),
+    connexions tenues hors du pool libérées (add_release_callback), fichiers
+    -wal/-shm supprimés (rejoués sur une autre base, ils la corrompraient).
+    """
+    from db.db import close_connections
+    from ui.task_runner import release_worker_connections
+    release_worker_connections()
+    close_connections()
+    for release in _release_callbacks:
+        release()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+def _install_database_file(src, db_file, move=False):
+    """Remplace le fichier de base db_file par src, une fois libéré (release_database_file)."""
+    release_database_file(db_file)
+    if move:
+        os.replace(src, db_file)
+    else:
+        shutil.copy2(src, db_file)
+
+def restore_database(db_file=None, master=None):
+    """
+    Restaure la base à partir d'un instantané du dépôt de sauvegardes, choisi
+    dans la liste des instantanés, ou d'un fichier .bak / .db quelconque.
+    - db_file : base à remplacer (défaut : base active)
+    """
     try:
+        db_file = db_file or get_db_file()
+        snapshots = list_snapshots(BACKUP_DIR)
+        if not snapshots:
+            restore_from_file(db_file)
+            return
+        from dialogs.restore_snapshot_dialog import RestoreSnapshotDialog
+        RestoreSnapshotDialog(
+            master, snapshots,
+            on_restore=lambda manifest: restore_from_snapshot(manifest, db_file, master),
+            on_other_file=lambda: restore_from_file(db_file),
+        )
+    except Exception as e:
+        message = handle_exception(e, "Erreur lors de la restauration de la base.")
+        messagebox.showerror("Erreur", message)
+
+def restore_from_snapshot(manifest, db_file, master=None):
+    """Reconstitue l'instantané `manifest` (sur un thread de travail si master est donné) puis remplace db_file."""
+    if os.path.exists(db_file):
+        if not messagebox.askyesno("Confirmation", f"Écraser la base {db_file} par l'instantané {manifest['name']} ?"):
+            return
+    staging = db_file + ".restauration"
+
+    def install(path):
+        try:
+            _install_database_file(path, db_file, move=True)
+            logger.info(f"Base restaurée depuis l'instantané {manifest['name']} -> {db_file}")
+            _notify_status()
+            messagebox.showinfo("Restauration", f"Base restaurée avec succès depuis l'instantané {manifest['name']}")
+        except Exception as e:
+            message = handle_exception(e, "Erreur lors de la restauration de la base.")
+            messagebox.showerror("Erreur", message)
+
+    if master is None:
+        install(restore_snapshot(manifest, staging, BACKUP_DIR))
+        return
+    from ui.task_runner import run_task
+    run_task(
+        master, restore_snapshot, manifest, staging, BACKUP_DIR,
+        on_done=install, title="Restauration", message="Reconstitution de l'instantané…",
+    )
+
+def restore_from_file(db_file=None):
+    """Permet de restaurer la base à partir d'un fichier de sauvegarde choisi par l'utilisateur."""
+    try:
+        db_file = db_file or get_db_file()
         bak_path = filedialog.askopenfilename(
             title="Sélectionnez le fichier de sauvegarde à restaurer",
-            filetypes=[("Fichiers de sauvegarde", "*.bak"), ("Tout", "*.*")]
+            initialdir=BACKUP_DIR if os.path.isdir(BACKUP_DIR) else None,
+            filetypes=[("Fichiers de sauvegarde", "*.bak *.db"), ("Tout", "*.*")]
         )
         if not bak_path:
             return
         if os.path.exists(db_file):
             if not messagebox.askyesno("Confirmation", f"Écraser la base {db_file} par la sauvegarde {os.path.basename(bak_path)} ?"):
                 return
-        shutil.copy2(bak_path, db_file)
+        _install_database_file(bak_path, db_file)
         logger.info(f"Base restaurée depuis {bak_path} -> {db_file}")
+        _notify_status()
         messagebox.showinfo("Restauration", f"Base restaurée avec succès depuis {bak_path}")
     except Exception as e:
         message = handle_exception(e, "Erreur lors de la restauration de la base.")
@@ -56,12 +156,24 @@ def open_database():
         from db.db import set_db_file
         set_db_file(db_path)
         logger.info(f"Base de données active changée pour {db_path}")
+        _notify_status()
         messagebox.showinfo("Changement de base", f"Base de données changée pour {db_path}")
-        # Peut appeler un callback UI pour rafraîchir la barre de statut si besoin
     except Exception as e:
         message = handle_exception(e, "Erreur lors du changement de base.")
         messagebox.showerror("Erreur", message)
 
+def _notify_status():
+    """Prévient l'UI abonnée (set_status_callback) d'un changement de base ou de sauvegarde."""
+    if _status_callback:
+        try:
+            _status_callback()
+        except Exception as e:
+            logger.warning(f"Rafraîchissement de la barre de statut impossible : {e}")
+
+def add_release_callback(callback):
+    """Enregistre une fonction fermant une connexion tenue hors du pool, appelée avant de remplacer le fichier de base."""
+    _release_callbacks.append(callback)
+
 def set_status_callback(callback):
     """Permet à l'UI de s'abonner pour être notifiée lors d'un changement de base."""
     global _status_callback
@@ -0,0 +1,317 @@
+"""
+Dépôt de sauvegardes dédupliqué (adressé par contenu) sous BACKUP_DIR.
+
+Une sauvegarde (« instantané ») est une copie cohérente de la base
+(utils/db_backup.online_backup) découpée en blocs alignés sur les pages
+SQLite (CHUNK_PAGES pages par bloc). Chaque bloc est stocké une seule fois,
+sous le nom de son sha256 :
+
+    backups/chunks/ab/abcdef…      blocs, partagés entre instantanés
+    backups/snapshots/<nom>.json   manifeste : liste ordonnée des blocs,
+                                   taille et sha256 du fichier complet
+
+D'un jour à l'autre, seules les pages modifiées produisent de nouveaux blocs :
+un instantané quotidien d'une grosse base ne coûte que ses changements.
+
+prune_snapshots() applique la politique de rétention à chaque base sauvegardée
+séparément (par défaut 7 derniers jours, 4 dernières semaines, 12 derniers
+mois : le plus récent instantané de chaque période est conservé, réglable par
+ASSO_BACKUP_RETENTION="7,4,12") puis supprime les blocs qui ne sont plus
+référencés par aucun instantané.
+
+Ce module n'importe pas tkinter (exécuté sur un thread de travail).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from utils.app_logger import get_logger
+from utils.db_backup import BACKUP_DIR, online_backup, quick_check
+
+logger = get_logger("backup_store")
+
+CHUNK_PAGES = 16  # pages SQLite par bloc (64 Kio avec des pages de 4 Kio)
+DEFAULT_RETENTION = (7, 4, 12)  # instantanés quotidiens, hebdomadaires, mensuels conservés
+
+_store_lock = threading.Lock()  # une seule écriture du dépôt à la fois (création / purge)
+
+
+def retention_policy():
+    """(quotidiens, hebdomadaires, mensuels) conservés, d'après ASSO_BACKUP_RETENTION ("7,4,12")."""
+    value = os.getenv("ASSO_BACKUP_RETENTION", "")
+    try:
+        daily, weekly, monthly = (int(v) for v in value.split(","))
+        return daily, weekly, monthly
+    except ValueError:
+        if value:
+            logger.warning(f"ASSO_BACKUP_RETENTION invalide ({value!r}), politique par défaut {DEFAULT_RETENTION}")
+        return DEFAULT_RETENTION
+
+
+def _chunks_dir(store_dir):
+    return os.path.join(store_dir, "chunks")
+
+
+def _snapshots_dir(store_dir):
+    return os.path.join(store_dir, "snapshots")
+
+
+def _chunk_path(store_dir, digest):
+    return os.path.join(_chunks_dir(store_dir), digest[:2], digest)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def page_size(path):
+    """Taille de page d'un fichier SQLite, lue dans son en-tête (octets 16-17)."""
+    with open(path, "rb") as f:
+        header = f.read(100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\x00"):
+        raise ValueError(f"{path} n'est pas une base SQLite")
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+def _snapshot_name(db_file, store_dir, when):
+    base = os.path.splitext(os.path.basename(db_file))[0]
+    name = f"{base}_{when.strftime('%Y%m%d_%H%M%S')}"
+    candidate, n = name, 1
+    while os.path.exists(os.path.join(_snapshots_dir(store_dir), candidate + ".json")):
+        n += 1
+        candidate = f"{name}_{n}"
+    return candidate
+
+
+def store_file(path, store_dir=BACKUP_DIR, name=None, when=None, source=None, task=None, extra=None):
+    """
+    Ajoute le fichier SQLite `path` au dépôt comme instantané `name` : seuls les
+    blocs absents du dépôt sont écrits. `extra` : champs ajoutés au manifeste.
+    Retourne le manifeste (dict).
+    """
+    when = when or datetime.now()
+    name = name or _snapshot_name(source or path, store_dir, when)
+    chunk_size = page_size(path) * CHUNK_PAGES
+    total = os.path.getsize(path)
+    whole = hashlib.sha256()
+    chunks, new_chunks, new_bytes = [], 0, 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest = hashlib.sha256(block).hexdigest()
+            whole.update(block)
+            chunk_path = _chunk_path(store_dir, digest)
+            if not os.path.exists(chunk_path):
+                _write_atomic(chunk_path, block)
+                new_chunks += 1
+                new_bytes += len(block)
+            chunks.append(digest)
+            if task is not None:
+                task.report(f.tell() / total if total else 1.0, f"Stockage : {len(chunks)} bloc(s)")
+                task.check_cancelled()
+    manifest = {
+        "name": name,
+        "created_at": when.isoformat(timespec="seconds"),
+        "source": os.path.abspath(source or path),
+        "size": total,
+        "sha256": whole.hexdigest(),
+        "chunk_size": chunk_size,
+        "chunks": chunks,
+        "new_chunks": new_chunks,
+        "new_bytes": new_bytes,
+        **(extra or {}),
+    }
+    _write_atomic(
+        os.path.join(_snapshots_dir(store_dir), name + ".json"),
+        json.dumps(manifest, indent=1).encode("utf-8"),
+    )
+    return manifest
+
+
+def create_snapshot(db_file, store_dir=BACKUP_DIR, task=None, when=None):
+    """
+    Instantané cohérent de db_file dans le dépôt : copie à chaud par l'API de
+    backup SQLite, contrôle de la copie (PRAGMA quick_check), découpage en
+    blocs, stockage des seuls blocs nouveaux. Une copie qui échoue au contrôle
+    n'est pas stockée (ValueError). Retourne le manifeste (dict).
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    started = time.perf_counter()
+    with _store_lock:
+        copy = online_backup(db_file, os.path.join(store_dir, "instantane_en_cours.db"), task=task)
+        try:
+            copied = time.perf_counter()
+            problems = quick_check(copy)
+            checked = time.perf_counter()
+            if problems:
+                logger.error(f"Copie de {db_file} invalide (quick_check) : {'; '.join(problems[:5])}")
+                raise ValueError(f"Contrôle d'intégrité de la sauvegarde en échec : {problems[0]}")
+            manifest = store_file(copy, store_dir, when=when, source=db_file, task=task, extra={
+                "quick_check": "ok",
+                "durations": {
+                    "copy": round(copied - started, 3),
+                    "quick_check": round(checked - copied, 3),
+                },
+            })
+        finally:
+            os.remove(copy)
+    manifest["durations"]["total"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Instantané {manifest['name']} : {manifest['size']} octets, "
+        f"{manifest['new_chunks']}/{len(manifest['chunks'])} bloc(s) nouveaux ({manifest['new_bytes']} octets écrits), "
+        f"quick_check ok, {manifest['durations']['total']:.2f} s (copie {manifest['durations']['copy']:.2f} s, "
+        f"contrôle {manifest['durations']['quick_check']:.2f} s)"
+    )
+    return manifest
+
+
+def list_snapshots(store_dir=BACKUP_DIR):
+    """Manifestes des instantanés du dépôt, du plus récent au plus ancien."""
+    directory = _snapshots_dir(store_dir)
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifeste illisible ignoré : {filename} ({e})")
+    return sorted(snapshots, key=lambda s: (s["created_at"], s["name"]), reverse=True)
+
+
+def latest_snapshot(db_file, store_dir=BACKUP_DIR):
+    """Manifeste du plus récent instantané de db_file, ou None."""
+    source = os.path.abspath(db_file)
+    return next((s for s in list_snapshots(store_dir) if s.get("source") == source), None)
+
+
+def get_snapshot(name, store_dir=BACKUP_DIR):
+    with open(os.path.join(_snapshots_dir(store_dir), name + ".json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def restore_snapshot(snapshot, dest, store_dir=BACKUP_DIR, task=None):
+    """
+    Reconstitue l'instantané (manifeste ou nom) dans dest. Chaque bloc et le
+    fichier complet sont vérifiés (sha256) avant de remplacer dest.
+    Retourne dest.
+    """
+    manifest = snapshot if isinstance(snapshot, dict) else get_snapshot(snapshot, store_dir)
+    part = dest + ".part"
+    whole = hashlib.sha256()
+    count = len(manifest["chunks"])
+    try:
+        with open(part, "wb") as out:
+            for i, digest in enumerate(manifest["chunks"], 1):
+                with open(_chunk_path(store_dir, digest), "rb") as f:
+                    block = f.read()
+                if hashlib.sha256(block).hexdigest() != digest:
+                    raise ValueError(f"Bloc altéré dans le dépôt : {digest}")
+                whole.update(block)
+                out.write(block)
+                if task is not None:
+                    task.report(i / count, f"Restauration : {i} / {count} bloc(s)")
+                    task.check_cancelled()
+        if whole.hexdigest() != manifest["sha256"]:
+            raise ValueError(f"Instantané {manifest['name']} incohérent (sha256 du fichier)")
+        os.replace(part, dest)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    logger.info(f"Instantané {manifest['name']} restauré dans {dest}")
+    return dest
+
+
+def _retained_for_source(snapshots, daily, weekly, monthly):
+    ordered = sorted(snapshots, key=lambda s: (s["created_at"], s["name"]), reverse=True)
+    keep = {ordered[0]["name"]} if ordered else set()
+    periods = (
+        (daily, lambda d: d.date()),
+        (weekly, lambda d: d.isocalendar()[:2]),
+        (monthly, lambda d: (d.year, d.month)),
+    )
+    for count, period in periods:
+        seen = set()
+        for snapshot in ordered:
+            key = period(datetime.fromisoformat(snapshot["created_at"]))
+            if key in seen:
+                continue
+            if len(seen) >= count:
+                break
+            seen.add(key)
+            keep.add(snapshot["name"])
+    return keep
+
+
+def select_retained(snapshots, daily=7, weekly=4, monthly=12):
+    """
+    Noms des instantanés à conserver. La politique s'applique base par base
+    (champ "source" du manifeste) : pour chaque base, le plus récent instantané
+    de chacun des `daily` derniers jours, `weekly` dernières semaines et
+    `monthly` derniers mois ayant un instantané, plus le tout dernier.
+    """
+    by_source = {}
+    for snapshot in snapshots:
+        by_source.setdefault(snapshot.get("source"), []).append(snapshot)
+    keep = set()
+    for group in by_source.values():
+        keep |= _retained_for_source(group, daily, weekly, monthly)
+    return keep
+
+
+def collect_garbage(store_dir=BACKUP_DIR):
+    """
+    Supprime les blocs qu'aucun manifeste ne référence, toutes bases
+    confondues (un bloc peut être partagé entre bases). Retourne le nombre de
+    blocs supprimés.
+    """
+    referenced = set()
+    for snapshot in list_snapshots(store_dir):
+        referenced.update(snapshot["chunks"])
+    removed = 0
+    for root, _, files in os.walk(_chunks_dir(store_dir)):
+        for filename in files:
+            if filename not in referenced:
+                os.remove(os.path.join(root, filename))
+                removed += 1
+    return removed
+
+
+def prune_snapshots(store_dir=BACKUP_DIR, policy=None):
+    """
+    Applique la politique de rétention (daily, weekly, monthly ; défaut :
+    retention_policy()) puis supprime les blocs orphelins.
+    Retourne (instantanés supprimés, blocs supprimés).
+    """
+    daily, weekly, monthly = policy or retention_policy()
+    with _store_lock:
+        snapshots = list_snapshots(store_dir)
+        keep = select_retained(snapshots, daily, weekly, monthly)
+        removed = [s["name"] for s in snapshots if s["name"] not in keep]
+        for name in removed:
+            os.remove(os.path.join(_snapshots_dir(store_dir), name + ".json"))
+        chunks = collect_garbage(store_dir)
+    if removed or chunks:
+        logger.info(f"Rétention : {len(removed)} instantané(s) et {chunks} bloc(s) supprimés")
+    return removed, chunks
+
+
+def backup_snapshot(db_file, store_dir=BACKUP_DIR, task=None):
+    """Sauvegarde complète : nouvel instantané puis rétention. Retourne le manifeste du nouvel instantané."""
+    manifest = create_snapshot(db_file, store_dir, task=task)
+    prune_snapshots(store_dir)
+    return manifest
@@ -1,11 +1,11 @@
 import os
-import shutil
-import zipfile
 from datetime import datetime
 from tkinter import messagebox
 from utils.app_logger import get_logger
 from utils.error_handler import handle_exception
-from db.db import get_db_file
+from utils.csv_helpers import export_query_csv
+from utils.zip_helpers import list_data_tables, read_snapshot, write_tables_zip, DEFAULT_COMPRESSLEVEL
+from db.db import get_db_file, apply_pragma_profile
 
 logger = get_logger("cloture_exercice")
 
@@ -13,10 +13,12 @@ EXPORTS_DIR = "exports"
 
 def export_all_tables_to_csv(db_file=None, export_dir=None):
     """
-    Exporte toutes les tables SQLite en CSV dans un dossier donné.
+    Exporte les tables de données en CSV dans un dossier donné (en flux,
+    table par table : voir utils/csv_helpers.write_cursor_csv), depuis un
+    instantané cohérent de la base. L'index de recherche (FTS5) et ses tables
+    d'appui sont exclus, comme dans l'archive ZIP.
     """
     import sqlite3
-    import pandas as pd
 
     if not db_file:
         db_file = get_db_file()
@@ -26,53 +28,57 @@ def export_all_tables_to_csv(db_file=None, export_dir=None):
 
     try:
         conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-        tables = [row[0] for row in cursor.fetchall()]
-        for table in tables:
-            df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-            path = os.path.join(export_dir, f"{table}.csv")
-            df.to_csv(path, index=False, encoding="utf-8")
-        conn.close()
+        try:
+            apply_pragma_profile(conn, "report")
+            with read_snapshot(conn):
+                for table in list_data_tables(conn):
+                    path = os.path.join(export_dir, f"{table}.csv")
+                    export_query_csv(conn, f'SELECT * FROM "{table}"', path)
+        finally:
+            conn.close()
         logger.info(f"Export CSV de toutes les tables terminé dans {export_dir}")
         return export_dir
     except Exception as e:
         handle_exception(e, "Erreur lors de l'export CSV des tables")
         return None
 
-def make_zip_export(src_dir):
+def make_zip_export(db_file=None, zip_path=None, compresslevel=DEFAULT_COMPRESSLEVEL):
     """
-    Crée une archive ZIP de tout le dossier src_dir.
+    Crée l'archive ZIP de clôture : une entrée CSV par table, écrite en flux
+    depuis un instantané cohérent de la base, plus un manifeste (lignes et
+    sha256 de chaque CSV). Voir utils/zip_helpers.write_tables_zip.
     """
+    import sqlite3
+
+    if not db_file:
+        db_file = get_db_file()
+    if not zip_path:
+        zip_path = os.path.join(EXPORTS_DIR, "cloture_" + datetime.now().strftime("%Y%m%d_%H%M%S") + ".zip")
+    directory = os.path.dirname(zip_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
     try:
-        zip_name = src_dir.rstrip(os.sep) + ".zip"
-        with zipfile.ZipFile(zip_name, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(src_dir):
-                for file in files:
-                    abs_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(abs_path, src_dir)
-                    zipf.write(abs_path, rel_path)
-        logger.info(f"Archive ZIP créée : {zip_name}")
-        return zip_name
+        conn = sqlite3.connect(db_file)
+        try:
+            apply_pragma_profile(conn, "report")
+            manifest = write_tables_zip(conn, zip_path, compresslevel=compresslevel)
+        finally:
+            conn.close()
+        logger.info(f"Archive ZIP créée : {zip_path} ({len(manifest['tables'])} tables)")
+        return zip_path
     except Exception as e:
         handle_exception(e, "Erreur lors de la création de l'archive ZIP")
         return None
 
-def run_cloture(reset_db=True, export_pdf_callback=None):
+def run_cloture(reset_db=True, export_pdf_callback=None, compresslevel=DEFAULT_COMPRESSLEVEL):
     """
     Processus complet de clôture d'exercice :
-    - Export CSV de toutes les tables
-    - Création ZIP
+    - Archive ZIP des tables en CSV (en une passe, sans dossier intermédiaire)
     - (optionnel) Génération du bilan PDF
     - (optionnel) Reset de la base
     """
     try:
-        db_file = get_db_file()
-        export_dir = export_all_tables_to_csv(db_file)
-        if not export_dir:
-            messagebox.showerror("Erreur", "Échec de l'export CSV.")
-            return
-        zip_path = make_zip_export(export_dir)
+        zip_path = make_zip_export(get_db_file(), compresslevel=compresslevel)
         if not zip_path:
             messagebox.showerror("Erreur", "Échec de la création de l'archive ZIP.")
             return
@@ -80,7 +86,7 @@ def run_cloture(reset_db=True, export_pdf_callback=None):
         if export_pdf_callback:
             # Fonction passée par le module exports pour générer le PDF bilan argumenté
             try:
-                export_pdf_callback(export_dir)
+                export_pdf_callback(zip_path)
             except Exception as e:
                 handle_exception(e, "Erreur lors de l'export du PDF de bilan")
 
@@ -93,7 +99,7 @@ def run_cloture(reset_db=True, export_pdf_callback=None):
                 init_db()
                 messagebox.showinfo("Clôture terminée", "La base a été réinitialisée pour un nouvel exercice.")
         else:
-            messagebox.showinfo("Clôture terminée", f"Archive et exports générés dans {export_dir}")
+            messagebox.showinfo("Clôture terminée", f"Archive générée : {zip_path}")
 
     except Exception as e:
         message = handle_exception(e, "Erreur lors de la clôture d'exercice.")
@@ -39,4 +39,40 @@ def read_dicts_csv(filepath, delimiter=",", encoding="utf-8"):
     """
     with open(filepath, "r", newline='', encoding=encoding) as csvfile:
         reader = csv.DictReader(csvfile, delimiter=delimiter)
-        return [row for row in reader]
\ No newline at end of file
+        return [row for row in reader]
+
+CHUNK_SIZE = 1000  # lignes lues par fetchmany() lors d'un export en flux
+
+def write_cursor_csv(dest, cursor, delimiter=",", encoding="utf-8", chunk_size=CHUNK_SIZE):
+    """
+    Écrit en CSV le résultat d'une requête déjà exécutée, en flux : les lignes
+    sont lues par paquets de chunk_size (fetchmany) et écrites au fur et à mesure,
+    la mémoire utilisée ne dépend pas de la taille de la table.
+    - dest : chemin du fichier, ou fichier texte déjà ouvert (ex. entrée de ZIP)
+    - en-tête : noms des colonnes de cursor.description
+    Retourne le nombre de lignes écrites.
+    """
+    if isinstance(dest, (str, os.PathLike)):
+        directory = os.path.dirname(dest)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(dest, "w", newline='', encoding=encoding) as csvfile:
+            return write_cursor_csv(csvfile, cursor, delimiter=delimiter, chunk_size=chunk_size)
+    writer = csv.writer(dest, delimiter=delimiter)
+    writer.writerow([col[0] for col in cursor.description])
+    count = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return count
+        writer.writerows(rows)
+        count += len(rows)
+
+def export_query_csv(conn, sql, dest, params=(), delimiter=",", encoding="utf-8", chunk_size=CHUNK_SIZE):
+    """Exécute `sql` sur `conn` et écrit son résultat en CSV dans dest (voir write_cursor_csv)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return write_cursor_csv(dest, cursor, delimiter=delimiter, encoding=encoding, chunk_size=chunk_size)
+    finally:
+        cursor.close()
@@ -0,0 +1,80 @@
+"""
+Sauvegarde à chaud de la base SQLite par l'API de backup (Connection.backup).
+
+Contrairement à une copie du fichier, la sauvegarde lit la base à travers
+SQLite : le contenu encore dans le fichier -wal est inclus et la copie est
+cohérente même si une écriture a lieu pendant l'opération (SQLite reprend
+alors la copie des pages modifiées). La copie avance par paquets de
+BACKUP_PAGES pages entre lesquels les autres connexions peuvent écrire.
+
+Le fichier est écrit sous un nom temporaire (.part) puis renommé : une
+sauvegarde interrompue ne laisse jamais de .bak incomplet.
+
+Ce module n'importe pas tkinter : il s'exécute sur un thread de travail
+(voir utils/backup_store.backup_snapshot).
+"""
+
+import os
+import sqlite3
+
+from db.db import CONNECTION_TIMEOUT
+from utils.app_logger import get_logger
+
+logger = get_logger("db_backup")
+
+BACKUP_DIR = "backups"
+BACKUP_PAGES = 1024  # pages copiées par étape (4 Mio avec des pages de 4 Kio)
+
+
+def online_backup(db_file, dest, pages=BACKUP_PAGES, task=None):
+    """
+    Copie cohérente de db_file vers dest par l'API de backup SQLite.
+    - pages : nombre de pages copiées par étape
+    - task : Task de ui/task_runner (facultatif) : reçoit l'avancement et peut
+      interrompre la copie (TaskCancelled), le fichier partiel est alors supprimé
+    Retourne dest.
+    """
+    directory = os.path.dirname(dest)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    part = dest + ".part"
+
+    def progress(status, remaining, total):
+        if task is not None:
+            done = total - remaining
+            task.report(done / total if total else 1.0, f"Sauvegarde : {done} / {total} pages")
+            task.check_cancelled()
+
+    src = sqlite3.connect(db_file, timeout=CONNECTION_TIMEOUT)
+    try:
+        dst = sqlite3.connect(part)
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+            # Copie autonome : sans mode WAL, elle s'ouvre sans fichiers -wal/-shm
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+        os.replace(part, dest)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    finally:
+        src.close()
+    logger.info(f"Sauvegarde à chaud : {db_file} -> {dest} ({os.path.getsize(dest)} octets)")
+    return dest
+
+
+def quick_check(path):
+    """
+    PRAGMA quick_check sur le fichier `path` (une copie de sauvegarde, par
+    exemple). Retourne la liste des problèmes signalés, vide si le fichier est sain.
+    """
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        rows = [r[0] for r in conn.execute("PRAGMA quick_check")]
+    finally:
+        conn.close()
+    return [] if rows == ["ok"] else rows
@@ -1,5 +1,14 @@
+import hashlib
+import json
 import zipfile
 import os
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.csv_helpers import write_cursor_csv
+
+MANIFEST_NAME = "manifest.json"
+DEFAULT_COMPRESSLEVEL = 6  # niveau deflate : 1 (rapide) à 9 (archive la plus petite)
 
 def zip_directory(source_dir, zip_path):
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -11,4 +20,113 @@ def zip_directory(source_dir, zip_path):
 
 def extract_zip(zip_path, dest_dir):
     with zipfile.ZipFile(zip_path, 'r') as zipf:
-        zipf.extractall(dest_dir)
\ No newline at end of file
+        zipf.extractall(dest_dir)
+
+class _HashingWriter:
+    """Fichier texte minimal pour csv.writer : encode, hache (sha256) et écrit dans une entrée de ZIP."""
+
+    def __init__(self, raw, encoding):
+        self.raw = raw
+        self.encoding = encoding
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode(self.encoding)
+        self.sha256.update(data)
+        self.raw.write(data)
+        self.size += len(data)
+        return len(text)
+
+@contextmanager
+def read_snapshot(conn):
+    """
+    Transaction de lecture sur conn : toutes les requêtes du bloc voient le même
+    état de la base (WAL), même si d'autres connexions écrivent pendant l'export.
+    Sans effet si conn est déjà dans une transaction.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+def list_data_tables(conn):
+    """Tables de données de la base, hors tables internes SQLite et tables virtuelles (FTS5) avec leurs tables d'appui."""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    virtual = [name for name, sql in rows if (sql or "").upper().startswith("CREATE VIRTUAL")]
+    return [
+        name for name, _ in rows
+        if name not in virtual and not any(name.startswith(v + "_") for v in virtual)
+    ]
+
+def write_tables_zip(conn, zip_path, tables=None, compresslevel=DEFAULT_COMPRESSLEVEL, encoding="utf-8"):
+    """
+    Écrit chaque table en CSV directement dans une entrée de l'archive zip_path,
+    en une passe et sans fichier temporaire, depuis un instantané de lecture
+    cohérent (read_snapshot). Ajoute MANIFEST_NAME : lignes, taille et sha256
+    du CSV de chaque table.
+    - tables : liste des tables à exporter (défaut : list_data_tables) ; les
+      tables absentes de la base sont ignorées et listées dans le manifeste
+    - compresslevel : niveau deflate, de 0 à 9
+    Retourne le manifeste (dict).
+    """
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "compresslevel": compresslevel,
+        "encoding": encoding,
+        "tables": {},
+        "missing": [],
+    }
+    with read_snapshot(conn):
+        existing = list_data_tables(conn)
+        if tables is None:
+            tables = existing
+        manifest["missing"] = [t for t in tables if t not in existing]
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+            for table in tables:
+                if table not in existing:
+                    continue
+                name = f"{table}.csv"
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(f'SELECT * FROM "{table}"')
+                    with zf.open(name, "w", force_zip64=True) as entry:
+                        writer = _HashingWriter(entry, encoding)
+                        rows = write_cursor_csv(writer, cursor)
+                finally:
+                    cursor.close()
+                manifest["tables"][table] = {
+                    "file": name,
+                    "rows": rows,
+                    "bytes": writer.size,
+                    "sha256": writer.sha256.hexdigest(),
+                }
+            zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+def verify_zip_manifest(zip_path):
+    """
+    Relit une archive produite par write_tables_zip et recalcule le sha256 de
+    chaque CSV. Retourne la liste des fichiers absents ou altérés (vide si l'archive est intègre).
+    """
+    errors = []
+    with zipfile.ZipFile(zip_path) as zf:
+        manifest = json.loads(zf.read(MANIFEST_NAME).decode("utf-8"))
+        names = set(zf.namelist())
+        for info in manifest["tables"].values():
+            if info["file"] not in names:
+                errors.append(info["file"])
+                continue
+            sha256 = hashlib.sha256()
+            with zf.open(info["file"]) as entry:
+                for block in iter(lambda: entry.read(1 << 16), b""):
+                    sha256.update(block)
+            if sha256.hexdigest() != info["sha256"]:
+                errors.append(info["file"])
+    return errors